@@ -0,0 +1,98 @@
+import glob
+import hashlib
+import os
+import time
+from typing import Optional
+
+import constants as ct
+import user_cache
+
+CACHE_FILE_SUFFIX = ".md"
+
+# 応答ファイルの日時の使い方
+#   更新日時: 保存した日時（保存期間 max_age_days の判定に使う。使用しても変更しない）
+#   アクセス日時: 最後に使用した日時（保存容量 max_bytes を超えた場合に古い順に削除する）
+
+def cache_dir() -> str:
+    """AIの応答を保存するフォルダ（ユーザーのキャッシュフォルダ内）"""
+    return os.path.join(user_cache.cache_dir(), ct.AI_CACHE_PARAMS["dir_name"])
+
+def cache_key(provider: str, model: str, instructions: str, user_input: str) -> str:
+    """応答を決める入力（AIの種類・モデル・システム指示・テンプレートを埋めた入力）のハッシュ（詳細仕様は user_input に含まれる）"""
+    hasher = hashlib.sha256()
+    for value in (provider, model, instructions, user_input):
+        data = (value or "").encode("utf-8")
+        # 区切りが曖昧にならないように、長さを付けて連結する
+        hasher.update(len(data).to_bytes(8, "big"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+def _path(key: str) -> str:
+    return os.path.join(cache_dir(), key + CACHE_FILE_SUFFIX)
+
+def _expired(stored_time: float, now: float) -> bool:
+    max_age_days = ct.AI_CACHE_PARAMS["max_age_days"]
+    return max_age_days is not None and now - stored_time > max_age_days * 24 * 60 * 60
+
+def lookup(key: str) -> Optional[str]:
+    """保存した応答テキスト（ない場合・保存してから保存期間を過ぎた場合は None）"""
+    path = _path(key)
+    try:
+        stored_time = os.path.getmtime(path)
+        now = time.time()
+        if _expired(stored_time, now):
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path, (now, stored_time))  # 最後に使用した日時（アクセス日時）だけを更新し、保存した日時（更新日時）は変えない
+    except (OSError, UnicodeDecodeError):
+        return None
+    return text
+
+def store(key: str, text: str):
+    """応答テキストを保存し、保存容量・保存期間を超えた古い応答を削除"""
+    path = _path(key)
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        # 書き込み途中のファイルを読み込まないように、一時ファイルに保存してから置き換える
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except OSError:
+        return  # 保存できない場合もAIの応答はそのまま使用する
+    evict()
+
+def evict():
+    """保存期間を過ぎた応答と、保存容量（max_bytes）を超えた分の最後に使用した日時の古い応答を削除"""
+    now = time.time()
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir(), "*" + CACHE_FILE_SUFFIX)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if _expired(stat.st_mtime, now):
+            _remove(path)
+        else:
+            entries.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    entries.sort()
+    for _, size, path in entries:
+        if total <= ct.AI_CACHE_PARAMS["max_bytes"]:
+            break
+        _remove(path)
+        total -= size
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def clear():
+    """保存したすべての応答を削除"""
+    for path in glob.glob(os.path.join(cache_dir(), "*" + CACHE_FILE_SUFFIX)):
+        _remove(path)
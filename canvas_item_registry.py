@@ -0,0 +1,47 @@
+import tkinter as tk
+import weakref
+
+# キャンバスアイテムID -> 所有オブジェクト（Node/Edge/Swimlane/Note）の逆引き表
+# キャンバスごとに保持し、キャンバス破棄時には自動的に解放される
+_registries: "weakref.WeakKeyDictionary[tk.Canvas, dict[int, object]]" = weakref.WeakKeyDictionary()
+
+def _registry(canvas: tk.Canvas) -> dict[int, object]:
+    registry = _registries.get(canvas)
+    if registry is None:
+        registry = {}
+        _registries[canvas] = registry
+    return registry
+
+def register(canvas: tk.Canvas|None, item_id: int|None, owner: object) -> None:
+    """キャンバスアイテムIDと所有オブジェクトを登録"""
+    if canvas is None or item_id is None:
+        return
+    _registry(canvas)[item_id] = owner
+
+def unregister(canvas: tk.Canvas|None, *item_ids: int|None) -> None:
+    """キャンバスアイテムIDの登録を解除"""
+    if canvas is None:
+        return
+    registry = _registries.get(canvas)
+    if registry is None:
+        return
+    for item_id in item_ids:
+        if item_id is not None:
+            registry.pop(item_id, None)
+
+def owner_of(canvas: tk.Canvas|None, item_id: int|None) -> object|None:
+    """キャンバスアイテムIDから所有オブジェクトを逆引き"""
+    if canvas is None or item_id is None:
+        return None
+    registry = _registries.get(canvas)
+    if registry is None:
+        return None
+    return registry.get(item_id)
+
+def clear(canvas: tk.Canvas|None) -> None:
+    """キャンバスの登録情報を全て破棄（canvas.delete("all") と対で使用）"""
+    if canvas is None:
+        return
+    registry = _registries.get(canvas)
+    if registry is not None:
+        registry.clear()
@@ -31,6 +31,49 @@ CANVAS_PARAMS = {
     "grid_spacing": 15,
 }
 
+# Viewport Rendering Parameters / 表示領域描画パラメータ
+VIEWPORT_PARAMS = {
+    "virtual_rendering": True,  # 表示領域付近のオブジェクトだけをキャンバスに描画する（仮想化描画）
+    "virtual_rendering_min_nodes": 500,  # 仮想化描画を有効にするノード数の下限
+    "margin": 300,  # 表示領域の外側に余分に描画する幅（ピクセル）
+    "grid_margin": 300,  # グリッドを表示領域の外側に余分に描画する幅（ピクセル）
+}
+
+# Drag Parameters / ドラッグ操作パラメータ
+DRAG_PARAMS = {
+    "coalesce_motion": True,  # マウス移動イベントを間引き、最新の位置だけをアイドル時に1回反映する
+    "defer_relayout": True,  # ドラッグ中のノードの関連エッジ・ノートの再レイアウトを、ポインタが止まるかドラッグ終了まで遅延する
+    "settle_delay_ms": 120,  # ポインタが止まったと判定するまでの時間（ミリ秒）
+    "live_group_drag": True,  # 複数選択中のドラッグで、選択中のオブジェクト全体をドラッグ中から一括移動する
+}
+
+# Spatial Index Parameters / 空間インデックスパラメータ
+SPATIAL_INDEX_PARAMS = {
+    "cell_grid_multiple": 8,  # バケットの1辺の長さ（グリッド間隔の倍数）
+    "max_cells": 64,  # これより多くのバケットにまたがるオブジェクト（長いエッジなど）はバケットに登録せず、検索のたびに判定する
+}
+
+# Text Measurement Parameters / テキスト計測パラメータ
+TEXT_MEASURE_PARAMS = {
+    "cache_size": 4096,  # キャッシュする表示テキスト（テキスト・表示領域・フォントの組み合わせ）の上限数
+}
+
+# Shape Template Parameters / 図形テンプレートパラメータ
+SHAPE_TEMPLATE_PARAMS = {
+    "cache_size": 1024,  # キャッシュする図形テンプレート（ノード種類・形状・サイズの組み合わせ）の上限数
+}
+
+# User Cache Parameters / ユーザー・キャッシュ・パラメータ
+USER_CACHE_PARAMS = {
+    "app_dir_name": "flowchart-drawing-tool",   # ユーザーのキャッシュフォルダ内のアプリケーション用フォルダ名（アイコン画像・AIの応答のキャッシュを保存）
+}
+
+# Icon Atlas Parameters / アイコン・アトラス・パラメータ
+ICON_ATLAS_PARAMS = {
+    "enabled": True,    # 描画したアイコンを1枚の画像にまとめてユーザーのキャッシュフォルダに保存し、次回以降の起動で再利用する
+    "icon_size": 24,    # ツールバー・メニューに表示するアイコンのサイズ（ピクセル）
+}
+
 # Mode Dictionary / モード辞書
 MODE_DICT = {
     "Select" : "select",
@@ -315,6 +358,37 @@ SWIMLANE_FILL_COLORS = [
     "#F7F5F2",  # Light Gray
 ]
 
+# Export Parameters / 出力パラメータ
+EXPORT_PARAMS = {
+    "offscreen_image_export": True,  # 画像保存で、画面キャプチャではなくモデルから直接描画する
+    "scale": 1.0,   # 画像出力の倍率
+    "margin": 20,   # 図の周囲の余白（モデル座標）
+    "background": "#FFFFFF",    # 背景色
+    "supersampling": 2,     # アンチエイリアス用に、この倍率で描画してから縮小する
+    "jpeg_quality": 95,
+    "pdf_cjk_font": "HeiseiKakuGo-W5",  # PDF出力で日本語に使用するフォント（埋め込みなし、Adobe-Japan1）
+    "tile_size": 1024,  # 大きな画像をタイル分割して出力する場合のタイルの1辺（ピクセル）
+    "tile_workers": None,   # タイルを描画するプロセス数（None の場合はCPU数）
+    "tiled_export_min_pixels": 32 * 1024 * 1024,    # 描画する画素数（出力画像の画素数 × supersampling の2乗）がこれ以上の場合はタイル分割で出力する
+    "png_compress_level": 6,    # タイル分割で出力するPNGの圧縮レベル（0〜9）
+    "tiled_export_poll_interval": 100,  # タイル分割の出力をバックグラウンドで実行中、終了を確認する間隔（ms）
+    # フォント名 -> フォントファイルの候補（Pillowはシステムのフォントフォルダからも検索する）
+    "font_files": {
+        "Arial": ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+        "Arial bold": ["arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+        "Meiryo": ["meiryo.ttc", "Meiryo.ttc", "YuGothM.ttc", "ヒラギノ角ゴシック W3.ttc", "NotoSansCJK-Regular.ttc", "NotoSansJP-Regular.otf"],
+    },
+    # 日本語を表示できるフォントを優先したフォールバック候補
+    "fallback_font_files": ["meiryo.ttc", "YuGothM.ttc", "ヒラギノ角ゴシック W3.ttc", "NotoSansCJK-Regular.ttc", "NotoSansJP-Regular.otf", "DejaVuSans.ttf"],
+}
+
+# Edit History Parameters / 編集履歴パラメータ
+HISTORY_PARAMS = {
+    "memory_budget": 64 * 1024 * 1024,  # 履歴が使用するメモリの上限（バイト）
+    "compress": True,   # 上限超過時に古い履歴をzlib圧縮する（False の場合は古い履歴から破棄）
+    "keep_uncompressed": 20,    # 圧縮せずに保持する直近の履歴数
+}
+
 # Message Definitions / メッセージ定義一覧
 WINDOW_CLOSE_DIALOG_TITLE = get_i18n_message("WINDOW_CLOSE_DIALOG_TITLE", lang=i18n_lang)
 WINDOW_CLOSE_DIALOG_MESSAGE = get_i18n_message("WINDOW_CLOSE_DIALOG_MESSAGE", lang=i18n_lang)
@@ -331,6 +405,10 @@ ANTHROPIC_API_KEY_NOT_SET_MESSAGE = get_i18n_message("ANTHROPIC_API_KEY_NOT_SET_
 
 UNSUPPORTED_AI_MODEL_MESSAGE = get_i18n_message("UNSUPPORTED_AI_MODEL_MESSAGE", lang=i18n_lang)
 
+AI_GENERATING_MESSAGE = get_i18n_message("AI_GENERATING_MESSAGE", lang=i18n_lang)
+AI_CANCELLED_MESSAGE = get_i18n_message("AI_CANCELLED_MESSAGE", lang=i18n_lang)
+AI_CACHED_RESPONSE_MESSAGE = get_i18n_message("AI_CACHED_RESPONSE_MESSAGE", lang=i18n_lang)
+
 # AI Model Selection / 使用する生成AIモデル
 AI_MODEL = "gpt-5.6-sol"
 # Example of available AI model names / 指定可能な生成AIモデル名例 (as of 2026.7.11)
@@ -346,6 +424,17 @@ LMSTUDIO_BASE_URL = "http://127.0.0.1:1234/v1"  # LMStudio local model URL (if u
 AI_CHAT_WIDTH = 550
 AI_CHAT_WINDOW_SLIDE_STEP = 20
 AI_CHAT_WINDOW_SLIDE_INTERVAL = 15  # ms
+AI_JOB_POLL_INTERVAL = 200  # ms (AI生成中に結果・経過時間を確認する間隔)
+AI_STREAMING = True  # AIの応答をストリーミングで受け取り、受信した行から順にキャンバスに描画する（受信中もキャンバスを編集できる）
+AI_STREAM_POLL_INTERVAL = 50  # ms (ストリーミング中に受信したテキストを確認する間隔)
+
+# AI Response Cache Parameters / AI応答キャッシュ・パラメータ
+AI_CACHE_PARAMS = {
+    "enabled": True,    # 同じ入力（AIの種類・モデル・システム指示・フロータイトル・詳細仕様）の応答をユーザーのキャッシュフォルダに保存し、次回以降はAIを呼び出さずに使用する（チャット欄の Cache で切替）
+    "dir_name": "ai_responses",     # キャッシュフォルダ内の保存先フォルダ名
+    "max_bytes": 20 * 1024 * 1024,  # 保存容量の上限（超えた場合は最後に使用した日時の古い応答から削除）
+    "max_age_days": 30,     # 保存期間（保存してからの日数。使用しても延長しない。None の場合は無期限）
+}
 
 AI_INPUT_TEMPLATE = get_i18n_ai_prompt_template("AI_INPUT_TEMPLATE", lang=i18n_lang)
 AI_SPEC_TEMPLATE = get_i18n_ai_prompt_template("AI_SPEC_TEMPLATE", lang=i18n_lang)
@@ -74,6 +74,13 @@ I18N_MESSAGE_DICT = {
 
     "UNSUPPORTED_AI_MODEL_MESSAGE.en" : "Unsupported AI model specified. Please check the AI_MODEL section in constants.py.",
     "UNSUPPORTED_AI_MODEL_MESSAGE.ja" : "未対応のAIモデルが指定されています。constants.pyのAI_MODEL欄を確認してください。",
+
+    "AI_GENERATING_MESSAGE.en" : "Generating... ($elapsed s)",
+    "AI_GENERATING_MESSAGE.ja" : "生成中です... ($elapsed 秒)",
+    "AI_CANCELLED_MESSAGE.en" : "Generation was cancelled.",
+    "AI_CANCELLED_MESSAGE.ja" : "生成を中止しました。",
+    "AI_CACHED_RESPONSE_MESSAGE.en" : "Loaded a saved response for the same input. (Uncheck Cache to generate again.)",
+    "AI_CACHED_RESPONSE_MESSAGE.ja" : "同じ入力の保存済みの応答を読み込みました。（再生成する場合は Cache のチェックを外してください）",
 }
 
 # Generative AI Prompt Template
@@ -1,13 +1,21 @@
 import tkinter as tk
 import constants as ct
+import canvas_item_registry
+import layer_manager
+import font_registry
 import node
+from edit_history import HistoryTracked
 from typing import Literal, Tuple
 from math import inf
 import platform
 
 LABEL_POSITION_LIST = ["auto", "p0se", "p0sw", "p0nw", "p0ne", "p1se", "p1sw", "p1nw", "p1ne", "p2se", "p2sw", "p2nw", "p2ne", "p3se", "p3sw", "p3nw", "p3ne", "p4se", "p4sw", "p4nw", "p4ne", "p5se", "p5sw", "p5nw", "p5ne"]
 
-class Edge:
+class Edge(HistoryTracked):
+    HISTORY_FIELDS = frozenset(("from_node_obj", "to_node_obj", "edge_type", "path_type", "line_style", "connection_mode",
+                                "from_node_connection_point", "to_node_connection_point", "edge_wrap_margin", "edge_wrap_ratio1", "edge_wrap_ratio2",
+                                "label_text", "label_position", "label_x", "label_y", "label_anchor", "label_justify"))   # to_dict() の対象
+
     line_id = None
     edge_type:Literal["elbow", "line"] = "elbow"  # "elbow", "line"のいずれか
     line_style:Literal["solid", "dashed", "dotted"] = "solid"  # "solid", "dashed", "dotted"のいずれか
@@ -47,6 +55,7 @@ class Edge:
                     label_x=None, label_y=None, canvas=None,\
                     label_position:Literal["auto", "p0se", "p0sw", "p0nw", "p0ne", "p1se", "p1sw", "p1nw", "p1ne", "p2se", "p2sw", "p2nw", "p2ne", "p3se", "p3sw", "p3nw", "p3ne", "p4se", "p4sw", "p4nw", "p4ne", "p5se", "p5sw", "p5nw", "p5ne"]="auto"):
         self.line_id = None
+        self.uid = None     # 編集履歴用の識別子（FlowchartToolで採番）
         self.edge_type = edge_type
         self.path_type = path_type
         if self.edge_type == ct.EDGE_TYPE_ELBOW and self.path_type is None:
@@ -120,9 +129,21 @@ class Edge:
                 tags=("edge")
             )
             # print(f"**2    Created line with ID: {self.line_id}")  # for DEBUG
-        # エッジはノードの下に
-        canvas.tag_lower(self.line_id, "node")
+        # エッジはノードの下に（エッジレイヤーに配置）
+        layer_manager.place(canvas, self.line_id, "edge")
+        # ヒットテスト用の逆引き登録
+        canvas_item_registry.register(canvas, self.line_id, self)
     
+    def delete(self, canvas:tk.Canvas):
+        """キャンバス上のエッジとラベルを削除（エッジのデータは保持）"""
+        canvas_item_registry.unregister(canvas, self.line_id, self.label_id)
+        if self.line_id is not None:
+            canvas.delete(self.line_id)
+            self.line_id = None
+        if self.label_id is not None:
+            canvas.delete(self.label_id)
+            self.label_id = None
+
     def get_dash_pattern(self):
         if self.line_style == ct.EDGE_LINE_STYLE_DASHED:
             return "-"  # 破線（パターン指定が効かない）
@@ -139,12 +160,14 @@ class Edge:
             self.label_id = canvas.create_text(
                 self.label_x, self.label_y,
                 text=self.label_text,
-                font=(ct.EDGE_PARAMS["font_family"], ct.EDGE_PARAMS["font_size"], ct.EDGE_PARAMS["font_weight"]), width=ct.EDGE_PARAMS["text_width"],
+                font=font_registry.get(ct.EDGE_PARAMS["font_family"], ct.EDGE_PARAMS["font_size"], ct.EDGE_PARAMS["font_weight"]), width=ct.EDGE_PARAMS["text_width"],
                 fill=self.color, anchor = self.label_anchor, justify = self.label_justify,
                 tags=("edge-label",)
             )
-            # ラベルもノードの下でOK（少し上に描かれるので視認性は保てる）
-            canvas.tag_raise(self.label_id, "node")
+            # ラベルもノードの下でOK（エッジより上のラベルレイヤーに配置）
+            layer_manager.place(canvas, self.label_id, "edge_label")
+            # ヒットテスト用の逆引き登録
+            canvas_item_registry.register(canvas, self.label_id, self)
 
     def _compute_edge_geometry(self, from_node_obj: node.Node, to_node_obj: node.Node):
         """直線またはかぎ線の頂点の座標とラベル位置を計算"""
@@ -0,0 +1,326 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+import pickle
+import sys
+import zlib
+
+import constants as ct
+
+# 履歴で管理するモデルの種類
+# nodes: node_id -> ノードデータ, notes: node_id -> ノートデータ, edges: edge uid -> エッジデータ, swimlanes: swimlane uid -> スイムレーンデータ
+HISTORY_CATEGORIES = ("nodes", "notes", "edges", "swimlanes")
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    """1オブジェクト・1バージョン分の不変な記録
+
+    変更のなかったオブジェクトは同じ HistoryRecord を複数の履歴で共有する
+    """
+    category: str
+    key: int
+    version: int
+    data: Mapping
+    size: int
+
+@dataclass
+class HistoryCommand:
+    """1回の編集操作の差分（forward: やり直し用、inverse: 元に戻す用）
+
+    差分は {種類: {キー: HistoryRecord or None}} の形式で、None はそのオブジェクトが存在しないことを表す
+    圧縮済みの場合は forward/inverse が None になり、compressed に zlib 圧縮したデータを保持する
+    """
+    forward: Optional[Dict[str, Dict[int, Optional[HistoryRecord]]]] = field(default_factory=dict)
+    inverse: Optional[Dict[str, Dict[int, Optional[HistoryRecord]]]] = field(default_factory=dict)
+    compressed: Optional[bytes] = None
+
+    def is_empty(self) -> bool:
+        return all(len(delta) == 0 for delta in self.forward.values())
+
+    def records(self) -> Iterator[HistoryRecord]:
+        for delta in (self.forward, self.inverse):
+            if delta is None:
+                continue
+            for category_delta in delta.values():
+                for record in category_delta.values():
+                    if record is not None:
+                        yield record
+
+class HistoryTracked:
+    """履歴に記録する属性（HISTORY_FIELDS）が変更されたときに history_listener を呼び出すモデルオブジェクトの基底クラス
+
+    編集履歴は、通知のあったオブジェクトだけを記録し直す（モデル全体を毎回辞書化・比較しない）
+    """
+    HISTORY_FIELDS: frozenset = frozenset()
+    history_listener = None     # history_listener(obj)（モデルに登録した時点で設定される）
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.HISTORY_FIELDS:
+            listener = self.history_listener
+            if listener is not None:
+                listener(self)
+
+def _estimate_size(data: dict) -> int:
+    """記録1件のおおよそのメモリ使用量（バイト）"""
+    size = sys.getsizeof(data)
+    for key, value in data.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+class EditHistory:
+    """差分ベースの編集履歴（Undo/Redo用）
+
+    メモリ使用量が memory_budget を超えた場合は、古い履歴から zlib 圧縮し（compress=True の場合）、
+    それでも超える場合は古い履歴から破棄する
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None, compress: Optional[bool] = None, keep_uncompressed: Optional[int] = None):
+        self.memory_budget = ct.HISTORY_PARAMS["memory_budget"] if memory_budget is None else memory_budget
+        self.compress = ct.HISTORY_PARAMS["compress"] if compress is None else compress
+        self.keep_uncompressed = ct.HISTORY_PARAMS["keep_uncompressed"] if keep_uncompressed is None else keep_uncompressed
+
+        self.commands: List[HistoryCommand] = []
+        self.index = -1     # 最後に適用済みのコマンド位置（-1 は初期状態）
+        self.records: Dict[str, Dict[int, HistoryRecord]] = {category: {} for category in HISTORY_CATEGORIES}  # 最後に記録したモデルの状態
+
+        self._versions: Dict[Tuple[str, int], int] = {}   # (種類, キー) -> 最新バージョン
+        self._record_refs: Dict[Tuple[str, int, int], int] = {}   # (種類, キー, バージョン) -> 履歴からの参照数
+        self._record_bytes = 0      # 履歴から参照されている記録の合計サイズ
+        self._compressed_bytes = 0  # 圧縮済み履歴の合計サイズ
+
+    def commit(self, records: Dict[str, dict], merge: bool = False) -> bool:
+        """現在のモデル全体の状態を受け取り、前回記録時からの差分をコマンドとして追加する"""
+        changes = {}
+        for category in HISTORY_CATEGORIES:
+            new_records = records.get(category, {})
+            category_changes = dict(new_records)
+            for key in self.records.get(category, {}):
+                if key not in new_records:
+                    category_changes[key] = None
+            changes[category] = category_changes
+        return self.commit_changes(changes, merge=merge)
+
+    def commit_changes(self, changes: Dict[str, Dict[int, Optional[dict]]], merge: bool = False) -> bool:
+        """変更のあったオブジェクトの現在の状態（削除された場合は None）だけを受け取り、前回記録時からの差分をコマンドとして追加する
+
+        受け取らなかったオブジェクトは前回記録時から変更がないものとして扱う（処理時間は変更のあったオブジェクト数に比例）
+        merge=True の場合は、最後のコマンド（Redo用の履歴がない場合のみ）に差分をまとめ、1回の Undo で取り消せるようにする
+        """
+        command = HistoryCommand()
+        for category in HISTORY_CATEGORIES:
+            records = self.records.setdefault(category, {})
+            forward = {}
+            inverse = {}
+            for key, data in changes.get(category, {}).items():
+                pre_record = records.get(key)
+                if data is None:
+                    if pre_record is None:
+                        continue
+                    del records[key]
+                    forward[key] = None
+                    inverse[key] = pre_record
+                elif pre_record is not None and pre_record.data == data:
+                    continue    # 変更のない記録は共有
+                else:
+                    new_record = self._new_record(category, key, data)
+                    records[key] = new_record
+                    forward[key] = new_record
+                    inverse[key] = pre_record
+            command.forward[category] = forward
+            command.inverse[category] = inverse
+
+        if command.is_empty():
+            return False
+
+        if merge and self.index >= 0 and self.index == len(self.commands) - 1:
+            self._merge_into_last(command)
+            self._enforce_memory_budget()
+            return True
+
+        # Redo用の履歴を破棄してから追加
+        for redo_command in self.commands[self.index + 1:]:
+            self._release(redo_command)
+        del self.commands[self.index + 1:]
+        self.commands.append(command)
+        self.index += 1
+        self._retain(command)
+
+        self._enforce_memory_budget()
+        return True
+
+    def last_command(self) -> Optional[HistoryCommand]:
+        """最後に適用済みのコマンド（初期状態の場合は None）"""
+        return self.commands[self.index] if self.index >= 0 else None
+
+    def can_undo(self) -> bool:
+        return self.index >= 0
+
+    def can_redo(self) -> bool:
+        return self.index < len(self.commands) - 1
+
+    def undo(self) -> Optional[Dict[str, dict]]:
+        """1つ前の状態に戻すための差分を返す"""
+        if not self.can_undo():
+            return None
+        command = self.commands[self.index]
+        self._decompress(command)
+        self.index -= 1
+        self._apply_to_records(command.inverse)
+        delta = self._to_plain_delta(command.inverse)
+        self._enforce_memory_budget()   # 展開したコマンドを再び圧縮対象にする
+        return delta
+
+    def redo(self) -> Optional[Dict[str, dict]]:
+        """1つ先の状態に進めるための差分を返す"""
+        if not self.can_redo():
+            return None
+        self.index += 1
+        command = self.commands[self.index]
+        self._decompress(command)
+        self._apply_to_records(command.forward)
+        delta = self._to_plain_delta(command.forward)
+        self._enforce_memory_budget()   # 展開したコマンドを再び圧縮対象にする
+        return delta
+
+    def committed_state(self) -> Dict[str, Dict[int, dict]]:
+        """最後に記録した（または Undo/Redo で戻した）モデルの状態"""
+        return {
+            category: {key: dict(record.data) for key, record in category_records.items()}
+            for category, category_records in self.records.items()
+        }
+
+    def footprint(self) -> dict:
+        """履歴のメモリ使用量（概算）を返す"""
+        compressed_commands = sum(1 for command in self.commands if command.compressed is not None)
+        # 現在の状態の記録のうち、履歴から参照されていないもの（履歴と共有している記録は record_bytes に含まれる）
+        live_bytes = sum(
+            record.size for category_records in self.records.values() for record in category_records.values()
+            if (record.category, record.key, record.version) not in self._record_refs
+        )
+        return {
+            "total_bytes": self._record_bytes + self._compressed_bytes + live_bytes,
+            "record_bytes": self._record_bytes,
+            "compressed_bytes": self._compressed_bytes,
+            "live_record_bytes": live_bytes,
+            "records": len(self._record_refs),
+            "commands": len(self.commands),
+            "compressed_commands": compressed_commands,
+            "memory_budget": self.memory_budget,
+        }
+
+    def _new_record(self, category: str, key: int, data: dict) -> HistoryRecord:
+        version = self._versions.get((category, key), 0) + 1
+        self._versions[(category, key)] = version
+        data = dict(data)
+        return HistoryRecord(category=category, key=key, version=version, data=MappingProxyType(data), size=_estimate_size(data))
+
+    def _retain(self, command: HistoryCommand):
+        for record in command.records():
+            ref_key = (record.category, record.key, record.version)
+            ref_count = self._record_refs.get(ref_key, 0)
+            if ref_count == 0:
+                self._record_bytes += record.size
+            self._record_refs[ref_key] = ref_count + 1
+
+    def _release(self, command: HistoryCommand):
+        if command.compressed is not None:
+            self._compressed_bytes -= len(command.compressed)
+            return
+        for record in command.records():
+            ref_key = (record.category, record.key, record.version)
+            ref_count = self._record_refs.get(ref_key, 0) - 1
+            if ref_count <= 0:
+                self._record_refs.pop(ref_key, None)
+                self._record_bytes -= record.size
+            else:
+                self._record_refs[ref_key] = ref_count
+
+    def _merge_into_last(self, command: HistoryCommand):
+        """最後のコマンドに差分をまとめる（同じオブジェクトは最初の変更前の状態と最新の状態だけを残し、差分がなくなったコマンドは削除）"""
+        last = self.commands[self.index]
+        self._decompress(last)
+        self._release(last)
+        for category in HISTORY_CATEGORIES:
+            forward = last.forward.setdefault(category, {})
+            inverse = last.inverse.setdefault(category, {})
+            for key, record in command.forward[category].items():
+                if key not in inverse:
+                    inverse[key] = command.inverse[category][key]
+                forward[key] = record
+                pre_record = inverse[key]
+                if (record is None and pre_record is None) or (record is not None and pre_record is not None and record.data == pre_record.data):
+                    del forward[key]    # まとめた結果、変更がなくなった
+                    del inverse[key]
+        if last.is_empty():
+            self.commands.pop()
+            self.index -= 1
+        else:
+            self._retain(last)
+
+    def _enforce_memory_budget(self):
+        while self._record_bytes + self._compressed_bytes > self.memory_budget:
+            # 古い履歴から圧縮（直近の履歴は圧縮しない）
+            if self.compress and self._compress_oldest():
+                continue
+            # 古い履歴から破棄（適用済みの履歴のみ）
+            if self.index >= 0 and len(self.commands) > 1:
+                self._release(self.commands.pop(0))
+                self.index -= 1
+                continue
+            break
+
+    def _compress_oldest(self) -> bool:
+        for command in self.commands[:max(0, len(self.commands) - self.keep_uncompressed)]:
+            if command.compressed is None:
+                self._compress(command)
+                return True
+        return False
+
+    def _compress(self, command: HistoryCommand):
+        payload = {}
+        for name, delta in (("forward", command.forward), ("inverse", command.inverse)):
+            payload[name] = {
+                category: {key: (record.version, dict(record.data)) if record is not None else None for key, record in category_delta.items()}
+                for category, category_delta in delta.items()
+            }
+        self._release(command)
+        command.compressed = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        command.forward = None
+        command.inverse = None
+        self._compressed_bytes += len(command.compressed)
+
+    def _decompress(self, command: HistoryCommand):
+        if command.compressed is None:
+            return
+        payload = pickle.loads(zlib.decompress(command.compressed))
+        self._compressed_bytes -= len(command.compressed)
+        command.compressed = None
+        for name in ("forward", "inverse"):
+            delta = {}
+            for category, category_payload in payload[name].items():
+                delta[category] = {}
+                for key, value in category_payload.items():
+                    if value is None:
+                        delta[category][key] = None
+                    else:
+                        version, data = value
+                        delta[category][key] = HistoryRecord(category=category, key=key, version=version, data=MappingProxyType(data), size=_estimate_size(data))
+            setattr(command, name, delta)
+        self._retain(command)
+
+    def _apply_to_records(self, delta: Dict[str, dict]):
+        for category, category_delta in delta.items():
+            records = self.records.setdefault(category, {})
+            for key, record in category_delta.items():
+                if record is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = record
+
+    @staticmethod
+    def _to_plain_delta(delta: Dict[str, dict]) -> Dict[str, dict]:
+        return {
+            category: {key: dict(record.data) if record is not None else None for key, record in category_delta.items()}
+            for category, category_delta in delta.items()
+        }
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import constants as ct
+from node import Node
+from edge import Edge
+from note import Note
+from swimlane import Swimlane
+
+Bounds = Tuple[float, float, float, float]  # (left, top, right, bottom)
+
+@dataclass
+class ExportScene:
+    """画像・ベクター出力用のモデル一式（キャンバス・Tkウィンドウに依存しない）"""
+    nodes: List[Node] = field(default_factory=list)
+    edges: List[Edge] = field(default_factory=list)
+    notes: List[Note] = field(default_factory=list)
+    swimlanes: List[Swimlane] = field(default_factory=list)
+
+    def visible_notes(self) -> Iterator[Note]:
+        for note_obj in self.notes:
+            if note_obj.base_node is not None and note_obj.display_state != "hidden" and note_obj.text:
+                yield note_obj
+
+    def bounds(self, margin: float = 0) -> Optional[Bounds]:
+        """全オブジェクトの外接矩形（オブジェクトがない場合は None）"""
+        rects = [node_bounds(node_obj) for node_obj in self.nodes]
+        rects += [edge_bounds(edge_obj) for edge_obj in self.edges if edge_obj.points]
+        rects += [note_bounds(note_obj) for note_obj in self.visible_notes()]
+        rects += [swimlane_bounds(swimlane_obj) for swimlane_obj in self.swimlanes]
+        if not rects:
+            return None
+        return (
+            min(rect[0] for rect in rects) - margin, min(rect[1] for rect in rects) - margin,
+            max(rect[2] for rect in rects) + margin, max(rect[3] for rect in rects) + margin,
+        )
+
+def node_bounds(node_obj: Node) -> Bounds:
+    return (node_obj.x - node_obj.w / 2, node_obj.y - node_obj.h / 2, node_obj.x + node_obj.w / 2, node_obj.y + node_obj.h / 2)
+
+def node_points(node_obj: Node) -> List[float]:
+    """ノードの図形の頂点座標（Node.draw と同じ形状）"""
+    return {
+        ct.NODE_PROCESS_PARAMS["type"]: node_obj.get_process_points,
+        ct.NODE_DECISION_PARAMS["type"]: node_obj.get_decision_points,
+        ct.NODE_TERMINATOR_PARAMS["type"]: node_obj.get_terminator_points,
+        ct.NODE_IO_PARAMS["type"]: node_obj.get_io_points,
+        ct.NODE_STORAGE_PARAMS["type"]: node_obj.get_storage_points,
+        ct.NODE_DOCUMENT_PARAMS["type"]: node_obj.get_document_points,
+    }.get(node_obj.type, node_obj.get_undefined_points)()
+
+def node_text_position(node_obj: Node) -> Tuple[float, float]:
+    """ノードのテキストの中心位置（Node.draw_text と同じ位置）"""
+    if node_obj.type == ct.NODE_STORAGE_PARAMS["type"]:
+        return node_obj.x, node_obj.y + node_obj.h / 10
+    elif node_obj.type == ct.NODE_DOCUMENT_PARAMS["type"]:
+        return node_obj.x, node_obj.y - node_obj.h / 10
+    return node_obj.x, node_obj.y
+
+def note_rect(note_obj: Note) -> Bounds:
+    x = note_obj.base_node.x + note_obj.dx
+    y = note_obj.base_node.y + note_obj.dy
+    return (x - ct.NOTE_PARAMS["width"] / 2, y - ct.NOTE_PARAMS["height"] / 2, x + ct.NOTE_PARAMS["width"] / 2, y + ct.NOTE_PARAMS["height"] / 2)
+
+def note_line(note_obj: Note) -> List[float]:
+    """ノードとノートを結ぶ線の座標 [x1, y1, x2, y2]"""
+    left, top, right, bottom = note_rect(note_obj)
+    # 描画済みかどうかによらずモデルの位置から求める（ノートの属性は変更しない）
+    area = SimpleNamespace(x=(left + right) / 2, y=(top + bottom) / 2, w=right - left, h=bottom - top)
+    return note_obj.line_anchor(note_obj.base_node, area)
+
+def note_bounds(note_obj: Note) -> Bounds:
+    left, top, right, bottom = note_rect(note_obj)
+    x1, y1, x2, y2 = note_line(note_obj)
+    return (min(left, x1, x2), min(top, y1, y2), max(right, x1, x2), max(bottom, y1, y2))
+
+def edge_bounds(edge_obj: Edge) -> Bounds:
+    xs = edge_obj.points[0::2]
+    ys = edge_obj.points[1::2]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def swimlane_bounds(swimlane_obj: Swimlane) -> Bounds:
+    return (swimlane_obj.top_left_x, swimlane_obj.top_left_y, swimlane_obj.top_left_x + swimlane_obj.width, swimlane_obj.top_left_y + swimlane_obj.height)
+
+def from_objects(nodes, edges, notes, swimlanes) -> ExportScene:
+    """編集中のモデル（FlowchartTool の nodes/edges/notes/swimlanes）から作成"""
+    return ExportScene(nodes=list(nodes), edges=[edge_obj for edge_obj in edges if edge_obj.points], notes=list(notes), swimlanes=list(swimlanes))
+
+def from_model_data(data: dict) -> ExportScene:
+    """export_model() の出力（保存したJSON）から作成"""
+    scene = ExportScene()
+    nodes_by_id: Dict[int, Node] = {}
+    for nd in data.get("nodes", []):
+        nid = nd.get("id")
+        if nid is None:
+            continue
+        node_type = nd.get("type", ct.NODE_PROCESS_PARAMS["type"])
+        node_obj = Node(
+            nid, node_type, nd.get("x", 0), nd.get("y", 0),
+            w=nd.get("w", Node.get_width_of_type(node_type)), h=nd.get("h", Node.get_height_of_type(node_type)),
+            shape_type=nd.get("shape_type", None), fill_color=nd.get("fill_color", None),
+            text=nd.get("text", ""), status=nd.get("status", None), details=nd.get("details", None),
+        )
+        nodes_by_id[nid] = node_obj
+        scene.nodes.append(node_obj)
+
+        if node_obj.details is not None:
+            note_data = nd.get("note") or {}
+            # Note の初期化はフォントを作成するため、キャンバスなしの空のノートに属性を設定する
+            note_obj = Note()
+            note_obj.base_node = node_obj
+            note_obj.text = node_obj.details
+            note_obj.dx = ct.NOTE_PARAMS["dx"] if note_data.get("dx") is None else note_data.get("dx")
+            note_obj.dy = ct.NOTE_PARAMS["dy"] if note_data.get("dy") is None else note_data.get("dy")
+            note_obj.display_state = note_data.get("display_state") or ct.NOTE_PARAMS.get("state", "normal")
+            scene.notes.append(note_obj)
+
+    for ed in data.get("edges", []):
+        from_node_obj = nodes_by_id.get(ed.get("from_id"))
+        to_node_obj = nodes_by_id.get(ed.get("to_id"))
+        if from_node_obj is None or to_node_obj is None:
+            continue
+        edge_type = ed.get("edge_type", ct.EDGE_TYPE_ELBOW)
+        path_type = ed.get("path_type", ct.EDGE_PARAMS["path_type"]) if edge_type == ct.EDGE_TYPE_ELBOW else None
+        default_line_style = ct.EDGE_PARAMS["line_style"] if edge_type == ct.EDGE_TYPE_ELBOW else ct.EDGE_LINE_STYLE_DOTTED
+        edge_obj = Edge(
+            edge_type=edge_type, path_type=path_type, line_style=ed.get("line_style", default_line_style),
+            from_node_obj=from_node_obj, to_node_obj=to_node_obj, text=ed.get("label"),
+            connection_mode=ed.get("connection_mode", None),
+            from_node_connection_point=ed.get("from_connection_point", None),
+            to_node_connection_point=ed.get("to_connection_point", None),
+            edge_wrap_margin=ed.get("edge_wrap_margin", None),
+            label_position=ed.get("label_position", None),
+        )
+        if edge_obj.points:
+            scene.edges.append(edge_obj)
+
+    for sd in data.get("swimlanes", []):
+        scene.swimlanes.append(Swimlane(
+            canvas=None, kind=sd.get("kind", ct.SWIMLANE_PARAMS["kind"]), title=sd.get("title", ct.SWIMLANE_PARAMS["title"]),
+            header_center_x=sd.get("header_center_x", 0), header_center_y=sd.get("header_center_y", 0),
+            width=sd.get("width", 0), height=sd.get("height", 0), fill_color=sd.get("fill_color", ct.SWIMLANE_PARAMS["fill_color"]),
+        ))
+
+    return scene
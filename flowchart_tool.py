@@ -1,25 +1,28 @@
+import startup_profile   # 起動時間の計測（他のモジュールより先に読み込む）
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import itertools
 import json
-from PIL import ImageGrab
 import os
+import queue
 import threading
 from tkinter import messagebox
-from openai import OpenAI
-from dotenv import load_dotenv
 from pathlib import Path
 import re
 from PIL import Image, ImageDraw, ImageTk, ImageFont
 import sys
 from typing import Dict, List, Optional, Tuple, Literal
-import webbrowser
+from contextlib import contextmanager
 
 import mermaid_flowdata_loader as mfloader
 import mermaid_flowdata_saver as mfsaver
 import constants as ct
+import canvas_item_registry
+import layer_manager
+import font_registry
 import node
 from node import Node
+import node_style
 import edge
 from edge import Edge
 import swimlane
@@ -27,6 +30,11 @@ from swimlane import Swimlane
 import note
 from note import Note
 from modal_window import ModalWindow, ResizeCanvasModal
+from edit_history import EditHistory, HISTORY_CATEGORIES
+from spatial_index import SpatialIndex
+import export_scene
+import image_renderer
+import icon_atlas
 import generative_ai_interface
 from generative_ai_interface import Generative_AI_interface
 
@@ -34,12 +42,14 @@ import platform
 if platform.system() == "Windows":
     import windows_monitor_info as wmi
 
+startup_profile.mark("import modules")
+
 class FlowchartTool(tk.Tk):
     def __init__(self):
         super().__init__()
+        startup_profile.mark("create Tk window")
 
-        # 環境変数読み込み
-        load_dotenv()   # .envファイルの読み込み
+        # 環境変数（.envファイル）は constants の読み込み時に読み込み済み
 
         self.title(ct.APP_TITLE)
 
@@ -52,6 +62,7 @@ class FlowchartTool(tk.Tk):
         self.grid_on = tk.BooleanVar(value=True)  # グリッド表示ON/OFF
         self.note_on = tk.BooleanVar(value=True)  # ノート表示ON/OFF
         self.ai_chat_window_on = tk.BooleanVar(value=False)  # チャットウィンドウ表示ON/OFF
+        self.ai_cache_on = tk.BooleanVar(value=True)  # 同じ入力のAI応答のキャッシュを使用ON/OFF
 
         # 登録済みノード情報
         self.nodes: dict[int, Node] = {}   # node_id -> dict
@@ -60,6 +71,10 @@ class FlowchartTool(tk.Tk):
 
         # 登録済みエッジ情報
         self.edges: dict[int, Edge] = {}   # line_id -> list of edge dict
+        self.edges_out: dict[int, set[int]] = {}   # from_node_id -> 出力エッジのline_idセット
+        self.edges_in: dict[int, set[int]] = {}    # to_node_id -> 入力エッジのline_idセット
+        self.edge_by_pair: dict[tuple[int, int], Edge] = {}  # (from_node_id, to_node_id) -> Edgeオブジェクト
+        self.edges_by_uid: dict[int, Edge] = {}  # エッジの履歴用識別子(uid) -> Edgeオブジェクト
         self.selected_edge_id = None    # 選択中のエッジLine_ID
         self.link_start_node_id = None  # リンク始点ノードID
 
@@ -69,8 +84,12 @@ class FlowchartTool(tk.Tk):
 
         # 登録済みノート情報
         self.notes: dict[int, Note] = {}  # note_id -> Noteオブジェクト
+        self.notes_by_node_id: dict[int, Note] = {}  # node_id -> Noteオブジェクト
 
         self.current_swimlane_kind = "Swimlane_" + ct.SWIMLANE_PARAMS["kind"]  # スイムレーンの種類（垂直 or 水平）
+
+        # ノード・エッジ・ノート・スイムレーンの空間インデックス（モデル座標）
+        self.spatial_index = SpatialIndex()
         self.current_terminator_kind = "Terminator"  # ターミネータの種類（通常 or 小さいやつ）
         if ct.NODE_PROCESS_PARAMS["shape_type"] == "rectangle":
             self.current_process_kind = "rectangle"
@@ -97,12 +116,34 @@ class FlowchartTool(tk.Tk):
         self.temporary_node: Node|None = None  # ノード作成中の一時的なノードオブジェクト
         self.temporary_edge: Edge|None = None  # リンク作成中の一時的なエッジオブジェクト
 
+        # AIの応答を受信しながら構築中の状態（begin_mermaid_stream）
+        self.mermaid_stream = None
+
         # self.drag_node_data = {"mode": None, "node_id": None, "start_x": 0, "start_y": 0, "end_x": 0, "end_y": 0}
         # self.drag_swimlane_data = {"kind": ct.SWIMLANE_PARAMS["kind"], "frame_id": None, "top_id": None, "bottom_id": None, "drag_start_x": 0, "drag_start_y": 0, "drag_pre_x": 0, "drag_pre_y": 0}
 
         # 履歴（Undo/Redo）
-        self.history = []
-        self.history_index = -1
+        self.history = EditHistory()
+        self._uid_counter = itertools.count(1)   # エッジ・スイムレーンの履歴用識別子カウンタ
+        self._batch_depth = 0   # history_batch() のネスト数
+        self._batch_pending = set()   # バッチ終了時にまとめて実行する処理（"history", "resize", "grid"）
+        self._history_dirty = {category: set() for category in HISTORY_CATEGORIES}  # 前回の履歴記録以降に変更・追加・削除されたオブジェクトのキー
+        self._history_dirty_all = True  # モデル全体を置き換えた（次回の履歴記録はモデル全体から差分を求める）
+
+        # 表示領域に応じた描画（仮想化描画）
+        self._defer_drawing = False   # True の間は、新規オブジェクトをキャンバスに描画しない（refresh_viewport で描画）
+        self._virtualized = False   # 仮想化描画で未描画のオブジェクトが存在する可能性があるか
+        self._viewport_drawn = {}   # 仮想化描画中に描画済みのノード・エッジ・ノート id(obj) -> obj（削除済みのものを含むことがある）
+        self._viewport_refresh_pending = False   # refresh_viewport の実行予約済みか
+        self._grid_area = None   # グリッド描画済みの範囲 (left, top, right, bottom)
+
+        # ドラッグ描画の間引き
+        self._drag_frame = None   # 次のアイドル時に反映する (処理, 最新のイベント)
+        self._drag_frame_id = None   # after_idle の予約ID
+        self._drag_relayout_node_ids = set()   # 関連エッジ・ノートの再レイアウトを保留中のノードID
+        self._drag_relayout_edges = set()   # 再レイアウトを保留中のエッジ
+        self._drag_settle_id = None   # ポインタ停止判定用の after の予約ID
+        self._group_drag = None   # 複数選択ドラッグ中の情報 {"node_origins":..., "inner_edges":..., "boundary_edges":..., "dx":..., "dy":...}
 
         # テキスト編集用
         self.text_edit = None  # {"entry":..., "node_id":..., "window_id":...}
@@ -110,16 +151,23 @@ class FlowchartTool(tk.Tk):
         self.swimlane_label_edit = None  # {"entry":..., "swimlane_obj":..., "window_id":...}
         self.note_text_edit = None  # {"entry":..., "note_obj":..., "window_id":...}
 
+        startup_profile.mark("initialize state")
         self._build_ui()    # UI構築
 
         self.push_history()  # 初期状態を履歴に追加
+        startup_profile.mark("build UI")
+
+        if startup_profile.ENABLED:
+            # 最初のイベント処理（キャンバスの表示）までの時間を出力
+            self.after_idle(startup_profile.report)
 
     # ------------ UI構築 ------------
 
     def _build_ui(self):
         # UI画面構築
 
-        self.store_icons()   # アイコンの読み込みと保存
+        with startup_profile.section("load icons"):
+            self.store_icons()   # アイコンの読み込みと保存
 
         # -------------------------
         # 重要：コンテナを作って、全部 place で重ねる（安定）
@@ -220,7 +268,7 @@ class FlowchartTool(tk.Tk):
         self.scrollbar_x.grid(row=1, column=0, sticky="ew")
         self.scrollbar_y = ttk.Scrollbar(self.main_panel, orient=tk.VERTICAL, command=self.canvas.yview)
         self.scrollbar_y.grid(row=0, column=1, sticky="ns")
-        self.canvas.config(xscrollcommand=self.scrollbar_x.set, yscrollcommand=self.scrollbar_y.set)
+        self.canvas.config(xscrollcommand=self.on_canvas_xscroll, yscrollcommand=self.on_canvas_yscroll)
 
         # マウス操作定義
         # Mouse Button-1 definition
@@ -319,7 +367,8 @@ class FlowchartTool(tk.Tk):
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # ---- 生成AI KEY読み取りと AI clientの初期設定 ----
-        self.ai_interface = Generative_AI_interface()
+        with startup_profile.section("create AI interface"):
+            self.ai_interface = Generative_AI_interface()
 
         # -------------------------
         # チャットパネル（Frame）
@@ -344,6 +393,9 @@ class FlowchartTool(tk.Tk):
         # ボタン
         self.send_btn = tk.Button(input_frame, text="Generate", command=self.on_send_to_ai)
         self.send_btn.pack(side=tk.LEFT, padx=(6, 0))
+        # キャッシュ使用ON/OFF（OFFの場合は同じ入力でもAIを呼び出して再生成する）
+        if ct.AI_CACHE_PARAMS["enabled"]:
+            tk.Checkbutton(input_frame, text="Cache", bg="#eeeeee", font=("Arial", 9), variable=self.ai_cache_on).pack(side=tk.LEFT, padx=(4, 0))
 
         # 詳細仕様フレーム
         spec_frame = tk.Frame(self.ai_chat_frame, bg="#eeeeee")
@@ -367,6 +419,11 @@ class FlowchartTool(tk.Tk):
         self.ai_chat_text = tk.Text(self.ai_chat_frame, wrap="word")
         self.ai_chat_text.pack(fill="both", expand=True, padx=6, pady=6)
         self.ai_chat_text.configure(state="disabled")
+        self.ai_chat_text.tag_configure("progress", foreground="#6b7280")   # 生成中の進捗表示
+
+        # 実行中のAI生成（AIJob）
+        self.ai_job = None
+        self.ai_job_prompts = (None, None)   # 生成中の (フロータイトル, 詳細仕様)
 
         # ChatWindow表示On/OFFボタン
         if self.ai_interface is not None and self.ai_interface.ai_type is not None and self.ai_interface.ai_model is not None:
@@ -381,6 +438,7 @@ class FlowchartTool(tk.Tk):
         self.after(0, self.on_resize_simple)
 
     def show_manual(self):
+        import webbrowser   # マニュアル表示時にのみ使用するため、起動を速くするためにここで読み込む
         manual_abs_path = os.path.abspath("manual.html")
         webbrowser.open(f"file://{manual_abs_path}")
 
@@ -439,104 +497,12 @@ class FlowchartTool(tk.Tk):
         return (x0, y0, x1, y1)
 
     def get_data_area(self, margin: float) -> Tuple[float, float, float, float] | None:
-        # 登録されているノードとリンクとスイムレーンの位置情報から、データが存在するエリアの範囲を取得する
-        node_min_x, node_max_x = None, None
-        node_min_y, node_max_y = None, None
-        if self.nodes is not None and len(self.nodes) > 0:
-            for node_obj in self.nodes.values():
-                if node_min_x is None:
-                    node_min_x = node_obj.x - node_obj.w/2
-                else:
-                    node_min_x = min(node_min_x, node_obj.x - node_obj.w/2)
-                if node_max_x is None:
-                    node_max_x = node_obj.x + node_obj.w/2
-                else:
-                    node_max_x = max(node_max_x, node_obj.x + node_obj.w/2)
-                if node_min_y is None:
-                    node_min_y = node_obj.y - node_obj.h/2
-                else:
-                    node_min_y = min(node_min_y, node_obj.y - node_obj.h/2)
-                if node_max_y is None:
-                    node_max_y = node_obj.y + node_obj.h/2
-                else:
-                    node_max_y = max(node_max_y, node_obj.y + node_obj.h/2)
-        # print(f"Node area: ({node_min_x}, {node_min_y}) - ({node_max_x}, {node_max_y})")
-
-        edge_min_x, edge_max_x = None, None
-        edge_min_y, edge_max_y = None, None
-        if self.edges is not None and len(self.edges) > 0:
-            for edge_obj in self.edges.values():
-                if edge_obj.points is not None and len(edge_obj.points) > 0:
-                    for i, value in enumerate(edge_obj.points):
-                        if i % 2 == 0:  # x座標
-                            x = value
-                            if edge_min_x is None:
-                                edge_min_x = x
-                            else:
-                                edge_min_x = min(edge_min_x, x)
-                            if edge_max_x is None:
-                                edge_max_x = x
-                            else:
-                                edge_max_x = max(edge_max_x, x)
-                        else:  # y座標
-                            y = value
-                            if edge_min_y is None:
-                                edge_min_y = y
-                            else:
-                                edge_min_y = min(edge_min_y, y)
-                            if edge_max_y is None:
-                                edge_max_y = y
-                            else:
-                                edge_max_y = max(edge_max_y, y)
-        # print(f"Edge area: ({edge_min_x}, {edge_min_y}) - ({edge_max_x}, {edge_max_y})")
-
-        swimlane_min_x, swimlane_max_x = None, None
-        swimlane_min_y, swimlane_max_y = None, None
-        for swimlane in self.swimlanes:
-            if swimlane_min_x is None:
-                swimlane_min_x = swimlane.top_left_x
-            else:
-                swimlane_min_x = min(swimlane_min_x, swimlane.top_left_x)
-            if swimlane_max_x is None:
-                swimlane_max_x = swimlane.top_left_x + swimlane.width
-            else:
-                swimlane_max_x = max(swimlane_max_x, swimlane.top_left_x + swimlane.width)
-            if swimlane_min_y is None:
-                swimlane_min_y = swimlane.top_left_y
-            else:
-                swimlane_min_y = min(swimlane_min_y, swimlane.top_left_y)
-            if swimlane_max_y is None:
-                swimlane_max_y = swimlane.top_left_y + swimlane.height
-            else:
-                swimlane_max_y = max(swimlane_max_y, swimlane.top_left_y + swimlane.height)
-        # print(f"Swimlane area: ({swimlane_min_x}, {swimlane_min_y}) - ({swimlane_max_x}, {swimlane_max_y})")
-
-        note_min_x, note_max_x = None, None
-        note_min_y, note_max_y = None, None
-        for note_obj in self.notes.values():
-            # print(f"Note x: {note_obj.x}, y: {note_obj.y}, w: {note_obj.w}, h: {note_obj.h}")
-            if note_min_x is None:
-                note_min_x = note_obj.x - note_obj.w / 2
-            else:
-                note_min_x = min(note_min_x, note_obj.x - note_obj.w / 2)
-            if note_max_x is None:
-                note_max_x = note_obj.x + note_obj.w / 2
-            else:
-                note_max_x = max(note_max_x, note_obj.x + note_obj.w / 2)
-            if note_min_y is None:
-                note_min_y = note_obj.y - note_obj.h / 2
-            else:
-                note_min_y = min(note_min_y, note_obj.y - note_obj.h / 2)
-            if note_max_y is None:
-                note_max_y = note_obj.y + note_obj.h / 2
-            else:
-                note_max_y = max(note_max_y, note_obj.y + note_obj.h / 2)
-        # print(f"Note area: ({note_min_x}, {note_min_y}) - ({note_max_x}, {note_max_y})")
-
-        min_x = self.get_min(node_min_x, edge_min_x, swimlane_min_x, note_min_x)
-        max_x = self.get_max(node_max_x, edge_max_x, swimlane_max_x, note_max_x)
-        min_y = self.get_min(node_min_y, edge_min_y, swimlane_min_y, note_min_y)
-        max_y = self.get_max(node_max_y, edge_max_y, swimlane_max_y, note_max_y)
+        # 登録されているノードとリンクとスイムレーンとノートの位置情報から、データが存在するエリアの範囲を取得する
+        # 範囲は空間インデックスで差分管理しているため、オブジェクト数によらず一定時間で取得できる
+        data_extent = self.spatial_index.extent()
+        if data_extent is None:
+            return None
+        min_x, min_y, max_x, max_y = data_extent
         # print(f"Data area (combined): ({min_x}, {min_y}) - ({max_x}, {max_y})")
 
         if min_x is None or min_y is None or max_x is None or max_y is None:
@@ -550,34 +516,221 @@ class FlowchartTool(tk.Tk):
             max_y += margin
             return (min_x, min_y, max_x, max_y)
     
-    def get_min(self, value1, value2, value3, value4):
-        min_value = value1
-        for value in [value2, value3, value4]:
-            if value is not None:
-                if min_value is None or value < min_value:
-                    min_value = value
-        return min_value
-
-    def get_max(self, value1, value2, value3, value4):
-        max_value = value1
-        for value in [value2, value3, value4]:
-            if value is not None:
-                if max_value is None or value > max_value:
-                    max_value = value
-        return max_value
-
-    def canvas_resize_to_fit_data(self):
+    def canvas_resize_to_fit_data(self) -> bool:
+        """データ範囲に合わせてキャンバスサイズを調整（サイズが変わりグリッドを再描画した場合は True）"""
       # print("Resizing canvas to fit data...")
+        if self._batch_depth > 0:
+            self._batch_pending.add("resize")
+            return False
+        resized = False
         minimum_canvas_area = self.get_minimum_canvas_area()
         if minimum_canvas_area is not None:
             x_min, y_min, x_max, y_max = minimum_canvas_area
-            self.canvas_width = int(x_max)
-            self.canvas_height = int(y_max)
-            self.canvas.config(scrollregion=(0, 0, self.canvas_width-1, self.canvas_height-1))
-            # self.canvas.config(width=self.canvas_width, height=self.canvas_height)
-            self._draw_grid()   # グリッド再描画
+            if (int(x_max), int(y_max)) != (self.canvas_width, self.canvas_height):
+                # サイズが変わらない場合はスクロール範囲の設定とグリッド再描画を省略
+                self.canvas_width = int(x_max)
+                self.canvas_height = int(y_max)
+                self.canvas.config(scrollregion=(0, 0, self.canvas_width-1, self.canvas_height-1))
+                # self.canvas.config(width=self.canvas_width, height=self.canvas_height)
+                self._draw_grid()   # グリッド再描画
+                resized = True
+        self.schedule_viewport_refresh()
+        return resized
       # print(f"Canvas resized to fit data: {self.canvas_width}x{self.canvas_height}")
 
+    # ------------ 表示領域に応じた描画（仮想化描画） ------------
+
+    def is_virtual_rendering(self, node_count=None):
+        """仮想化描画（表示領域付近のオブジェクトだけを描画）が有効かどうか"""
+        if not ct.VIEWPORT_PARAMS["virtual_rendering"]:
+            return False
+        if node_count is None:
+            node_count = len(self.nodes)
+        return node_count >= ct.VIEWPORT_PARAMS["virtual_rendering_min_nodes"]
+
+    def _drawing_canvas(self):
+        """新規オブジェクトの描画先キャンバス（描画保留中は None）"""
+        return None if self._defer_drawing else self.canvas
+
+    @contextmanager
+    def deferred_drawing(self, node_count):
+        """大量のオブジェクトを作成する間、仮想化描画が有効ならキャンバスへの描画を保留し、終了時に表示領域付近だけを描画する"""
+        self._defer_drawing = self.is_virtual_rendering(node_count)
+        try:
+            yield
+        finally:
+            self._defer_drawing = False
+            self.refresh_viewport()
+
+    def on_canvas_xscroll(self, first, last):
+        self.scrollbar_x.set(first, last)
+        self._update_grid_for_viewport()
+        self.schedule_viewport_refresh()
+
+    def on_canvas_yscroll(self, first, last):
+        self.scrollbar_y.set(first, last)
+        self._update_grid_for_viewport()
+        self.schedule_viewport_refresh()
+
+    def schedule_viewport_refresh(self):
+        """スクロール等で表示領域が変わった場合の再描画を予約（アイドル時に1回だけ実行）"""
+        if self._viewport_refresh_pending:
+            return
+        if not self.is_virtual_rendering() and not self._virtualized:
+            return
+        self._viewport_refresh_pending = True
+        self.after_idle(self.refresh_viewport)
+
+    def refresh_viewport(self):
+        """表示領域（＋マージン）と交差するオブジェクトだけをキャンバスに描画し、それ以外の描画を破棄する"""
+        self._viewport_refresh_pending = False
+        virtual_rendering = self.is_virtual_rendering()
+        if not virtual_rendering and not self._virtualized:
+            return  # 全オブジェクト描画済み
+
+        margin = ct.VIEWPORT_PARAMS["margin"]
+        x0, y0, x1, y1 = self.get_canvas_display_area()
+        area = (x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+
+        # 選択中・編集中のオブジェクトは表示領域外でも描画を維持する
+        pinned_node_ids = set(self.selected_node_ids)
+        for node_id in (self.link_start_node_id, self.drag_data.get("node_id")):
+            if node_id is not None:
+                pinned_node_ids.add(node_id)
+        if self.text_edit is not None:
+            pinned_node_ids.add(self.text_edit["node_id"])
+        pinned_edge_objs = set()
+        if self.edge_label_edit is not None:
+            pinned_edge_objs.add(id(self.edge_label_edit["edge_obj"]))
+        if self._group_drag is not None:
+            # 複数選択ドラッグ中のエッジはキャンバス上だけで移動しているため、描画を維持する
+            pinned_edge_objs.update(id(edge_obj) for edge_obj in self._group_drag["inner_edges"] + self._group_drag["boundary_edges"])
+        pinned_note_obj = self.note_text_edit["note_obj"] if self.note_text_edit is not None else None
+
+        if virtual_rendering and self._virtualized:
+            # 表示領域付近のオブジェクト（空間インデックスで検索）と、描画済みのオブジェクトだけを判定する
+            candidates = self.spatial_index.query_rect(*area)
+            candidates += self._viewport_drawn.values()
+            candidates += [self.nodes[node_id] for node_id in pinned_node_ids if node_id in self.nodes]
+            candidates += [edge_obj for edge_obj in (self.edges.get(self.selected_edge_id),) if edge_obj is not None]
+        else:
+            # 仮想化描画の開始時・終了時は全オブジェクトを判定する
+            candidates = list(self.nodes.values()) + list(self.edges.values()) + list(self.notes.values())
+        self._viewport_drawn = {}
+
+        nodes, edges, notes = {}, {}, {}
+        for obj in candidates:
+            if isinstance(obj, Node):
+                if self.nodes.get(obj.id) is obj:
+                    nodes[id(obj)] = obj
+            elif isinstance(obj, Edge):
+                if self.edges_by_uid.get(obj.uid) is obj:
+                    edges[id(obj)] = obj
+            elif isinstance(obj, Note):
+                if self.notes.get(self._note_key(obj)) is obj:
+                    notes[id(obj)] = obj
+
+        # ノード
+        for node_obj in nodes.values():
+            node_id = node_obj.id
+            visible = not virtual_rendering or node_id in pinned_node_ids or self._rect_intersects(self._node_bounds(node_obj), area)
+            if visible and node_obj.shape_id is None:
+                node_obj.draw(self.canvas)
+                if node_id in self.selected_node_ids:
+                    self._set_node_to_selected_outline_color(node_obj)
+            elif not visible and node_obj.shape_id is not None:
+                node_obj.delete(self.canvas)
+            self._track_viewport_drawn(node_obj)
+
+        # エッジ（描画状態が変わるとキーが変わるため、登録し直す）
+        for edge_obj in edges.values():
+            visible = not virtual_rendering or id(edge_obj) in pinned_edge_objs or self._edge_key(edge_obj) == self.selected_edge_id or self._rect_intersects(self._edge_bounds(edge_obj), area)
+            if visible and edge_obj.line_id is None:
+                self._unregister_edge(edge_obj)
+                Edge._compute_edge_geometry(edge_obj, edge_obj.from_node_obj, edge_obj.to_node_obj)
+                edge_obj.draw(self.canvas, edge_obj.from_node_obj, edge_obj.to_node_obj, edge_obj.label_text)
+                self._register_edge(edge_obj)
+            elif not visible and edge_obj.line_id is not None:
+                self._unregister_edge(edge_obj)
+                edge_obj.delete(self.canvas)
+                self._register_edge(edge_obj)
+            self._track_viewport_drawn(edge_obj)
+
+        # ノート（描画状態が変わるとキーが変わるため、登録し直す）
+        for note_obj in notes.values():
+            visible = not virtual_rendering or note_obj is pinned_note_obj or note_obj.base_node.shape_id is not None or self._rect_intersects(self._note_bounds(note_obj), area)
+            if visible and note_obj.shape_id is None:
+                self._unregister_note(self._note_key(note_obj))
+                note_obj.canvas = self.canvas
+                note_obj.draw()
+                if note_obj.display_state == "hidden":
+                    note_obj.hidden(self.canvas)
+                self._register_note(note_obj)
+            elif not visible and note_obj.shape_id is not None:
+                self._unregister_note(self._note_key(note_obj))
+                note_obj.delete(self.canvas)
+                self._register_note(note_obj)
+            self._track_viewport_drawn(note_obj)
+
+        self._virtualized = virtual_rendering
+
+    def _track_viewport_drawn(self, obj):
+        """描画済みのノード・エッジ・ノートを記録（次回の refresh_viewport で表示領域外になったものを破棄するため）"""
+        drawn = (obj.line_id if isinstance(obj, Edge) else obj.shape_id) is not None
+        if drawn:
+            self._viewport_drawn[id(obj)] = obj
+        else:
+            self._viewport_drawn.pop(id(obj), None)
+
+    @staticmethod
+    def _rect_intersects(rect1, rect2):
+        return rect1[0] <= rect2[2] and rect1[2] >= rect2[0] and rect1[1] <= rect2[3] and rect1[3] >= rect2[1]
+
+    @staticmethod
+    def _node_bounds(node_obj):
+        return (node_obj.x - node_obj.w / 2, node_obj.y - node_obj.h / 2, node_obj.x + node_obj.w / 2, node_obj.y + node_obj.h / 2)
+
+    @staticmethod
+    def _note_bounds(note_obj):
+        x = note_obj.base_node.x + note_obj.dx
+        y = note_obj.base_node.y + note_obj.dy
+        return (x - ct.NOTE_PARAMS["width"] / 2, y - ct.NOTE_PARAMS["height"] / 2, x + ct.NOTE_PARAMS["width"] / 2, y + ct.NOTE_PARAMS["height"] / 2)
+
+    @staticmethod
+    def _edge_bounds(edge_obj):
+        xs = edge_obj.points[0::2]
+        ys = edge_obj.points[1::2]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    # ------------ 空間インデックス ------------
+
+    def _update_spatial_index(self, obj):
+        """オブジェクトの現在の外接矩形で空間インデックスを更新"""
+        if isinstance(obj, Node):
+            bounds = self._node_bounds(obj)
+        elif isinstance(obj, Edge):
+            bounds = self._edge_bounds(obj) if obj.points else None
+        elif isinstance(obj, Note):
+            bounds = self._note_bounds(obj) if obj.base_node is not None else None
+        elif isinstance(obj, Swimlane):
+            bounds = (obj.top_left_x, obj.top_left_y, obj.top_left_x + obj.width, obj.top_left_y + obj.height)
+        else:
+            bounds = None
+        if bounds is None:
+            self.spatial_index.remove(obj)
+        else:
+            self.spatial_index.update(obj, bounds)
+        if isinstance(obj, (Node, Edge, Note)):
+            self._track_viewport_drawn(obj)
+
+    def objects_in_rect(self, left, top, right, bottom, enclosed=False, kind=None):
+        """矩形と交差する（enclosed=True の場合は矩形に包含される）オブジェクトをモデル座標で検索"""
+        return self.spatial_index.query_rect(left, top, right, bottom, enclosed=enclosed, kind=kind)
+
+    def objects_at(self, x, y, tolerance=0, kind=None):
+        """指定位置と外接矩形が重なるオブジェクトをモデル座標で検索"""
+        return self.spatial_index.query_point(x, y, tolerance=tolerance, kind=kind)
+
     def add_mode_button(self, toolbar, text, value):
         if text == "Swimlane":
             text = self.current_swimlane_kind
@@ -632,8 +785,12 @@ class FlowchartTool(tk.Tk):
         self.cancel_selection_node_and_edge_and_swimlane()
 
     def _draw_grid(self):
-        """グリッドを再描画"""
+        """グリッドを再描画（表示領域＋マージンの範囲だけを描画し、スクロールで範囲外に出たら描き直す）"""
+        if self._batch_depth > 0:
+            self._batch_pending.add("grid")
+            return
         self.canvas.delete("grid")
+        self._grid_area = None
         if not self.grid_on.get():
             return
         # w = self.canvas.winfo_width()
@@ -641,12 +798,28 @@ class FlowchartTool(tk.Tk):
         # if w <= 0 or h <= 0:
         #     return
         step = ct.CANVAS_PARAMS["grid_spacing"] # グリッド間隔
-        for x in range(0, self.canvas_width, step):
-            self.canvas.create_line(x, 0, x, self.canvas_height, fill=ct.CANVAS_PARAMS["grid_color"], tags=("grid",))
-        for y in range(0, self.canvas_height, step):
-            self.canvas.create_line(0, y, self.canvas_width, y, fill=ct.CANVAS_PARAMS["grid_color"], tags=("grid",))
-        # グリッドを最背面へ
-        self.canvas.tag_lower("grid")
+        margin = ct.VIEWPORT_PARAMS["grid_margin"]
+        x0, y0, x1, y1 = self.get_canvas_display_area()
+        left = max(0, int((x0 - margin) // step) * step)
+        top = max(0, int((y0 - margin) // step) * step)
+        right = min(self.canvas_width, int(x1 + margin))
+        bottom = min(self.canvas_height, int(y1 + margin))
+        for x in range(left, right, step):
+            self.canvas.create_line(x, top, x, bottom, fill=ct.CANVAS_PARAMS["grid_color"], tags=("grid",))
+        for y in range(top, bottom, step):
+            self.canvas.create_line(left, y, right, y, fill=ct.CANVAS_PARAMS["grid_color"], tags=("grid",))
+        self._grid_area = (left, top, right, bottom)
+        # グリッドを最背面（グリッドレイヤー）へ
+        layer_manager.place(self.canvas, "grid", "grid")
+
+    def _update_grid_for_viewport(self):
+        """表示領域がグリッド描画済みの範囲からはみ出した場合だけグリッドを描き直す"""
+        if self._grid_area is None or self._batch_depth > 0:
+            return
+        x0, y0, x1, y1 = self.get_canvas_display_area()
+        left, top, right, bottom = self._grid_area
+        if x0 < left or y0 < top or min(x1, self.canvas_width) > right or min(y1, self.canvas_height) > bottom:
+            self._draw_grid()
 
     def display_note_toggle(self):
         if self.note_text_edit is not None:
@@ -828,6 +1001,7 @@ class FlowchartTool(tk.Tk):
                 outline=ct.SELECTION_AREA_PARAMS["outline_color"], width=ct.SELECTION_AREA_PARAMS["outline_width"], dash=ct.SELECTION_AREA_PARAMS["outline_dash"],
                 tags=("selection")
             )
+            layer_manager.place(self.canvas, selection_frame_shape_id, "overlay")
             self.drag_data["shape_id"] = selection_frame_shape_id
         elif selected_note is not None:
             # print(f"Note selected for dragging: note_id={selected_note.shape_id}")
@@ -870,6 +1044,7 @@ class FlowchartTool(tk.Tk):
                 self.drag_data["drag_start_y"] = self.canvas.canvasy(event.y)
                 self.drag_data["drag_end_x"] = self.canvas.canvasx(event.x)
                 self.drag_data["drag_end_y"] = self.canvas.canvasy(event.y)
+                self._start_group_drag()
         elif selected_edge_id is not None:
             self.select_edge(selected_edge_id)
         elif selected_swimlane is not None:
@@ -883,10 +1058,14 @@ class FlowchartTool(tk.Tk):
             self.drag_data["drag_start_y"] = self.canvas.canvasy(event.y)
             self.drag_data["drag_end_x"] = self.canvas.canvasx(event.x)
             self.drag_data["drag_end_y"] = self.canvas.canvasy(event.y)
+            self._start_group_drag()
 
         self.display_operation_info()  # 操作情報表示制御
 
     def on_drag_move(self, event):
+        self._schedule_drag_frame(self._apply_drag_move, event)
+
+    def _apply_drag_move(self, event):
         # print(f"Dragging... mode: {self.drag_data}, event: ({event.x}, {event.y})")
 
         mode = self.drag_data["mode"]
@@ -910,8 +1089,12 @@ class FlowchartTool(tk.Tk):
             move_to_x = self.drag_data["original_x"] + drag_move_x
             move_to_y = self.drag_data["original_y"] + drag_move_y
             node_obj.x, node_obj.y = self.adjusted_xy(nid, move_to_x, move_to_y)
-            self._move_node_graphics(node_obj)
-            self._update_edges_for_node(nid)
+            if self._group_drag is not None:
+                # 選択中のオブジェクト全体を、ドラッグ中のノードと同じ量だけ移動
+                self._move_group_drag(node_obj.x - self.drag_data["original_x"], node_obj.y - self.drag_data["original_y"])
+            else:
+                self._move_node_graphics(node_obj, relayout=False)
+                self._defer_relayout(node_ids=(nid,))
         elif mode == "move_swimlane":
             shape_id = self.drag_data["shape_id"]
             for selected_swimlane in self.selected_swimlanes:
@@ -921,7 +1104,12 @@ class FlowchartTool(tk.Tk):
                     move_to_x = self.drag_data["original_x"] + drag_move_x
                     move_to_y = self.drag_data["original_y"] + drag_move_y
                     adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
-                    selected_swimlane.move_to(adjusted_x, adjusted_y)
+                    if self._group_drag is not None:
+                        # 選択中のオブジェクト全体を、ドラッグ中のスイムレーンと同じ量だけ移動
+                        self._move_group_drag(adjusted_x - self.drag_data["original_x"], adjusted_y - self.drag_data["original_y"])
+                    else:
+                        selected_swimlane.move_to(adjusted_x, adjusted_y)
+                        self._update_spatial_index(selected_swimlane)
         elif mode is not None and mode.startswith("link"):
             # print(f"  Linking... mode: {mode}, link_start_node_id: {self.link_start_node_id}")
 
@@ -961,18 +1149,22 @@ class FlowchartTool(tk.Tk):
         elif mode == "move_note":
             # print(f"  Moving note... mode: {mode}, note shape_id: {self.drag_data['shape_id']}")
             dragging_shape_id = self.drag_data["shape_id"]
-            for note_shape_id, note_obj in self.notes.items():
-                if note_shape_id is not None and note_shape_id == dragging_shape_id:
-                    drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
-                    drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
-                    move_to_x = self.drag_data["original_x"] + drag_move_x
-                    move_to_y = self.drag_data["original_y"] + drag_move_y
-                    adjusted_x, adjusted_y = self.adjusted_note_xy(dragging_shape_id, move_to_x, move_to_y)
-                    note_obj.move_to(adjusted_x, adjusted_y)
-                    # print(f"Note moved to ({adjusted_x}, {adjusted_y})")
+            note_obj = self.notes.get(dragging_shape_id) if dragging_shape_id is not None else None
+            if note_obj is not None:
+                drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
+                drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
+                move_to_x = self.drag_data["original_x"] + drag_move_x
+                move_to_y = self.drag_data["original_y"] + drag_move_y
+                adjusted_x, adjusted_y = self.adjusted_note_xy(dragging_shape_id, move_to_x, move_to_y)
+                note_obj.move_to(adjusted_x, adjusted_y)
+                self._update_spatial_index(note_obj)
+                # print(f"Note moved to ({adjusted_x}, {adjusted_y})")
 
     def on_drag_end(self, event):
         # print("Drag ended")
+        self._flush_drag_frame()
+        self._end_group_drag()
+        self._flush_relayout()
 
         mode = self.drag_data["mode"]
         self.drag_data["drag_end_x"] = self.canvas.canvasx(event.x)
@@ -984,19 +1176,14 @@ class FlowchartTool(tk.Tk):
             bottom = max(self.drag_data["drag_start_y"], self.drag_data["drag_end_y"])
             right = max(self.drag_data["drag_start_x"], self.drag_data["drag_end_x"])
             top = min(self.drag_data["drag_start_y"], self.drag_data["drag_end_y"])
-            selected_shape_ids = self.canvas.find_enclosed(left, top, right, bottom)
-            nodes_in_selection_frame = []
+            # 空間インデックスで選択範囲内のノードと、ヘッダーが選択範囲内のスイムレーンを検索
+            nodes_in_selection_frame = [node_obj.id for node_obj in self.objects_in_rect(left, top, right, bottom, enclosed=True, kind=Node)]
             swimlanes_in_selection_frame = []
-
-            for item_shape_id in selected_shape_ids:
-                for nid, node_obj in self.nodes.items():
-                    if item_shape_id == node_obj.shape_id:
-                        nodes_in_selection_frame.append(nid)
-                for swimlane_obj in self.swimlanes:
-                    if item_shape_id == swimlane_obj.frame_id or item_shape_id == swimlane_obj.top_id or item_shape_id == swimlane_obj.bottom_id:
-                        selecting_swimlane_frame_ids = [swimlane_obj.frame_id for swimlane_obj in swimlanes_in_selection_frame]
-                        if swimlane_obj.frame_id not in selecting_swimlane_frame_ids:
-                            swimlanes_in_selection_frame.append(swimlane_obj)
+            for swimlane_obj in self.objects_in_rect(left, top, right, bottom, kind=Swimlane):
+                for header_left, header_top, header_right, header_bottom in swimlane_obj.get_header_bounds():
+                    if left <= header_left and header_right <= right and top <= header_top and header_bottom <= bottom:
+                        swimlanes_in_selection_frame.append(swimlane_obj)
+                        break
             self.select_nodes(nodes_in_selection_frame)
             self.select_swimlanes(swimlanes_in_selection_frame)
             # 選択範囲枠を削除
@@ -1037,6 +1224,7 @@ class FlowchartTool(tk.Tk):
                     if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
                         adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
                         selected_swimlane.move_to(adjusted_x, adjusted_y)
+                        self._update_spatial_index(selected_swimlane)
 
             self.canvas_resize_to_fit_data()
 
@@ -1069,6 +1257,7 @@ class FlowchartTool(tk.Tk):
                     if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
                         adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
                         selected_swimlane.move_to(adjusted_x, adjusted_y)
+                        self._update_spatial_index(selected_swimlane)
 
             # ドラッグデータの移動量に合わせて、選択中のノードとリンクを移動させる（複数選択している場合）
             for selected_node_id in self.selected_node_ids:
@@ -1106,15 +1295,15 @@ class FlowchartTool(tk.Tk):
 
         elif mode == "move_note":
             dragging_shape_id = self.drag_data["shape_id"]
-            for note_shape_id, note_obj in self.notes.items():
-                if note_shape_id is not None and note_shape_id == dragging_shape_id:
-                    drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
-                    drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
-                    move_to_x = self.drag_data["original_x"] + drag_move_x
-                    move_to_y = self.drag_data["original_y"] + drag_move_y
-                    adjusted_x, adjusted_y = self.adjusted_note_xy(dragging_shape_id, move_to_x, move_to_y)
-                    note_obj.move_to(adjusted_x, adjusted_y)
-                    break
+            note_obj = self.notes.get(dragging_shape_id) if dragging_shape_id is not None else None
+            if note_obj is not None:
+                drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
+                drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
+                move_to_x = self.drag_data["original_x"] + drag_move_x
+                move_to_y = self.drag_data["original_y"] + drag_move_y
+                adjusted_x, adjusted_y = self.adjusted_note_xy(dragging_shape_id, move_to_x, move_to_y)
+                note_obj.move_to(adjusted_x, adjusted_y)
+                self._update_spatial_index(note_obj)
 
             self.canvas_resize_to_fit_data()
 
@@ -1168,6 +1357,9 @@ class FlowchartTool(tk.Tk):
         # self.display_operation_info()  # 操作情報表示制御
 
     def on_drag_move_ctrl(self, event):
+        self._schedule_drag_frame(self._apply_drag_move_ctrl, event)
+
+    def _apply_drag_move_ctrl(self, event):
         # print("Control-Dragging...")
 
         # TODO ドラッグ中の要素またはスイムレーンの移動を継続する
@@ -1187,8 +1379,8 @@ class FlowchartTool(tk.Tk):
             move_to_x = self.drag_data["original_x"] + drag_move_x
             move_to_y = self.drag_data["original_y"] + drag_move_y
             node_obj.x, node_obj.y = self.adjusted_xy(nid, move_to_x, move_to_y)
-            self._move_node_graphics(node_obj)
-            self._update_edges_for_node(nid)
+            self._move_node_graphics(node_obj, relayout=False)
+            self._defer_relayout(node_ids=(nid,))
         elif mode == "move_swimlane":
             shape_id = self.drag_data["shape_id"]
             for selected_swimlane in self.swimlanes:
@@ -1199,28 +1391,98 @@ class FlowchartTool(tk.Tk):
                     move_to_y = self.drag_data["original_y"] + drag_move_y
                     adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
                     selected_swimlane.move_to(adjusted_x, adjusted_y)
+                    self._update_spatial_index(selected_swimlane)
 
     def on_drag_end_ctrl(self, event):
         # print("Control-Drag ended.")
+        self._flush_drag_frame()
+        self._end_group_drag()  # Ctrlを押さずに開始した複数選択ドラッグをCtrlを押して終了した場合
+        self._flush_relayout()
 
         # TODO 選択中の要素とスイムレーンと選択中要素同士を結ぶリンクを複製しD&Dで移動した量だけ移動させる、複製したものを選択中にして複製元は選択から外す
         mode = self.drag_data["mode"]
         self.drag_data["drag_end_x"] = self.canvas.canvasx(event.x)
         self.drag_data["drag_end_y"] = self.canvas.canvasy(event.y)
 
-        if mode == "move_node":
-            drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
-            drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
-
-            # ドラッグ中のノードとシェイプIDを取得
-            guide_nid = self.drag_data["node_id"]
-            guide_shape_id = self.drag_data["shape_id"]
-            self.delete_selected_node(guide_nid)
-
-            # ドラッグデータの移動量に合わせて、選択中のノードとリンクを複製・移動させる（複数選択している場合）
-            duplicate_nid_pairs = []
-            for selected_node_id in self.selected_node_ids:
-                if selected_node_id is not None:
+        with self.history_batch():
+            if mode == "move_node":
+                drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
+                drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
+
+                # ドラッグ中のノードとシェイプIDを取得
+                guide_nid = self.drag_data["node_id"]
+                guide_shape_id = self.drag_data["shape_id"]
+                self.delete_selected_node(guide_nid)
+
+                # ドラッグデータの移動量に合わせて、選択中のノードとリンクを複製・移動させる（複数選択している場合）
+                duplicate_nid_pairs = []
+                for selected_node_id in self.selected_node_ids:
+                    if selected_node_id is not None:
+                        selected_node_obj = self.nodes[selected_node_id]
+                        if selected_node_obj is not None and (abs(drag_move_x) > 2 or abs(drag_move_y) > 2):  # ダブルクリック時のノードのズレを防止
+                            move_to_x = selected_node_obj.x + drag_move_x
+                            move_to_y = selected_node_obj.y + drag_move_y
+                            adjusted_x, adjusted_y = self.adjusted_xy(selected_node_id, move_to_x, move_to_y)
+                            clone_node_id = self.duplicate_node(selected_node_obj)
+                            duplicate_nid_pairs.append((selected_node_id, clone_node_id))
+                            clone_node = self.nodes[clone_node_id]
+                            clone_node.x, clone_node.y = adjusted_x, adjusted_y
+                            self._move_node_graphics(clone_node)
+                            # self._update_edges_for_node(selected_node_id)
+                for original_node_id, clone_node_id in duplicate_nid_pairs:
+                    self.deselect_node(original_node_id)
+                    self.additional_select_node(clone_node_id)
+                self.duplicate_edges(duplicate_nid_pairs)
+
+                # ドラッグデータの移動量に合わせて、選択中のスイムレーンを複製・移動させる（複数選択している場合）
+                duplicate_swimlane_pairs = []
+                for selected_swimlane in self.selected_swimlanes:
+                    if selected_swimlane.frame_id is not None:
+                        move_to_x = selected_swimlane.header_center_x + drag_move_x
+                        move_to_y = selected_swimlane.header_center_y + drag_move_y
+                        if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
+                            adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
+                            clone_swimlane = self.duplicate_swimlane(selected_swimlane)
+                            clone_swimlane.move_to(adjusted_x, adjusted_y)
+                            self._update_spatial_index(clone_swimlane)
+                            duplicate_swimlane_pairs.append((selected_swimlane, clone_swimlane))
+                for original_swimlane, clone_swimlane in duplicate_swimlane_pairs:
+                    self.deselect_swimlane(original_swimlane)
+                    self.additional_select_swimlane(clone_swimlane)
+
+                self.canvas_resize_to_fit_data()
+
+                if guide_nid is not None:
+                    self.push_history()
+                self.drag_data_init()
+
+            elif mode == "move_swimlane":
+                drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
+                drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
+
+                # ドラッグ中のシェイプIDを取得
+                guide_shape_id = self.drag_data["shape_id"]
+                self.delete_selected_swimlane(guide_shape_id)
+
+                # ドラッグデータの移動量に合わせて、選択中のスイムレーンを複製・移動させる（複数選択している場合）
+                duplicate_swimlane_pairs = []
+                for selected_swimlane in self.selected_swimlanes:
+                    if selected_swimlane.frame_id is not None:
+                        if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
+                            move_to_x = selected_swimlane.header_center_x + drag_move_x
+                            move_to_y = selected_swimlane.header_center_y + drag_move_y
+                            adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
+                            clone_swimlane = self.duplicate_swimlane(selected_swimlane)                        
+                            clone_swimlane.move_to(adjusted_x, adjusted_y)
+                            self._update_spatial_index(clone_swimlane)
+                            duplicate_swimlane_pairs.append((selected_swimlane, clone_swimlane))
+                for original_swimlane, clone_swimlane in duplicate_swimlane_pairs:
+                    self.deselect_swimlane(original_swimlane)
+                    self.additional_select_swimlane(clone_swimlane)
+
+                # ドラッグデータの移動量に合わせて、選択中のノードとリンクを複製・移動させる（複数選択している場合）
+                duplicate_nid_pairs = []
+                for selected_node_id in self.selected_node_ids:
                     selected_node_obj = self.nodes[selected_node_id]
                     if selected_node_obj is not None and (abs(drag_move_x) > 2 or abs(drag_move_y) > 2):  # ダブルクリック時のノードのズレを防止
                         move_to_x = selected_node_obj.x + drag_move_x
@@ -1231,111 +1493,105 @@ class FlowchartTool(tk.Tk):
                         clone_node = self.nodes[clone_node_id]
                         clone_node.x, clone_node.y = adjusted_x, adjusted_y
                         self._move_node_graphics(clone_node)
-                        # self._update_edges_for_node(selected_node_id)
-            for original_node_id, clone_node_id in duplicate_nid_pairs:
-                self.deselect_node(original_node_id)
-                self.additional_select_node(clone_node_id)
-            self.duplicate_edges(duplicate_nid_pairs)
-
-            # ドラッグデータの移動量に合わせて、選択中のスイムレーンを複製・移動させる（複数選択している場合）
-            duplicate_swimlane_pairs = []
-            for selected_swimlane in self.selected_swimlanes:
-                if selected_swimlane.frame_id is not None:
-                    move_to_x = selected_swimlane.header_center_x + drag_move_x
-                    move_to_y = selected_swimlane.header_center_y + drag_move_y
-                    if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
-                        adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
-                        clone_swimlane = self.duplicate_swimlane(selected_swimlane)
-                        clone_swimlane.move_to(adjusted_x, adjusted_y)
-                        duplicate_swimlane_pairs.append((selected_swimlane, clone_swimlane))
-            for original_swimlane, clone_swimlane in duplicate_swimlane_pairs:
-                self.deselect_swimlane(original_swimlane)
-                self.additional_select_swimlane(clone_swimlane)
-
-            self.canvas_resize_to_fit_data()
-
-            if guide_nid is not None:
-                self.push_history()
-            self.drag_data_init()
-
-        elif mode == "move_swimlane":
-            drag_move_x = self.drag_data["drag_end_x"] - self.drag_data["drag_start_x"]
-            drag_move_y = self.drag_data["drag_end_y"] - self.drag_data["drag_start_y"]
-
-            # ドラッグ中のシェイプIDを取得
-            guide_shape_id = self.drag_data["shape_id"]
-            self.delete_selected_swimlane(guide_shape_id)
-
-            # ドラッグデータの移動量に合わせて、選択中のスイムレーンを複製・移動させる（複数選択している場合）
-            duplicate_swimlane_pairs = []
-            for selected_swimlane in self.selected_swimlanes:
-                if selected_swimlane.frame_id is not None:
-                    if abs(drag_move_x) > 2 or abs(drag_move_y) > 2:  # ダブルクリック時のノードのズレを防止
-                        move_to_x = selected_swimlane.header_center_x + drag_move_x
-                        move_to_y = selected_swimlane.header_center_y + drag_move_y
-                        adjusted_x, adjusted_y = self.adjusted_swimlane_xy(selected_swimlane, move_to_x, move_to_y)
-                        clone_swimlane = self.duplicate_swimlane(selected_swimlane)                        
-                        clone_swimlane.move_to(adjusted_x, adjusted_y)
-                        duplicate_swimlane_pairs.append((selected_swimlane, clone_swimlane))
-            for original_swimlane, clone_swimlane in duplicate_swimlane_pairs:
-                self.deselect_swimlane(original_swimlane)
-                self.additional_select_swimlane(clone_swimlane)
-
-            # ドラッグデータの移動量に合わせて、選択中のノードとリンクを複製・移動させる（複数選択している場合）
-            duplicate_nid_pairs = []
-            for selected_node_id in self.selected_node_ids:
-                selected_node_obj = self.nodes[selected_node_id]
-                if selected_node_obj is not None and (abs(drag_move_x) > 2 or abs(drag_move_y) > 2):  # ダブルクリック時のノードのズレを防止
-                    move_to_x = selected_node_obj.x + drag_move_x
-                    move_to_y = selected_node_obj.y + drag_move_y
-                    adjusted_x, adjusted_y = self.adjusted_xy(selected_node_id, move_to_x, move_to_y)
-                    clone_node_id = self.duplicate_node(selected_node_obj)
-                    duplicate_nid_pairs.append((selected_node_id, clone_node_id))
-                    clone_node = self.nodes[clone_node_id]
-                    clone_node.x, clone_node.y = adjusted_x, adjusted_y
-                    self._move_node_graphics(clone_node)
-                    # self._update_edges_for_node(clone_node.id)
-            for original_node_id, clone_node_id in duplicate_nid_pairs:
-                self.deselect_node(original_node_id)
-                self.additional_select_node(clone_node_id)
-            self.duplicate_edges(duplicate_nid_pairs)
+                        # self._update_edges_for_node(clone_node.id)
+                for original_node_id, clone_node_id in duplicate_nid_pairs:
+                    self.deselect_node(original_node_id)
+                    self.additional_select_node(clone_node_id)
+                self.duplicate_edges(duplicate_nid_pairs)
 
-            self.canvas_resize_to_fit_data()
+                self.canvas_resize_to_fit_data()
 
-            if guide_shape_id is not None:
-                self.push_history()
-            self.drag_data_init()
+                if guide_shape_id is not None:
+                    self.push_history()
+                self.drag_data_init()
 
-        else:
-            self.drag_data_init()
+            else:
+                self.drag_data_init()
 
     def duplicate_edges(self, duplicate_nid_pairs):
         # 選択中のノード間のリンクを複製する
+        clone_nid_map = dict(duplicate_nid_pairs)  # original_node_id -> clone_node_id
         for original_from_node_id, clone_from_node_id in duplicate_nid_pairs:
             clone_from_node_obj = self.nodes[clone_from_node_id]
-            for original_to_node_id, clone_to_node_id in duplicate_nid_pairs:
-                clone_to_node_obj = self.nodes[clone_to_node_id]
-                if original_from_node_id != original_to_node_id:
-                    original_edge_obj = self.get_edge_between_nodes(original_from_node_id, original_to_node_id)
-                    if original_edge_obj is not None:
-                        clone_edge_obj = Edge(edge_type=original_edge_obj.edge_type, path_type=original_edge_obj.path_type, line_style=original_edge_obj.line_style,
-                                                from_node_obj=clone_from_node_obj, to_node_obj=clone_to_node_obj, text=original_edge_obj.label_text, \
-                                                connection_mode=original_edge_obj.connection_mode, \
-                                                from_node_connection_point=original_edge_obj.from_node_connection_point, \
-                                                to_node_connection_point=original_edge_obj.to_node_connection_point, \
-                                                edge_wrap_margin=original_edge_obj.edge_wrap_margin, \
-                                                canvas=self.canvas, \
-                                                label_position=original_edge_obj.label_position)
-                        if clone_edge_obj is not None and clone_edge_obj.line_id is not None:
-                            self.edges[clone_edge_obj.line_id] = clone_edge_obj
+            # 複製元ノードの出力エッジのうち、接続先も複製対象のものだけを複製する（ノード間の最初のエッジのみ）
+            original_to_node_ids = []
+            for edge_line_id in self.edges_out.get(original_from_node_id, ()):
+                original_to_node_id = self.edges[edge_line_id].to_node_obj.id
+                if original_to_node_id != original_from_node_id and original_to_node_id in clone_nid_map and original_to_node_id not in original_to_node_ids:
+                    original_to_node_ids.append(original_to_node_id)
+            for original_to_node_id in original_to_node_ids:
+                clone_to_node_obj = self.nodes[clone_nid_map[original_to_node_id]]
+                original_edge_obj = self.get_edge_between_nodes(original_from_node_id, original_to_node_id)
+                if original_edge_obj is not None:
+                    clone_edge_obj = Edge(edge_type=original_edge_obj.edge_type, path_type=original_edge_obj.path_type, line_style=original_edge_obj.line_style,
+                                            from_node_obj=clone_from_node_obj, to_node_obj=clone_to_node_obj, text=original_edge_obj.label_text, \
+                                            connection_mode=original_edge_obj.connection_mode, \
+                                            from_node_connection_point=original_edge_obj.from_node_connection_point, \
+                                            to_node_connection_point=original_edge_obj.to_node_connection_point, \
+                                            edge_wrap_margin=original_edge_obj.edge_wrap_margin, \
+                                            canvas=self.canvas, \
+                                            label_position=original_edge_obj.label_position)
+                    if clone_edge_obj is not None and clone_edge_obj.line_id is not None:
+                        self._register_edge(clone_edge_obj)
 
     def get_edge_between_nodes(self, from_node_id, to_node_id):
-        original_edge_obj = None
+        return self.edge_by_pair.get((from_node_id, to_node_id))
+
+    def get_edges_for_node(self, nid):
+        """ノードに接続するエッジ（出力・入力）のリストを返す"""
+        edge_line_ids = self.edges_out.get(nid, set()) | self.edges_in.get(nid, set())
+        return [self.edges[edge_line_id] for edge_line_id in edge_line_ids if edge_line_id in self.edges]
+
+    @staticmethod
+    def _edge_key(edge_obj):
+        """self.edges のキー（描画中は line_id、未描画（仮想化描画）の場合は -uid）"""
+        return edge_obj.line_id if edge_obj.line_id is not None else -edge_obj.uid
+
+    def _register_edge(self, edge_obj):
+        """エッジを登録し、ノード隣接情報を更新"""
+        if edge_obj.uid is None:
+            edge_obj.uid = next(self._uid_counter)
+        edge_key = self._edge_key(edge_obj)
+        self.edges[edge_key] = edge_obj
+        self.edges_by_uid[edge_obj.uid] = edge_obj
+        self._mark_history_dirty(edge_obj)
+        from_node_id = edge_obj.from_node_obj.id
+        to_node_id = edge_obj.to_node_obj.id
+        self.edges_out.setdefault(from_node_id, set()).add(edge_key)
+        self.edges_in.setdefault(to_node_id, set()).add(edge_key)
+        self.edge_by_pair.setdefault((from_node_id, to_node_id), edge_obj)
+        self._update_spatial_index(edge_obj)
+
+    def _unregister_edge(self, edge_obj):
+        """エッジの登録を解除し、ノード隣接情報を更新"""
+        edge_key = self._edge_key(edge_obj)
+        self.edges.pop(edge_key, None)
+        if self.edges_by_uid.get(edge_obj.uid) is edge_obj:
+            del self.edges_by_uid[edge_obj.uid]
+        self._mark_history_dirty(edge_obj)
+        self.spatial_index.remove(edge_obj)
+        from_node_id = edge_obj.from_node_obj.id
+        to_node_id = edge_obj.to_node_obj.id
+        self.edges_out.get(from_node_id, set()).discard(edge_key)
+        self.edges_in.get(to_node_id, set()).discard(edge_key)
+        if self.edge_by_pair.get((from_node_id, to_node_id)) is edge_obj:
+            del self.edge_by_pair[(from_node_id, to_node_id)]
+            # 同じノード間に別のエッジが残っていれば、それを代表として登録し直す
+            for edge_line_id in self.edges_out.get(from_node_id, ()):
+                other_edge_obj = self.edges[edge_line_id]
+                if other_edge_obj.to_node_obj.id == to_node_id:
+                    self.edge_by_pair[(from_node_id, to_node_id)] = other_edge_obj
+                    break
+
+    def _clear_edges(self):
+        """エッジとノード隣接情報を全て破棄"""
         for edge_obj in self.edges.values():
-            if edge_obj.from_node_obj.id == from_node_id and edge_obj.to_node_obj.id == to_node_id:
-                original_edge_obj = edge_obj
-                break
-        return original_edge_obj
+            self.spatial_index.remove(edge_obj)
+        self.edges.clear()
+        self.edges_by_uid.clear()
+        self.edges_out.clear()
+        self.edges_in.clear()
+        self.edge_by_pair.clear()
 
     def on_drag_start_middle(self, event):
         #print("Middle drag started")
@@ -1409,7 +1665,7 @@ class FlowchartTool(tk.Tk):
                 if selecting_node_id is not None:
                     note = self.create_note_for_node(selecting_node_id)
                     if note is not None and note.shape_id is not None:
-                        self.notes[note.shape_id] = note
+                        self._register_note(note)
                         modify_flag = True
         else:
             selecting_node_id = self.node_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
@@ -1424,17 +1680,44 @@ class FlowchartTool(tk.Tk):
             if selecting_node_id is not None:
                 note = self.create_note_for_node(selecting_node_id)
                 if note is not None and note.shape_id is not None:
-                    self.notes[note.shape_id] = note
+                    self._register_note(note)
                     modify_flag = True
 
         if modify_flag:
             self.push_history()
 
     def get_note_for_node(self, node_id):
-        for note in self.notes.values():
-            if note.base_node is not None and note.base_node.id == node_id:
-                return note
-        return None
+        return self.notes_by_node_id.get(node_id)
+
+    @staticmethod
+    def _note_key(note_obj):
+        """self.notes のキー（描画中は shape_id、未描画（仮想化描画）の場合は -ノードID）"""
+        return note_obj.shape_id if note_obj.shape_id is not None else -note_obj.base_node.id
+
+    def _register_note(self, note_obj):
+        """ノートを登録し、ノードIDからの逆引き情報を更新"""
+        self.notes[self._note_key(note_obj)] = note_obj
+        if note_obj.base_node is not None:
+            self.notes_by_node_id[note_obj.base_node.id] = note_obj
+            self._mark_history_dirty(note_obj)
+        self._update_spatial_index(note_obj)
+
+    def _unregister_note(self, note_shape_id):
+        """ノートの登録を解除し、ノードIDからの逆引き情報を更新"""
+        note_obj = self.notes.pop(note_shape_id, None)
+        if note_obj is not None:
+            self.spatial_index.remove(note_obj)
+        if note_obj is not None and note_obj.base_node is not None:
+            if self.notes_by_node_id.get(note_obj.base_node.id) is note_obj:
+                del self.notes_by_node_id[note_obj.base_node.id]
+            self._mark_history_dirty(note_obj)
+
+    def _clear_notes(self):
+        """ノートとノードIDからの逆引き情報を全て破棄"""
+        for note_obj in self.notes.values():
+            self.spatial_index.remove(note_obj)
+        self.notes.clear()
+        self.notes_by_node_id.clear()
 
     def create_note_for_node(self, node_id):
         node_obj = self.nodes.get(node_id)
@@ -1450,6 +1733,7 @@ class FlowchartTool(tk.Tk):
     def on_canvas_resize(self, event):
         self.canvas_resize(False)
         self._draw_grid()
+        self.schedule_viewport_refresh()
 
     def on_grid_toggle(self):
         self._draw_grid()
@@ -1496,6 +1780,7 @@ class FlowchartTool(tk.Tk):
                     swimlane.change_width(increase=True)
                 else:
                     swimlane.change_width(increase=False)
+                self._update_spatial_index(swimlane)
                 modify_flag = True
 
         if modify_flag:
@@ -1514,6 +1799,7 @@ class FlowchartTool(tk.Tk):
                     edge_obj.change_edge_wrap_margin_4line(increase=increase, canvas=self.canvas)
                 elif len(edge_obj.points) == 12:
                     edge_obj.change_edge_wrap_margin_5line(increase=increase, canvas=self.canvas)
+                self._update_spatial_index(edge_obj)
                 
 
     def on_mouse_wheel_ctrl(self, event):
@@ -1533,6 +1819,7 @@ class FlowchartTool(tk.Tk):
                     swimlane.change_height(increase=True)
                 else:
                     swimlane.change_height(increase=False)
+                self._update_spatial_index(swimlane)
                 modify_flag = True
 
         if modify_flag:
@@ -1554,6 +1841,7 @@ class FlowchartTool(tk.Tk):
             if edge_obj is None:
                 return
             edge_obj.rotate_connection_points(increase=increase, canvas=self.canvas)
+            self._update_spatial_index(edge_obj)
 
     def rotate_edge_label_position(self, increase=True):
         # print("Rotate edge label position")
@@ -1592,16 +1880,154 @@ class FlowchartTool(tk.Tk):
 
         self.ai_chat_frame.place_configure(x=self.ai_chat_x, y=0, height=h, width=ct.AI_CHAT_WIDTH)
 
+    # ------------ ドラッグ描画の間引き ------------
+
+    def _schedule_drag_frame(self, handler, event):
+        """ドラッグ中のマウス移動イベントを間引き、最新の位置だけをアイドル時に1回反映する"""
+        if not ct.DRAG_PARAMS["coalesce_motion"]:
+            handler(event)
+            return
+        self._drag_frame = (handler, event)
+        if self._drag_frame_id is None:
+            self._drag_frame_id = self.after_idle(self._run_drag_frame)
+
+    def _run_drag_frame(self):
+        self._drag_frame_id = None
+        drag_frame = self._drag_frame
+        self._drag_frame = None
+        if drag_frame is not None:
+            handler, event = drag_frame
+            handler(event)
+
+    def _flush_drag_frame(self):
+        """保留中のマウス移動を即時に反映（ドラッグ終了時用）"""
+        if self._drag_frame_id is not None:
+            self.after_cancel(self._drag_frame_id)
+        self._run_drag_frame()
+
+    def _defer_relayout(self, node_ids=(), edge_objs=()):
+        """ドラッグ中のノードの関連エッジ・ノート（またはエッジ）の再レイアウトを、ポインタが止まるかドラッグ終了まで遅延"""
+        self._drag_relayout_node_ids.update(node_ids)
+        self._drag_relayout_edges.update(edge_objs)
+        if not ct.DRAG_PARAMS["defer_relayout"]:
+            self._flush_relayout()
+            return
+        if self._drag_settle_id is not None:
+            self.after_cancel(self._drag_settle_id)
+        self._drag_settle_id = self.after(ct.DRAG_PARAMS["settle_delay_ms"], self._flush_relayout)
+
+    def _flush_relayout(self):
+        """保留中の再レイアウトを実行"""
+        if self._drag_settle_id is not None:
+            self.after_cancel(self._drag_settle_id)
+            self._drag_settle_id = None
+        node_ids = self._drag_relayout_node_ids
+        edge_objs = self._drag_relayout_edges
+        if not node_ids and not edge_objs:
+            return
+        self._drag_relayout_node_ids = set()
+        self._drag_relayout_edges = set()
+        for nid in node_ids:
+            if nid in self.nodes:
+                self._update_notes_for_node(nid)
+                self._update_edges_for_node(nid)
+        for edge_obj in edge_objs:
+            if self.edges.get(self._edge_key(edge_obj)) is edge_obj:
+                self._update_edge(edge_obj)
+
+    def _start_group_drag(self):
+        """複数選択中のドラッグ開始時に、選択中のオブジェクトのキャンバスアイテムにタグを付け、ドラッグ中は canvas.move で一括移動する"""
+        self._group_drag = None
+        if not ct.DRAG_PARAMS["live_group_drag"]:
+            return
+        node_ids = [nid for nid in self.selected_node_ids if nid in self.nodes]
+        swimlanes = [swimlane_obj for swimlane_obj in self.selected_swimlanes if swimlane_obj.frame_id is not None]
+        if len(node_ids) + len(swimlanes) <= 1:
+            return
+        # 前回のドラッグのタグが残っていても、今回の対象だけを移動する
+        self.canvas.dtag("drag_group", "drag_group")
+
+        item_ids = []
+        node_id_set = set(node_ids)
+        inner_edges = {}
+        boundary_edges = {}
+        for nid in node_ids:
+            node_obj = self.nodes[nid]
+            item_ids += [node_obj.shape_id, node_obj.text_id]
+            note_obj = self.notes_by_node_id.get(nid)
+            if note_obj is not None:
+                item_ids += [note_obj.shape_id, note_obj.line_id, note_obj.text_id]
+            for edge_obj in self.get_edges_for_node(nid):
+                if edge_obj.from_node_obj.id in node_id_set and edge_obj.to_node_obj.id in node_id_set:
+                    # 選択範囲内のエッジは平行移動するだけ
+                    item_ids += [edge_obj.line_id, edge_obj.label_id]
+                    inner_edges[id(edge_obj)] = edge_obj
+                else:
+                    # 選択範囲の境界をまたぐエッジは再レイアウトする
+                    boundary_edges[id(edge_obj)] = edge_obj
+        for swimlane_obj in swimlanes:
+            item_ids += [swimlane_obj.frame_id, swimlane_obj.top_id, swimlane_obj.bottom_id, swimlane_obj.top_text_id, swimlane_obj.bottom_text_id]
+        for item_id in set(item_ids):
+            if item_id is not None:
+                self.canvas.addtag_withtag("drag_group", item_id)
+
+        self._group_drag = {
+            "node_origins": {nid: (self.nodes[nid].x, self.nodes[nid].y) for nid in node_ids},
+            "inner_edges": list(inner_edges.values()),
+            "boundary_edges": list(boundary_edges.values()),
+            "dx": 0,
+            "dy": 0,
+        }
+
+    def _move_group_drag(self, dx, dy):
+        """選択中のオブジェクト全体をドラッグ開始位置から (dx, dy) の位置へ移動（キャンバス上は1回の canvas.move）"""
+        group_drag = self._group_drag
+        step_x = dx - group_drag["dx"]
+        step_y = dy - group_drag["dy"]
+        if step_x == 0 and step_y == 0:
+            return
+        self.canvas.move("drag_group", step_x, step_y)
+        group_drag["dx"], group_drag["dy"] = dx, dy
+        # 境界をまたぐエッジの再レイアウト用に、ノードの位置だけを更新
+        for nid, (origin_x, origin_y) in group_drag["node_origins"].items():
+            node_obj = self.nodes.get(nid)
+            if node_obj is not None:
+                node_obj.x, node_obj.y = origin_x + dx, origin_y + dy
+        self._defer_relayout(edge_objs=group_drag["boundary_edges"])
+
+    def _end_group_drag(self):
+        """複数選択ドラッグを終了し、ドラッグ開始時の状態に戻す（最終位置への移動は on_drag_end で行う）"""
+        group_drag = self._group_drag
+        if group_drag is None:
+            return
+        self._group_drag = None
+        self._drag_relayout_edges.difference_update(group_drag["boundary_edges"])
+        moved = group_drag["dx"] != 0 or group_drag["dy"] != 0
+        if moved:
+            self.canvas.move("drag_group", -group_drag["dx"], -group_drag["dy"])
+        self.canvas.dtag("drag_group", "drag_group")
+        for nid, (origin_x, origin_y) in group_drag["node_origins"].items():
+            node_obj = self.nodes.get(nid)
+            if node_obj is not None:
+                node_obj.x, node_obj.y = origin_x, origin_y
+        if moved:
+            for edge_obj in group_drag["boundary_edges"]:
+                if self.edges.get(self._edge_key(edge_obj)) is edge_obj:
+                    self._update_edge(edge_obj)
+
     def drag_data_init(self):
         self.drag_data = {"mode": None, "node_id": None, "shape_id": None, "drag_start_x": 0, "drag_start_y": 0, "drag_pre_x": 0, "drag_pre_y": 0, "drag_end_x": 0, "drag_end_y": 0}
 
     def temporary_data_init(self):
         if self.temporary_edge is not None:
             if self.temporary_edge.line_id is not None:
+                canvas_item_registry.unregister(self.canvas, self.temporary_edge.line_id, self.temporary_edge.label_id)
                 self.canvas.delete(self.temporary_edge.line_id)
             self.temporary_edge = None
         if self.temporary_node is not None:
+            self.spatial_index.remove(self.temporary_node)
             if self.temporary_node.shape_id is not None:
+                canvas_item_registry.unregister(self.canvas, self.temporary_node.shape_id, self.temporary_node.text_id)
                 self.canvas.delete(self.temporary_node.shape_id)
             self.temporary_node = None
 
@@ -1627,19 +2053,17 @@ class FlowchartTool(tk.Tk):
             if self.current_terminator_kind == "Terminator_small":
                 w = ct.NODE_TERMINATOR_PARAMS["width"]  // 2
 
-        node_obj = Node(node_id, node_type, adjusted_x, adjusted_y, w=w, h=h, shape_type=shape_type, fill_color=fill_color, text=auto_text, status=status, details=details, canvas=self.canvas)
+        node_obj = Node(node_id, node_type, adjusted_x, adjusted_y, w=w, h=h, shape_type=shape_type, fill_color=fill_color, text=auto_text, status=status, details=details, canvas=self._drawing_canvas())
         self.nodes[node_id] = node_obj
+        self._mark_history_dirty(node_obj)
+        self._update_spatial_index(node_obj)
 
         if details is not None:
             if note_data is None:
                 note_data = {"dx": None, "dy": None, "display_state": "normal"}
-            note_obj = self.create_note(text=details, dx=note_data.get("dx"), dy=note_data.get("dy"), base_node=node_obj, display_state=note_data.get("display_state"), canvas=self.canvas)
-            if note_obj is not None and note_obj.shape_id is not None:
-                self.notes[note_obj.shape_id] = note_obj
-
-        # ノードは常に最前面に
-        self.canvas.tag_raise("node")
-        self.canvas.tag_raise("note")
+            note_obj = self.create_note(text=details, dx=note_data.get("dx"), dy=note_data.get("dy"), base_node=node_obj, display_state=note_data.get("display_state"), canvas=self._drawing_canvas())
+            if note_obj is not None and (note_obj.shape_id is not None or self._defer_drawing):
+                self._register_note(note_obj)
 
     def duplicate_node(self, original_node):
         # print(f"Duplicating node id: {original_node.id}")
@@ -1656,6 +2080,8 @@ class FlowchartTool(tk.Tk):
 
         duplicated_node_obj = Node(new_node_id, original_node.type, adjusted_x, adjusted_y, w=original_node.w, h=original_node.h, shape_type=original_node.shape_type, fill_color=original_node.fill_color, text=original_node.text, status=original_node.status, details=original_node.details, canvas=self.canvas)
         self.nodes[new_node_id] = duplicated_node_obj
+        self._mark_history_dirty(duplicated_node_obj)
+        self._update_spatial_index(duplicated_node_obj)
 
         if original_node.details is not None:
             note_obj = self.get_note_for_node(original_node.id)  # ノードに紐づくノートを取得
@@ -1665,11 +2091,7 @@ class FlowchartTool(tk.Tk):
                 note_display_state = note_obj.display_state
                 duplicated_note_obj = self.create_note(text=duplicated_node_obj.details, dx=note_dx, dy=note_dy, base_node=duplicated_node_obj, display_state=note_display_state, canvas=self.canvas)
                 if duplicated_note_obj is not None and duplicated_note_obj.shape_id is not None:
-                    self.notes[duplicated_note_obj.shape_id] = duplicated_note_obj
-
-        # ノードは常に最前面に
-        self.canvas.tag_raise("node")
-        self.canvas.tag_raise("note")
+                    self._register_note(duplicated_note_obj)
 
     def auto_node_text(self, node_type, text):
         # Terminator ノードには自動で "Start"/"End" テキストを設定
@@ -1753,15 +2175,7 @@ class FlowchartTool(tk.Tk):
     def _set_node_to_selected_outline_color(self, node_obj):
         if node_obj is None or node_obj.shape_id is None:
             return
-        selected_outline_color = {
-            ct.NODE_PROCESS_PARAMS["type"]: ct.NODE_PROCESS_PARAMS["selected_outline_color"],
-            ct.NODE_DECISION_PARAMS["type"]: ct.NODE_DECISION_PARAMS["selected_outline_color"],
-            ct.NODE_TERMINATOR_PARAMS["type"]: ct.NODE_TERMINATOR_PARAMS["selected_outline_color"],
-            ct.NODE_IO_PARAMS["type"]: ct.NODE_IO_PARAMS["selected_outline_color"],
-            ct.NODE_STORAGE_PARAMS["type"]: ct.NODE_STORAGE_PARAMS["selected_outline_color"],
-            ct.NODE_DOCUMENT_PARAMS["type"]: ct.NODE_DOCUMENT_PARAMS["selected_outline_color"],
-        }.get(node_obj.type, ct.NODE_DEFAULT_PARAMS["selected_outline_color"])
-        self.canvas.itemconfig(node_obj.shape_id, outline=selected_outline_color)
+        self.canvas.itemconfig(node_obj.shape_id, outline=node_obj.get_selected_outline_color())
 
     # エッジの色をオリジナルの定義に戻す
     def _reset_edge_to_original_color(self, edge_obj):
@@ -1775,14 +2189,12 @@ class FlowchartTool(tk.Tk):
             for node_id in self.selected_node_ids:
                 if node_id in self.nodes:
                     self.nodes[node_id].status = status
-                    fill_color = self.nodes[node_id].get_fill_color()
-                    outline_color = self.nodes[node_id].get_outline_color()
-                    outline_width = self.nodes[node_id].get_outline_width()
-                    text_color = self.nodes[node_id].get_text_color()
-                    self.canvas.itemconfig(self.nodes[node_id].shape_id, fill=fill_color, outline=outline_color, width=outline_width)
+                    if self.nodes[node_id].shape_id is None:
+                        continue
+                    style = self.nodes[node_id].get_style()
+                    self.canvas.itemconfig(self.nodes[node_id].shape_id, fill=style.fill_color, outline=style.outline_color, width=style.outline_width)
                     if self.nodes[node_id].text_id:
-                        font_family, font_size, font_weight, text_width, text_color = self.nodes[node_id]._get_text_params()
-                        self.canvas.itemconfig(self.nodes[node_id].text_id, fill=text_color, font=(font_family, font_size, font_weight))
+                        self.canvas.itemconfig(self.nodes[node_id].text_id, fill=style.text_color, font=font_registry.get(style.font_family, style.font_size, style.font_weight))
 
                     self._set_node_to_selected_outline_color(self.nodes[node_id])
         self.push_history()
@@ -1962,49 +2374,45 @@ class FlowchartTool(tk.Tk):
         # print(f"Deleting selected nodes: {nids}, self.nodes: {self.nodes}")  # for DEBUG
         line_id = self.selected_edge_id
         swimlanes = self.selected_swimlanes
-        if nids and len(nids) > 0:
-            for nid in nids:
-                if nid in self.nodes:
-                    # print(f"Deleting node id: {nid}")  # for DEBUG
-                    self.delete_selected_node(nid)
-        if line_id:
-            self.delete_selected_edge(line_id)
-        if swimlanes and len(swimlanes) > 0:
-            self.delete_selected_swimlanes()
+        with self.history_batch():
+            if nids and len(nids) > 0:
+                for nid in nids:
+                    if nid in self.nodes:
+                        # print(f"Deleting node id: {nid}")  # for DEBUG
+                        self.delete_selected_node(nid)
+            if line_id:
+                self.delete_selected_edge(line_id)
+            if swimlanes and len(swimlanes) > 0:
+                self.delete_selected_swimlanes()
 
         self.display_operation_info()  # 操作情報表示制御
 
     def delete_selected_node(self, nid):
+        self._remove_node(nid)
+        if nid in self.selected_node_ids:
+            self.selected_node_ids.remove(nid)
+        self.push_history()
+
+    def _remove_node(self, nid):
+        """ノードと関連エッジ・ノートを削除（履歴には記録しない）"""
         node_obj = self.nodes[nid]
         if node_obj:
-            if node_obj.shape_id:
-                self.canvas.delete(node_obj.shape_id)
-            if node_obj.text_id:
-                self.canvas.delete(node_obj.text_id)
+            node_obj.delete(self.canvas)
 
         # 要素削除に伴う関連エッジの削除
-        edges_to_keep = {}
-        for edge_line_id, edge_obj in self.edges.items():
-            from_node_id = edge_obj.from_node_obj.id if edge_obj.from_node_obj else None
-            to_node_id = edge_obj.to_node_obj.id if edge_obj.to_node_obj else None
-            if edge_line_id and from_node_id and to_node_id and (from_node_id == nid or to_node_id == nid):
-                self.canvas.delete(edge_line_id)
-                if edge_obj.label_id:
-                    self.canvas.delete(edge_obj.label_id)
-            else:
-                edges_to_keep[edge_line_id] = edge_obj
-        self.edges = edges_to_keep
+        for edge_obj in self.get_edges_for_node(nid):
+            self._remove_edge(edge_obj)
+        self.edges_out.pop(nid, None)
+        self.edges_in.pop(nid, None)
+        self.spatial_index.remove(node_obj)
 
         note_obj = self.get_note_for_node(node_obj.id)
         if note_obj is not None:
+            self._unregister_note(self._note_key(note_obj))
             note_obj.delete(self.canvas)
-            if note_obj.shape_id in self.notes:
-                del self.notes[note_obj.shape_id]
 
         del self.nodes[nid]
-        if nid in self.selected_node_ids:
-            self.selected_node_ids.remove(nid)
-        self.push_history()
+        self._mark_history_dirty(node_obj)
 
     def delete_selected_edge(self, line_id):
         edge_to_delete = None
@@ -2021,6 +2429,8 @@ class FlowchartTool(tk.Tk):
         if selected_swimlanes and len(selected_swimlanes) > 0:
             for selected_swimlane_obj in selected_swimlanes:
                 selected_swimlane_obj.delete()
+                self.spatial_index.remove(selected_swimlane_obj)
+                self._mark_history_dirty(selected_swimlane_obj)
             new_swimlanes = []
             for swimlane_obj in self.swimlanes:
                 if not swimlane_obj in selected_swimlanes:
@@ -2034,6 +2444,8 @@ class FlowchartTool(tk.Tk):
         for swimlane_obj in self.swimlanes:
             if swimlane_obj.frame_id == shape_id:
                 swimlane_obj.delete()
+                self.spatial_index.remove(swimlane_obj)
+                self._mark_history_dirty(swimlane_obj)
             else:
                 new_swimlanes.append(swimlane_obj)
         self.swimlanes = new_swimlanes  
@@ -2046,9 +2458,9 @@ class FlowchartTool(tk.Tk):
         if not items:
             return None
         for item in reversed(items):
-            for nid, node_obj in self.nodes.items():
-                if item in (node_obj.shape_id, node_obj.text_id):
-                    return nid
+            owner = canvas_item_registry.owner_of(self.canvas, item)
+            if isinstance(owner, Node) and item in (owner.shape_id, owner.text_id) and self.nodes.get(owner.id) is owner:
+                return owner.id
         return None
     
     def edge_at(self, x, y):
@@ -2057,9 +2469,9 @@ class FlowchartTool(tk.Tk):
         if not items:
             return None
         for item in reversed(items):
-            for edge_line_id, edge_obj in self.edges.items():
-                if item == edge_line_id or item == edge_obj.label_id:
-                    return edge_obj
+            owner = canvas_item_registry.owner_of(self.canvas, item)
+            if isinstance(owner, Edge) and item in (owner.line_id, owner.label_id) and self.edges.get(owner.line_id) is owner:
+                return owner
         return None
 
     def swimlane_at(self, x, y):
@@ -2068,11 +2480,9 @@ class FlowchartTool(tk.Tk):
         if not items:
             return None
         for item in reversed(items):
-            for swimlane_obj in self.swimlanes:
-                swimlane_top_id = swimlane_obj.top_id
-                swimlane_bottom_id = swimlane_obj.bottom_id
-                if item == swimlane_top_id or item == swimlane_bottom_id:
-                    return swimlane_obj
+            owner = canvas_item_registry.owner_of(self.canvas, item)
+            if isinstance(owner, Swimlane) and item in (owner.top_id, owner.bottom_id):
+                return owner
         return None
 
     def note_at(self, x, y):
@@ -2081,10 +2491,9 @@ class FlowchartTool(tk.Tk):
         if not items:
             return None
         for item in reversed(items):
-            for shape_id, note_obj in self.notes.items():
-                note_text_id = note_obj.text_id
-                if item == shape_id or item == note_text_id:
-                    return note_obj
+            owner = canvas_item_registry.owner_of(self.canvas, item)
+            if isinstance(owner, Note) and item in (owner.shape_id, owner.text_id) and self.notes.get(owner.shape_id) is owner:
+                return owner
         return None
 
     @staticmethod
@@ -2112,7 +2521,7 @@ class FlowchartTool(tk.Tk):
                         text=auto_text, canvas=self.canvas)
 
         if edge_obj is not None and edge_obj.line_id is not None:
-            self.edges[edge_obj.line_id] = edge_obj
+            self._register_edge(edge_obj)
         self.push_history()
 
     def create_temporary_node(self, event, refresh_flag):
@@ -2162,21 +2571,20 @@ class FlowchartTool(tk.Tk):
         """edge_obj を削除"""
         if edge_obj is None:
             return
-        self.canvas.delete(edge_obj.line_id)
-        if edge_obj.label_id:
-            self.canvas.delete(edge_obj.label_id)
-        del self.edges[edge_obj.line_id]
+        self._remove_edge(edge_obj)
         self.push_history()
 
+    def _remove_edge(self, edge_obj):
+        """エッジを削除（履歴には記録しない）"""
+        self._unregister_edge(edge_obj)
+        edge_obj.delete(self.canvas)
+
     def auto_edge_label(self, text, from_node_obj):
         # Decision ノードから出るエッジには Yes/No ラベルを自動設定
         if text is None:
             if from_node_obj.type == ct.NODE_DECISION_PARAMS["type"]:
                 from_node_id = from_node_obj.id
-                existing = []
-                for one_edge_line_id, one_edge_obj in self.edges.items():
-                    if one_edge_obj.from_node_obj and one_edge_obj.from_node_obj.id == from_node_id:
-                        existing.append(one_edge_obj)
+                existing = [self.edges[one_edge_line_id] for one_edge_line_id in self.edges_out.get(from_node_id, ())]
                 used_labels = {edge_obj.label_text for edge_obj in existing}
                 if "Yes" not in used_labels:
                     text = ct.DECISION_YES
@@ -2191,16 +2599,24 @@ class FlowchartTool(tk.Tk):
         adjusted_x, adjusted_y = self.adjusted_swimlane_xy(None, x, y)
         swimlane_obj = Swimlane(canvas=self.canvas, kind=self.current_swimlane_kind, title=ct.SWIMLANE_PARAMS["title"],
                                  header_center_x=adjusted_x, header_center_y=adjusted_y)
-        self.swimlanes.append(swimlane_obj)
+        self._register_swimlane(swimlane_obj)
         self.push_history()
 
+    def _register_swimlane(self, swimlane_obj):
+        """スイムレーンを登録（履歴用の識別子を採番）"""
+        if swimlane_obj.uid is None:
+            swimlane_obj.uid = next(self._uid_counter)
+        self.swimlanes.append(swimlane_obj)
+        self._mark_history_dirty(swimlane_obj)
+        self._update_spatial_index(swimlane_obj)
+
     def duplicate_swimlane(self, original_swimlane):
         adjusted_x, adjusted_y = self.adjusted_swimlane_xy(None, original_swimlane.header_center_x, original_swimlane.header_center_y)
         clone_swimlane_obj = Swimlane(canvas=self.canvas, kind=original_swimlane.kind, title=original_swimlane.title,
                                         header_center_x=adjusted_x, header_center_y=adjusted_y,
                                         width=original_swimlane.width, height=original_swimlane.height,
                                         fill_color=original_swimlane.fill_color)
-        self.swimlanes.append(clone_swimlane_obj)
+        self._register_swimlane(clone_swimlane_obj)
         # self.push_history()
 
         return clone_swimlane_obj
@@ -2234,130 +2650,351 @@ class FlowchartTool(tk.Tk):
 
     def import_model(self, data, push_to_history=False):
         """モデルを読み込み、Canvasを再構築"""
-        self.canvas.delete("all")
-        self.nodes.clear()
-        self.edges.clear()
-        self.swimlanes.clear()
-        self.notes.clear()
-        self.selected_node_ids = []
-        self.selected_edge_id = None
-        self.link_start_node_id = None
-        self.selected_swimlanes = []
+        with self.history_batch(), self.deferred_drawing(len(data.get("nodes", []))):
+            self.canvas.delete("all")
+            canvas_item_registry.clear(self.canvas)
+            layer_manager.reset(self.canvas)
+            self.spatial_index.clear()
+            self._viewport_drawn.clear()
+            self.nodes.clear()
+            self._clear_edges()
+            self.swimlanes.clear()
+            self._clear_notes()
+            self._history_dirty_all = True
+            self.selected_node_ids = []
+            self.selected_edge_id = None
+            self.link_start_node_id = None
+            self.selected_swimlanes = []
  
-        # グリッド
-        self._draw_grid()
-
-        nodes_data = data.get("nodes", [])
-        edges_data = data.get("edges", [])
-        swimlanes_data = data.get("swimlanes", [])
-
-        # ノード復元
-        max_id = 0
-        for nd in nodes_data:
-            nid = nd.get("id")
-            if nid is None:
-                continue
-            node_type = nd.get("type", ct.NODE_PROCESS_PARAMS["type"])
-            x = nd.get("x", 0)
-            y = nd.get("y", 0)
-            w = nd.get("w", Node.get_width_of_type(node_type))
-            h = nd.get("h", Node.get_height_of_type(node_type))
-            shape_type = nd.get("shape_type", None)
-            fill_color = nd.get("fill_color", None)
-            text = nd.get("text", "")
-            status = nd.get("status", None)
-            details = nd.get("details", None)
-            note_data = nd.get("note", None)
-            # print(f"Importing node id: {nid}, type: {node_type}, x: {x}, y: {y}, w: {w}, h: {h}, shape_type: {shape_type}, fill_color: {fill_color}, text: {text}, status: {status}, details: {details}, note_data: {note_data}")  # for DEBUG
-
-            self._create_node_with_id(nid, node_type, x, y, w=w, h=h, shape_type=shape_type, fill_color=fill_color, text=text, status=status, details=details, note_data=note_data)
-            if nid > max_id:
-                max_id = nid
-
-        self._id_counter = itertools.count(max_id + 1 if max_id > 0 else 1)
-
-        # エッジ復元
-        for ed in edges_data:
-            fid = ed.get("from_id")
-            tid = ed.get("to_id")
-            edge_type = ed.get("edge_type", ct.EDGE_TYPE_ELBOW)
-            path_type = ed.get("path_type", ct.EDGE_PARAMS["path_type"]) if edge_type == ct.EDGE_TYPE_ELBOW else None
-            default_line_style = ct.EDGE_PARAMS["line_style"] if edge_type == ct.EDGE_TYPE_ELBOW else ct.EDGE_LINE_STYLE_DOTTED
-            line_style = ed.get("line_style", default_line_style)
-            connection_mode = ed.get("connection_mode", None)
-            from_connection_point = ed.get("from_connection_point", None)
-            to_connection_point = ed.get("to_connection_point", None)
-            edge_wrap_margin = ed.get("edge_wrap_margin", None)
-            label = ed.get("label")
-            label_position = ed.get("label_position", None)
-            if fid in self.nodes and tid in self.nodes:
-                from_node_obj = self.nodes[fid]
-                to_node_obj = self.nodes[tid]
-                edge_obj = Edge(edge_type=edge_type, path_type=path_type, line_style=line_style, from_node_obj=from_node_obj, to_node_obj=to_node_obj, text=label, \
-                                        connection_mode=connection_mode, \
-                                        from_node_connection_point=from_connection_point, \
-                                        to_node_connection_point=to_connection_point, \
-                                        edge_wrap_margin=edge_wrap_margin, \
-                                        canvas=self.canvas, \
-                                        label_position=label_position)
-                if edge_obj is not None and edge_obj.line_id is not None:
-                    self.edges[edge_obj.line_id] = edge_obj
-
-        # スイムレーン復元
-        for sd in swimlanes_data:
-            kind = sd.get("kind", ct.SWIMLANE_PARAMS["kind"])
-            title = sd.get("title", ct.SWIMLANE_PARAMS["title"])
-            header_center_x = sd.get("header_center_x", 0)
-            header_center_y = sd.get("header_center_y", 0)
-            width = sd.get("width", 0)
-            height = sd.get("height", 0)
-            fill_color = sd.get("fill_color", ct.SWIMLANE_PARAMS["fill_color"])
-            swimlane_obj = Swimlane(canvas=self.canvas, kind=kind, title=title, header_center_x=header_center_x, header_center_y=header_center_y, width=width, height=height, fill_color=fill_color)
-            self.swimlanes.append(swimlane_obj)
-
-        # ノード・エッジ・スイムレーン階層調整
-        self.canvas.tag_raise("edge")
-        self.canvas.tag_raise("node")
-        self.canvas.tag_raise("note")
+            # グリッド
+            self._draw_grid()
+
+            nodes_data = data.get("nodes", [])
+            edges_data = data.get("edges", [])
+            swimlanes_data = data.get("swimlanes", [])
+
+            # ノード復元
+            max_id = 0
+            for nd in nodes_data:
+                nid = nd.get("id")
+                if nid is None:
+                    continue
+                node_type = nd.get("type", ct.NODE_PROCESS_PARAMS["type"])
+                x = nd.get("x", 0)
+                y = nd.get("y", 0)
+                w = nd.get("w", Node.get_width_of_type(node_type))
+                h = nd.get("h", Node.get_height_of_type(node_type))
+                shape_type = nd.get("shape_type", None)
+                fill_color = nd.get("fill_color", None)
+                text = nd.get("text", "")
+                status = nd.get("status", None)
+                details = nd.get("details", None)
+                note_data = nd.get("note", None)
+                # print(f"Importing node id: {nid}, type: {node_type}, x: {x}, y: {y}, w: {w}, h: {h}, shape_type: {shape_type}, fill_color: {fill_color}, text: {text}, status: {status}, details: {details}, note_data: {note_data}")  # for DEBUG
+
+                self._create_node_with_id(nid, node_type, x, y, w=w, h=h, shape_type=shape_type, fill_color=fill_color, text=text, status=status, details=details, note_data=note_data)
+                if nid > max_id:
+                    max_id = nid
+
+            self._id_counter = itertools.count(max_id + 1 if max_id > 0 else 1)
+
+            # エッジ復元
+            for ed in edges_data:
+                self._create_edge_from_dict(ed)
+
+            # スイムレーン復元
+            for sd in swimlanes_data:
+                swimlane_obj = self._create_swimlane_from_dict(sd)
+                self._register_swimlane(swimlane_obj)
 
-        self.canvas_resize_to_fit_data()
+            self.canvas_resize_to_fit_data()
 
-        if push_to_history:
-            self.push_history()
+            if push_to_history:
+                self.push_history()
         
         self.display_operation_info()  # 操作情報表示制御
 
+    def _create_edge_from_dict(self, ed, uid=None):
+        """to_dictで出力したデータからエッジを作成して登録"""
+        fid = ed.get("from_id")
+        tid = ed.get("to_id")
+        edge_type = ed.get("edge_type", ct.EDGE_TYPE_ELBOW)
+        path_type = ed.get("path_type", ct.EDGE_PARAMS["path_type"]) if edge_type == ct.EDGE_TYPE_ELBOW else None
+        default_line_style = ct.EDGE_PARAMS["line_style"] if edge_type == ct.EDGE_TYPE_ELBOW else ct.EDGE_LINE_STYLE_DOTTED
+        line_style = ed.get("line_style", default_line_style)
+        connection_mode = ed.get("connection_mode", None)
+        from_connection_point = ed.get("from_connection_point", None)
+        to_connection_point = ed.get("to_connection_point", None)
+        edge_wrap_margin = ed.get("edge_wrap_margin", None)
+        label = ed.get("label")
+        label_position = ed.get("label_position", None)
+        if fid in self.nodes and tid in self.nodes:
+            from_node_obj = self.nodes[fid]
+            to_node_obj = self.nodes[tid]
+            edge_obj = Edge(edge_type=edge_type, path_type=path_type, line_style=line_style, from_node_obj=from_node_obj, to_node_obj=to_node_obj, text=label, \
+                                    connection_mode=connection_mode, \
+                                    from_node_connection_point=from_connection_point, \
+                                    to_node_connection_point=to_connection_point, \
+                                    edge_wrap_margin=edge_wrap_margin, \
+                                    canvas=self._drawing_canvas(), \
+                                    label_position=label_position)
+            if edge_obj is not None and (edge_obj.line_id is not None or self._defer_drawing):
+                edge_obj.uid = uid
+                self._register_edge(edge_obj)
+                return edge_obj
+        return None
+
+    def _create_swimlane_from_dict(self, sd, uid=None):
+        """to_dictで出力したデータからスイムレーンを作成（登録は呼び出し側で行う）"""
+        kind = sd.get("kind", ct.SWIMLANE_PARAMS["kind"])
+        title = sd.get("title", ct.SWIMLANE_PARAMS["title"])
+        header_center_x = sd.get("header_center_x", 0)
+        header_center_y = sd.get("header_center_y", 0)
+        width = sd.get("width", 0)
+        height = sd.get("height", 0)
+        fill_color = sd.get("fill_color", ct.SWIMLANE_PARAMS["fill_color"])
+        return Swimlane(canvas=self.canvas, kind=kind, title=title, header_center_x=header_center_x, header_center_y=header_center_y, width=width, height=height, fill_color=fill_color, uid=uid)
+
 
     def undo(self):
-        if self.history_index <= 0:
+        delta = self.history.undo()
+        if delta is None:
             return
-        self.history_index -= 1
-        state = self.history[self.history_index]
-        self.import_model(state, push_to_history=False)
+        if self.mermaid_stream is not None:
+            self.mermaid_stream["edited"] = True
+        self._apply_history_delta(delta)
 
     def redo(self):
-        if self.history_index >= len(self.history) - 1:
+        delta = self.history.redo()
+        if delta is None:
             return
-        self.history_index += 1
-        state = self.history[self.history_index]
-        self.import_model(state, push_to_history=False)
+        if self.mermaid_stream is not None:
+            self.mermaid_stream["edited"] = True
+        self._apply_history_delta(delta)
 
     # ------------ 編集履歴の記録（UNDO/REDO用） ------------
 
     def push_history(self):
-        # print(f"Pushing history at index: {self.history_index + 1}")  # for DEBUG
-        """現在状態を履歴に追加（Undo/Redo用）"""
-        state = self.export_model()
-        if self.history_index < len(self.history) - 1:
-            self.history = self.history[:self.history_index + 1]
-        pre_snapshot = self.history[self.history_index] if self.history_index >= 0 else None
-        snapshot = json.loads(json.dumps(state))
-        if pre_snapshot != snapshot:
-            self.history.append(snapshot)
-            self.history_index += 1
-        # else:
+        # print(f"Pushing history at index: {self.history.index + 1}")  # for DEBUG
+        """現在状態と前回記録時との差分を履歴に追加（Undo/Redo用）"""
+        if self._batch_depth > 0:
+            self._batch_pending.add("history")
+            return
+        stream = self.mermaid_stream
+        if stream is not None and stream["feeding"]:
+            return  # 受信した部分の変更は _commit_stream_history で記録する
+        if self._commit_history() and stream is not None:
+            stream["edited"] = True     # AIの応答を受信中にユーザーが編集した
+        # if not self.history.commit(self._collect_history_records()):
         #     print(f"  No changes detected, not pushing to history.")  # for DEBUG
 
+    def _commit_history(self, keys=None, merge=False) -> bool:
+        """前回の記録以降の変更を履歴に追加（keys を指定した場合はそのオブジェクトだけ、merge=True の場合は直前の履歴にまとめる）"""
+        if self._history_dirty_all:
+            # モデル全体を置き換えた場合（読み込みなど）は、モデル全体から差分を求める
+            self._history_dirty_all = False
+            self._history_dirty = {category: set() for category in HISTORY_CATEGORIES}
+            return self.history.commit(self._collect_history_records(), merge=merge)
+        # 前回の記録以降に変更のあったオブジェクトだけを記録する
+        return self.history.commit_changes(self._collect_history_changes(keys), merge=merge)
+
+    def get_history_footprint(self):
+        """編集履歴のメモリ使用量（概算）を返す"""
+        return self.history.footprint()
+
+    @contextmanager
+    def history_batch(self):
+        """まとめて行う編集操作を1つの履歴として記録する
+
+        with self.history_batch(): の中では、履歴の記録・キャンバスサイズ調整・グリッド再描画を保留し、
+        最も外側のブロックを抜けた時点でそれぞれ1回だけ実行する
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            # 途中で失敗した編集操作は履歴に記録しない（保留中の処理を破棄して例外を再送出）
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._batch_pending = set()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            pending = self._batch_pending
+            self._batch_pending = set()
+            resized = False
+            if "resize" in pending:
+                resized = self.canvas_resize_to_fit_data()    # サイズが変わった場合はグリッド再描画も含む
+            if "grid" in pending and not resized:
+                self._draw_grid()
+            if "history" in pending:
+                self.push_history()
+
+    def _collect_history_records(self):
+        """履歴記録用に、現在のモデルをオブジェクト単位のデータに分解して返す"""
+        listener = self._mark_history_dirty
+        nodes_records = {}
+        for node_id, node_obj in self.nodes.items():
+            node_obj.history_listener = listener
+            nodes_records[node_id] = node_obj.to_dict()
+        notes_records = {}
+        for node_id, note_obj in self.notes_by_node_id.items():
+            note_obj.history_listener = listener
+            notes_records[node_id] = note_obj.to_dict()
+        edges_records = {}
+        for edge_obj in self.edges.values():
+            edge_obj.history_listener = listener
+            edges_records[edge_obj.uid] = edge_obj.to_dict()
+        swimlanes_records = {}
+        for swimlane_obj in self.swimlanes:
+            swimlane_obj.history_listener = listener
+            swimlanes_records[swimlane_obj.uid] = swimlane_obj.to_dict()
+        return {"nodes": nodes_records, "notes": notes_records, "edges": edges_records, "swimlanes": swimlanes_records}
+
+    def _mark_history_dirty(self, obj):
+        """オブジェクトを次回の履歴記録の対象にする（モデルへの登録・登録解除時と、履歴に記録する属性の変更時に呼び出される）"""
+        if obj.history_listener is None:
+            obj.history_listener = self._mark_history_dirty
+        if isinstance(obj, Node):
+            self._history_dirty["nodes"].add(obj.id)
+        elif isinstance(obj, Note):
+            if obj.base_node is not None:
+                self._history_dirty["notes"].add(obj.base_node.id)
+        elif isinstance(obj, Edge):
+            if obj.uid is not None:
+                self._history_dirty["edges"].add(obj.uid)
+        elif isinstance(obj, Swimlane):
+            if obj.uid is not None:
+                self._history_dirty["swimlanes"].add(obj.uid)
+
+    def _collect_history_changes(self, keys=None):
+        """履歴記録用に、前回の記録以降に変更のあったオブジェクトの現在のデータ（削除された場合は None）を返す
+
+        keys（{種類: キーの集合}）を指定した場合は、そのオブジェクトだけを返す（残りは次回の記録の対象のまま）
+        """
+        if keys is None:
+            dirty = self._history_dirty
+            self._history_dirty = {category: set() for category in HISTORY_CATEGORIES}
+        else:
+            dirty = {category: self._history_dirty[category] & keys.get(category, set()) for category in HISTORY_CATEGORIES}
+            for category in HISTORY_CATEGORIES:
+                self._history_dirty[category] -= dirty[category]
+        nodes_changes = {}
+        for node_id in dirty["nodes"]:
+            node_obj = self.nodes.get(node_id)
+            nodes_changes[node_id] = node_obj.to_dict() if node_obj is not None else None
+        notes_changes = {}
+        for node_id in dirty["notes"]:
+            note_obj = self.notes_by_node_id.get(node_id)
+            notes_changes[node_id] = note_obj.to_dict() if note_obj is not None else None
+        edges_changes = {}
+        for uid in dirty["edges"]:
+            edge_obj = self.edges_by_uid.get(uid)
+            edges_changes[uid] = edge_obj.to_dict() if edge_obj is not None else None
+        swimlanes_changes = {}
+        if dirty["swimlanes"]:
+            swimlanes_by_uid = {swimlane_obj.uid: swimlane_obj for swimlane_obj in self.swimlanes}
+            for uid in dirty["swimlanes"]:
+                swimlane_obj = swimlanes_by_uid.get(uid)
+                swimlanes_changes[uid] = swimlane_obj.to_dict() if swimlane_obj is not None else None
+        return {"nodes": nodes_changes, "notes": notes_changes, "edges": edges_changes, "swimlanes": swimlanes_changes}
+
+    def _apply_history_delta(self, delta):
+        """履歴の差分をモデルとCanvasに適用（変更のあったオブジェクトだけを更新）"""
+        self.cancel_selection_node_and_edge_and_swimlane()
+
+        nodes_delta = delta.get("nodes", {})
+        notes_delta = delta.get("notes", {})
+        edges_delta = delta.get("edges", {})
+        swimlanes_delta = delta.get("swimlanes", {})
+
+        # 変更・削除対象のエッジを削除（ノード削除より先に行う）
+        if edges_delta:
+            for uid in edges_delta:
+                edge_obj = self.edges_by_uid.get(uid)
+                if edge_obj is not None:
+                    self._remove_edge(edge_obj)
+
+        # 変更・削除対象のノートを削除
+        for node_id in notes_delta:
+            note_obj = self.notes_by_node_id.get(node_id)
+            if note_obj is not None:
+                self._unregister_note(self._note_key(note_obj))
+                note_obj.delete(self.canvas)
+
+        # ノードの追加・変更・削除
+        max_id = 0
+        for node_id, nd in nodes_delta.items():
+            node_obj = self.nodes.get(node_id)
+            if nd is None:
+                if node_obj is not None:
+                    self._remove_node(node_id)
+                continue
+            if node_obj is None:
+                node_obj = Node(node_id, nd.get("type", ct.NODE_PROCESS_PARAMS["type"]), nd.get("x", 0), nd.get("y", 0), w=nd.get("w"), h=nd.get("h"),
+                                shape_type=nd.get("shape_type"), fill_color=nd.get("fill_color"), text=nd.get("text", ""), status=nd.get("status"), details=nd.get("details"), canvas=self.canvas)
+                self.nodes[node_id] = node_obj
+                self._mark_history_dirty(node_obj)
+            else:
+                node_obj.delete(self.canvas)
+                node_obj.update_from_dict(nd)
+                node_obj.draw(self.canvas)
+            self._update_spatial_index(node_obj)
+            if node_id > max_id:
+                max_id = node_id
+        if max_id > 0:
+            # 復元したノードIDと新規ノードIDが重複しないようにカウンタを進める
+            next_id = next(self._id_counter)
+            self._id_counter = itertools.count(max(next_id, max_id + 1))
+
+        # ノートの追加・変更
+        for node_id, note_data in notes_delta.items():
+            node_obj = self.nodes.get(node_id)
+            if note_data is None or node_obj is None:
+                continue
+            node_obj.details = note_data.get("text", node_obj.details)
+            note_obj = self.create_note(text=node_obj.details, dx=note_data.get("dx"), dy=note_data.get("dy"), base_node=node_obj, display_state=note_data.get("display_state"), canvas=self.canvas)
+            if note_obj is not None and note_obj.shape_id is not None:
+                self._register_note(note_obj)
+
+        # エッジの追加・変更
+        for uid, ed in edges_delta.items():
+            if ed is not None:
+                self._create_edge_from_dict(ed, uid=uid)
+
+        # 変更のあったノードの関連エッジ・ノートを再レイアウト
+        for node_id, nd in nodes_delta.items():
+            if nd is not None and node_id in self.nodes:
+                self._update_edges_for_node(node_id)
+                self._update_notes_for_node(node_id)
+
+        # スイムレーンの追加・変更・削除（変更は同じ位置で置き換え）
+        if swimlanes_delta:
+            new_swimlanes = []
+            for swimlane_obj in self.swimlanes:
+                if swimlane_obj.uid in swimlanes_delta:
+                    sd = swimlanes_delta[swimlane_obj.uid]
+                    swimlane_obj.delete()
+                    self.spatial_index.remove(swimlane_obj)
+                    self._mark_history_dirty(swimlane_obj)
+                    if sd is not None:
+                        new_swimlanes.append(self._create_swimlane_from_dict(sd, uid=swimlane_obj.uid))
+                else:
+                    new_swimlanes.append(swimlane_obj)
+            existing_uids = {swimlane_obj.uid for swimlane_obj in self.swimlanes}
+            for uid, sd in swimlanes_delta.items():
+                if sd is not None and uid not in existing_uids:
+                    new_swimlanes.append(self._create_swimlane_from_dict(sd, uid=uid))
+            self.swimlanes = new_swimlanes
+            for swimlane_obj in self.swimlanes:
+                if swimlane_obj.uid in swimlanes_delta:
+                    self._mark_history_dirty(swimlane_obj)
+                    self._update_spatial_index(swimlane_obj)
+
+        self.canvas_resize_to_fit_data()
+
+        self.display_operation_info()  # 操作情報表示制御
+
     # ------------ JSON保存/読み込み ------------
 
     def save_json(self):
@@ -2377,6 +3014,8 @@ class FlowchartTool(tk.Tk):
             messagebox.showerror("Error", f"{ct.SAVE_FAILED_MESSAGE}: {e}")
 
     def load_json(self):
+        if self._blocked_by_mermaid_stream():
+            return
         filename = filedialog.askopenfilename(
             filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
         )
@@ -2566,7 +3205,7 @@ class FlowchartTool(tk.Tk):
         note_obj.finish_text_edit(commit)
 
         if note_obj.base_node.details is None:
-            del self.notes[note_shape_id]
+            self._unregister_note(note_shape_id)
             # print(f"Note for node id {note_obj.base_node.id} deleted because details is empty")  # for DEBUG
 
         if commit:
@@ -2652,14 +3291,23 @@ class FlowchartTool(tk.Tk):
                 return swimlane_obj
         return None
 
-    def _move_node_graphics(self, node_obj):
+    def _move_node_graphics(self, node_obj, relayout=True):
+        """ノードの図形を現在位置に移動（relayout=False の場合は関連ノートの再レイアウトと階層調整を省略）"""
         x, y = node_obj.x, node_obj.y
         w, h = node_obj.w, node_obj.h
         left, top, right, bottom = x - w/2, y - h/2, x + w/2, y + h/2
+        if node_obj is not self.temporary_node:     # リンク作成中の一時的なノードは登録しない
+            self._update_spatial_index(node_obj)
 
         shape_id = node_obj.shape_id
         node_type = node_obj.type
 
+        if shape_id is None:
+            # 未描画（仮想化描画）のノードはノートの位置だけを更新
+            if relayout:
+                self._update_notes_for_node(node_obj.id)
+            return
+
         if node_type == ct.NODE_PROCESS_PARAMS["type"]:    # 処理
             points = node_obj.get_process_points()
             self.canvas.coords(shape_id, *points)
@@ -2689,34 +3337,39 @@ class FlowchartTool(tk.Tk):
         else:
             self.canvas.coords(node_obj.text_id, x, y)
 
-        self._update_notes_for_node(node_obj.id)
-        self.canvas.tag_raise("node")
-        self.canvas.tag_raise("note")
+        if relayout:
+            self._update_notes_for_node(node_obj.id)
 
 
     def _update_notes_for_node(self, nid):
         # print(f"Updating notes for node {nid}")  # for DEBUG
         """ノード移動時に関連ノートを再レイアウト"""
-        for note_shape_id, note_obj in self.notes.items():
-            if note_obj.base_node and note_obj.base_node.id == nid:
-                note_obj.redraw()
+        note_obj = self.notes_by_node_id.get(nid)
+        if note_obj is not None:
+            note_obj.redraw()
+            self._update_spatial_index(note_obj)
 
     def _update_edges_for_node(self, nid):
         """ノード移動時に関連エッジとラベルを再レイアウト"""
-        for edge_line_id, edge_obj in self.edges.items():
-            if (edge_obj.from_node_obj and edge_obj.from_node_obj.id == nid) or (edge_obj.to_node_obj and edge_obj.to_node_obj.id == nid):
-                self._update_edge(edge_obj)
-                edge_obj.edge_wrap_ratio1, edge_obj.edge_wrap_ratio2 = edge_obj.get_edge_wrap_ratios()
-
-        self.canvas.tag_lower("edge", "node")
+        for edge_obj in self.get_edges_for_node(nid):
+            self._update_edge(edge_obj)
+            edge_obj.edge_wrap_ratio1, edge_obj.edge_wrap_ratio2 = edge_obj.get_edge_wrap_ratios()
     
     def _update_edge(self, edge_obj):
         """エッジとラベルを再レイアウト"""
         from_node_obj = edge_obj.from_node_obj
         to_node_obj = edge_obj.to_node_obj
+        if edge_obj.line_id is None and from_node_obj and to_node_obj:
+            # 未描画（仮想化描画）のエッジは座標だけを更新
+            Edge._compute_edge_geometry(edge_obj, from_node_obj, to_node_obj)
+            if edge_obj is not self.temporary_edge:
+                self._update_spatial_index(edge_obj)
+            return
         if edge_obj.line_id and from_node_obj and to_node_obj:
             coords, label_x, label_y, anchor, justify = Edge._compute_edge_geometry(edge_obj, from_node_obj, to_node_obj)
             edge_obj.update_points(self.canvas, coords, label_x, label_y)
+            if edge_obj is not self.temporary_edge:
+                self._update_spatial_index(edge_obj)
 
             self.canvas.coords(edge_obj.line_id, *coords)
             if edge_obj.label_text is not None and edge_obj.label_id is not None:
@@ -2738,6 +3391,7 @@ class FlowchartTool(tk.Tk):
         w = int(self.canvas.winfo_width() * scaling) - 4
         h = int(self.canvas.winfo_height() * scaling) - 4
         bbox = (x, y, x + w, y + h)  # (left, top, right, bottom)
+        from PIL import ImageGrab   # 画面キャプチャでのみ使用するため、起動を速くするためにここで読み込む
         img = ImageGrab.grab(bbox=bbox, all_screens=True)
 
         # 拡張子に合わせて保存（JPEGはRGB必須）
@@ -2748,22 +3402,113 @@ class FlowchartTool(tk.Tk):
         else:
             img.save(file_path, "PNG")
 
+    def get_export_scene(self) -> export_scene.ExportScene:
+        """画像・ベクター出力用に現在のモデルを返す（描画状態によらずモデル全体）"""
+        return export_scene.from_objects(self.nodes.values(), self.edges.values(), self.notes.values(), self.swimlanes)
+
+    def save_model_as_image(self, file_path: str, scale: Optional[float] = None, on_complete=None):
+        """画面をキャプチャせず、モデルから直接描画して保存（表示範囲外・画面より大きい図も出力できる）
+
+        on_complete を指定した場合、タイル分割で出力する大きな画像はバックグラウンドで出力し、
+        終了後に on_complete(エラー、正常終了の場合は None) を呼び出す（それ以外は保存後にすぐ呼び出す）
+        """
+        renderer = image_renderer.ImageRenderer(scale=scale)
+        scene = self.get_export_scene()
+        # 1枚で描画する場合もタイル分割する場合も、同じ範囲（モデル全体＋余白）を出力する
+        area = scene.bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+        if file_path.lower().endswith((".png", ".dzi")):
+            width, height = renderer.image_size(area)
+            # 1枚で描画する場合は、アンチエイリアス用に拡大した画像をメモリに保持する
+            rendered_pixels = width * height * renderer.supersampling ** 2
+            if file_path.lower().endswith(".dzi") or rendered_pixels >= ct.EXPORT_PARAMS["tiled_export_min_pixels"]:
+                # 大きな画像は1枚で描画せず、タイルに分割して複数プロセスで描画する
+                self.save_model_as_tiled_image(file_path, renderer.scale, area, on_complete)
+                return
+        image = renderer.render(scene, area)
+        image_renderer.save_image(image, file_path)
+        if on_complete is not None:
+            on_complete(None)
+
+    def save_model_as_tiled_image(self, file_path: str, scale: Optional[float] = None, area: Optional[Tuple[float, float, float, float]] = None, on_complete=None):
+        """保存形式のモデルを各プロセスに渡して、タイルごとに描画する（.dzi の場合はタイルピラミッドを出力）
+
+        on_complete を指定した場合は、GUIを止めないようにバックグラウンドのスレッドで出力し、
+        終了後に on_complete(エラー、正常終了の場合は None) をGUIのスレッドで呼び出す
+        """
+        import tiled_export  # 出力時にのみ使用するため、起動を速くするためにここで読み込む
+        model_data = self.export_model()   # 出力中にモデルを編集しても影響しないように、開始時のモデルを渡す
+        if area is None:
+            area = self.get_export_scene().bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+
+        def export():
+            if file_path.lower().endswith(".dzi"):
+                tiled_export.export_tile_pyramid(model_data, file_path, scale, area)
+            else:
+                tiled_export.export_png(model_data, file_path, scale, area)
+
+        if on_complete is None:
+            export()
+            return
+
+        results = queue.Queue()
+
+        def run():
+            try:
+                export()
+                results.put(None)
+            except Exception as e:
+                results.put(e)
+
+        def poll():
+            try:
+                error = results.get_nowait()
+            except queue.Empty:
+                self.after(ct.EXPORT_PARAMS["tiled_export_poll_interval"], poll)
+                return
+            on_complete(error)
+
+        threading.Thread(target=run, daemon=True).start()
+        self.after(ct.EXPORT_PARAMS["tiled_export_poll_interval"], poll)
+
+    def save_model_as_vector(self, file_path: str, scale: Optional[float] = None):
+        # モデルをSVG/PDFの描画命令として1オブジェクトずつファイルに書き出す（拡張子で形式を判定）
+        import vector_exporter  # 出力時にのみ使用するため、起動を速くするためにここで読み込む
+        if file_path.lower().endswith(".pdf"):
+            vector_exporter.export_pdf(self.get_export_scene(), file_path, scale)
+        else:
+            vector_exporter.export_svg(self.get_export_scene(), file_path, scale)
+
     def on_save(self):
         self.cancel_selection_node_and_edge_and_swimlane()
 
         path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG", "*.png"), ("JPEG", "*.jpg;*.jpeg")],
+            filetypes=[("PNG", "*.png"), ("JPEG", "*.jpg;*.jpeg"), ("SVG", "*.svg"), ("PDF", "*.pdf"), ("Deep Zoom", "*.dzi")],
         )
         if not path:
             return
+
+        def on_saved(error):
+            if error is None:
+                messagebox.showinfo("Saved", f"Saved to:\n{path}")
+            else:
+                messagebox.showerror("Error", str(error))
+
         try:
-            self.save_canvas_as_image(path)
-            messagebox.showinfo("Saved", f"Saved to:\n{path}")
+            if path.lower().endswith((".svg", ".pdf")):
+                self.save_model_as_vector(path)
+            elif ct.EXPORT_PARAMS["offscreen_image_export"] or path.lower().endswith(".dzi"):
+                self.save_model_as_image(path, on_complete=on_saved)   # 大きな画像はバックグラウンドで出力し、終了後に通知
+                return
+            else:
+                self.save_canvas_as_image(path)
+            on_saved(None)
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            on_saved(e)
 
     def load_mermaid_flowdata(self, mmd_filepath=None):
+        if self._blocked_by_mermaid_stream():
+            return
         if mmd_filepath is None:
             path = filedialog.askopenfilename(
                 filetypes=[("Mermaid Flowchart", "*.md"), ("All files", "*.*")]
@@ -2788,11 +3533,35 @@ class FlowchartTool(tk.Tk):
 
     def create_mermaid_flowdata(self, mmd_nodes, mmd_links):
         """モデルを読み込み、Canvasを再構築"""
+        with self.history_batch(), self.deferred_drawing(len(mmd_nodes) if mmd_nodes is not None else 0):
+            self._clear_for_mermaid_flowdata()
+
+            if mmd_nodes is None or len(mmd_nodes) == 0:
+                return
+
+            layout = self._mermaid_layout(next(iter(mmd_nodes.values())))
+            id_map = {}
+            for node_strid_key in mmd_nodes:
+                self._create_mermaid_node(mmd_nodes[node_strid_key], layout, id_map)
+
+            for ed in mmd_links:
+                self._create_mermaid_link(ed, id_map)
+
+            self.canvas_resize_to_fit_data()
+
+            self.push_history()
+
+    def _clear_for_mermaid_flowdata(self):
         self.canvas.delete("all")
+        canvas_item_registry.clear(self.canvas)
+        layer_manager.reset(self.canvas)
+        self.spatial_index.clear()
+        self._viewport_drawn.clear()
         self.nodes.clear()
-        self.edges.clear()
+        self._clear_edges()
         self.swimlanes.clear()
-        self.notes.clear()
+        self._clear_notes()
+        self._history_dirty_all = True
         self.selected_node_ids = []
         self.selected_edge_id = None
         self.link_start_node_id = None
@@ -2802,11 +3571,9 @@ class FlowchartTool(tk.Tk):
         # グリッド
         self._draw_grid()
 
-        if mmd_nodes is None or len(mmd_nodes) == 0:
-            return
-
-        nd = next(iter(mmd_nodes.values()))
-        if nd.pos_x is None or nd.pos_y is None:
+    def _mermaid_layout(self, first_nd) -> dict:
+        """最初のノードに位置情報があるかどうかで、配置方法を決める"""
+        if first_nd.pos_x is None or first_nd.pos_y is None:
             # 自動配置    ※一部のnodeに位置情報がない場合、スタート位置に重ねて配置する
             auto_position_flag = True
             start_x = int(ct.CANVAS_PARAMS["grid_spacing"] * 10 + ct.NODE_DEFAULT_PARAMS["width"] / 2)
@@ -2817,58 +3584,181 @@ class FlowchartTool(tk.Tk):
             start_x = int(self.canvas.winfo_width() / 2)
             start_y = int(ct.CANVAS_PARAMS["grid_spacing"] * 2 + ct.NODE_DEFAULT_PARAMS["height"] / 2)
 
-        interval_x = ct.NODE_DEFAULT_PARAMS["width"] + ct.CANVAS_PARAMS["grid_spacing"] * 4
-        interval_y = ct.NODE_DEFAULT_PARAMS["height"] + ct.CANVAS_PARAMS["grid_spacing"]
-        vertical_count = 10
+        return {
+            "auto_position": auto_position_flag, "start_x": start_x, "start_y": start_y,
+            "interval_x": ct.NODE_DEFAULT_PARAMS["width"] + ct.CANVAS_PARAMS["grid_spacing"] * 4,
+            "interval_y": ct.NODE_DEFAULT_PARAMS["height"] + ct.CANVAS_PARAMS["grid_spacing"],
+            "vertical_count": 10,
+            "count": 0,     # 作成済みのノード数
+        }
 
-        id_map = {}
-        for node_strid_key in mmd_nodes:
-            nd = mmd_nodes[node_strid_key]
-            node_id = next(self._id_counter)
-            node_strid = nd.node_id if hasattr(nd, "node_id") else None
-            if node_strid is None:
-                continue
-            node_type = nd.kind if hasattr(nd, "kind") else ct.NODE_PROCESS_PARAMS["type"]
-            if auto_position_flag:
-                x = start_x + (node_id-1) // vertical_count * interval_x  # 自動配置
-                y = start_y + (node_id-1) % vertical_count * interval_y   # 自動配置
-            else:
-                # x, y = mfloader.convert_pos_to_xy(pos_tb=nd.pos_tb, pos_lr=nd.pos_lr, start_x=start_x, start_y=start_y)  # x,y位置はmmdローダー側で計算するように変更
-                x = nd.pos_x if hasattr(nd, "pos_x") else None
-                y = nd.pos_y if hasattr(nd, "pos_y") else None
-                if x is None:
-                    x = start_x
-                if y is None:
-                    y = start_y
-            w = Node.get_width_of_type(node_type)
-            h = Node.get_height_of_type(node_type)
-            text = nd.title if hasattr(nd, "title") else ""
-            details = nd.details if hasattr(nd, "details") else None
-            self._create_node_with_id(node_id, node_type, x, y, w=w, h=h, text=text, details=details)
-            id_map[node_strid] = node_id
-
-        for ed in mmd_links:
-            src_id = ed.src if hasattr(ed, "src") else None
-            dst_id = ed.dst if hasattr(ed, "dst") else None
-            label = ed.label if hasattr(ed, "label") else None
-            fid = id_map.get(src_id)
-            tid = id_map.get(dst_id)
-            edge_type = ed.edge_type if hasattr(ed, "edge_type") else ct.EDGE_TYPE_ELBOW
-            line_style = ct.EDGE_PARAMS["line_style"] if edge_type == ct.EDGE_TYPE_ELBOW else ct.EDGE_LINE_STYLE_DOTTED
-            if fid in self.nodes and tid in self.nodes:
-                from_node_obj = self.nodes.get(fid)
-                to_node_obj = self.nodes.get(tid)
-                edge_obj = Edge(edge_type=edge_type, line_style=line_style, from_node_obj=from_node_obj, to_node_obj=to_node_obj, text=label, \
-                                        canvas=self.canvas)
-                if edge_obj is not None and edge_obj.line_id is not None:
-                    self.edges[edge_obj.line_id] = edge_obj
-
-        # ノード最前面
-        self.canvas.tag_raise("node")
+    def _create_mermaid_node(self, nd, layout: dict, id_map: dict):
+        node_id = next(self._id_counter)
+        index = layout["count"]     # 何番目のノードか（自動配置の位置に使う）
+        layout["count"] += 1
+        node_strid = nd.node_id if hasattr(nd, "node_id") else None
+        if node_strid is None:
+            return
+        node_type = nd.kind if hasattr(nd, "kind") else ct.NODE_PROCESS_PARAMS["type"]
+        if layout["auto_position"]:
+            x = layout["start_x"] + index // layout["vertical_count"] * layout["interval_x"]  # 自動配置
+            y = layout["start_y"] + index % layout["vertical_count"] * layout["interval_y"]   # 自動配置
+        else:
+            # x, y = mfloader.convert_pos_to_xy(pos_tb=nd.pos_tb, pos_lr=nd.pos_lr, start_x=start_x, start_y=start_y)  # x,y位置はmmdローダー側で計算するように変更
+            x = nd.pos_x if hasattr(nd, "pos_x") else None
+            y = nd.pos_y if hasattr(nd, "pos_y") else None
+            if x is None:
+                x = layout["start_x"]
+            if y is None:
+                y = layout["start_y"]
+        w = Node.get_width_of_type(node_type)
+        h = Node.get_height_of_type(node_type)
+        text = nd.title if hasattr(nd, "title") else ""
+        details = nd.details if hasattr(nd, "details") else None
+        self._create_node_with_id(node_id, node_type, x, y, w=w, h=h, text=text, details=details)
+        id_map[node_strid] = node_id
+
+    def _create_mermaid_link(self, ed, id_map: dict):
+        src_id = ed.src if hasattr(ed, "src") else None
+        dst_id = ed.dst if hasattr(ed, "dst") else None
+        label = ed.label if hasattr(ed, "label") else None
+        fid = id_map.get(src_id)
+        tid = id_map.get(dst_id)
+        edge_type = ed.edge_type if hasattr(ed, "edge_type") else ct.EDGE_TYPE_ELBOW
+        line_style = ct.EDGE_PARAMS["line_style"] if edge_type == ct.EDGE_TYPE_ELBOW else ct.EDGE_LINE_STYLE_DOTTED
+        if fid in self.nodes and tid in self.nodes:
+            from_node_obj = self.nodes.get(fid)
+            to_node_obj = self.nodes.get(tid)
+            edge_obj = Edge(edge_type=edge_type, line_style=line_style, from_node_obj=from_node_obj, to_node_obj=to_node_obj, text=label, \
+                                    canvas=self._drawing_canvas())
+            if edge_obj is not None and (edge_obj.line_id is not None or self._defer_drawing):
+                self._register_edge(edge_obj)
 
-        self.canvas_resize_to_fit_data()
+    # ------------ AIのストリーミング応答からの順次構築 ------------
 
-        self.push_history()
+    def begin_mermaid_stream(self):
+        """キャンバスを初期化し、受信したMermaidのテキストを順次解析・描画する準備をする
+
+        受信中もキャンバスは編集でき、追加済みのノード・リンクを移動・変更・削除できる
+        受信した部分は1つの履歴にまとめて記録する（受信中にユーザーが編集した操作は、それぞれ別の履歴として記録する）
+        """
+        self._finish_interactions()
+        id_counter = self._id_counter   # 受信中に元に戻すで復元したノードと、受信したノードのIDが重複しないように、カウンタは戻さない
+        base_state = self.history.committed_state()
+        self._clear_for_mermaid_flowdata()
+        self._id_counter = id_counter
+        self.mermaid_stream = {
+            "parser": mfloader.MermaidStreamParser(canvas_width=self.canvas.winfo_width()),
+            "layout": None,   # 最初のノードを受信した時点で決める
+            "id_map": {},     # MermaidのノードID -> ノードID
+            "base_state": base_state,   # 生成を開始する前の状態（abort_mermaid_stream で戻す）
+            "command": None,  # 受信した部分をまとめて記録している履歴
+            "feeding": False, # 受信した部分をキャンバスに追加中
+            "edited": False,  # 受信中にユーザーが編集した
+        }
+        self._commit_stream_history(self.mermaid_stream)
+
+    def feed_mermaid_stream(self, text: str, final: bool = False):
+        """受信したテキストのうち、行が揃った部分のノード・リンクをキャンバスに追加（final=True の場合は残りをすべて解析）"""
+        stream = self.mermaid_stream
+        if stream is None:
+            return
+        new_nodes, new_links = stream["parser"].close() if final else stream["parser"].feed(text)
+        if not new_nodes and not new_links:
+            return
+        dirty_before = {category: set(keys) for category, keys in self._history_dirty.items()}
+        stream["feeding"] = True
+        try:
+            with self.history_batch():
+                for nd in new_nodes:
+                    if nd.node_id in stream["id_map"]:
+                        continue    # 作成済みのノードの再定義（end_mermaid_stream で再構築する）
+                    if stream["layout"] is None:
+                        stream["layout"] = self._mermaid_layout(nd)
+                    self._create_mermaid_node(nd, stream["layout"], stream["id_map"])
+                for ed in new_links:
+                    self._create_mermaid_link(ed, stream["id_map"])    # ユーザーが削除したノードへのリンクは作成しない
+                self.canvas_resize_to_fit_data()
+        finally:
+            stream["feeding"] = False
+        # 追加したオブジェクトだけを記録する（ドラッグ中など、ユーザーの記録前の変更は含めない）
+        added = {category: keys - dirty_before[category] for category, keys in self._history_dirty.items()}
+        self._commit_stream_history(stream, added)
+        self.display_operation_info()  # 操作情報表示制御
+
+    def end_mermaid_stream(self, flush: bool = True):
+        """順次構築を終了する（flush=False の場合は、途中までしか受信していない最後の行を捨てる）"""
+        stream = self.mermaid_stream
+        if stream is None:
+            return
+        if flush:
+            self.feed_mermaid_stream("", final=True)
+        parser = stream["parser"]
+        if parser.replaced_node_ids and not stream["edited"]:
+            # 作成済みのノードが後から再定義された場合は、解析結果全体から作り直す（一括で読み込んだ場合と同じ結果にする）
+            # 受信中にユーザーが編集した場合は、編集結果を残すため作り直さない
+            self._finish_interactions()
+            stream["feeding"] = True
+            try:
+                self.create_mermaid_flowdata(parser.nodes, parser.links)
+            finally:
+                stream["feeding"] = False
+        self.mermaid_stream = None
+        self._commit_stream_history(stream)
+        self.display_operation_info()  # 操作情報表示制御
+
+    def abort_mermaid_stream(self):
+        """順次構築を破棄し、生成を開始する前の状態に戻す
+
+        受信中にユーザーが編集していない場合は、生成の履歴ごと取り消す（編集した場合は、戻した操作を1つの履歴として記録し、元に戻すで編集結果を復元できる）
+        """
+        stream = self.mermaid_stream
+        if stream is None:
+            return
+        self._finish_interactions()
+        state = stream["base_state"]
+        current_keys = {
+            "nodes": set(self.nodes),
+            "notes": set(self.notes_by_node_id),
+            "edges": set(self.edges_by_uid),
+            "swimlanes": {swimlane_obj.uid for swimlane_obj in self.swimlanes},
+        }
+        delta = {}
+        for category, records in state.items():
+            category_delta = dict(records)
+            for key in current_keys[category]:
+                if key not in records:
+                    category_delta[key] = None
+            delta[category] = category_delta
+        self._apply_history_delta(delta)
+        self.mermaid_stream = None
+        self._commit_stream_history(stream)
+
+    def _commit_stream_history(self, stream: dict, keys=None):
+        """受信した部分の変更を履歴に記録（受信中のユーザーの編集が間に記録されていなければ、直前の受信分の履歴にまとめる）"""
+        merge = stream["command"] is not None and self.history.last_command() is stream["command"]
+        if self._commit_history(keys, merge=merge):
+            command = self.history.last_command()
+            stream["command"] = command if not merge or command is stream["command"] else None    # まとめた結果、差分がなくなった場合は None
+
+    def _finish_interactions(self):
+        """編集中のテキストは確定して履歴に記録し、ドラッグ中の操作は取り消す"""
+        self.finish_text_edit()
+        self.finish_edge_label_edit()
+        self.finish_swimlane_label_edit()
+        self.finish_note_text_edit()
+        self._flush_drag_frame()
+        self._end_group_drag()
+        self.drag_data_init()
+        self.temporary_data_init()
+
+    def _blocked_by_mermaid_stream(self, notify=True) -> bool:
+        """AIの応答からキャンバスを構築中は、モデル全体を置き換える操作（ファイルの読み込みなど）を受け付けない（生成を中止してから操作する）"""
+        if self.mermaid_stream is None:
+            return False
+        if notify:
+            self.bell()
+        return True
 
     def save_mermaid_flowdata(self):
         # print(f"save_mermaid_flowdata()")
@@ -2881,6 +3771,7 @@ class FlowchartTool(tk.Tk):
         if self.ai_chat_animating:
             return
         if self.ai_chat_window_on.get():
+            self.ai_interface.prepare_in_background()   # 初回のみ、SDKの読み込みとモデル一覧の取得をバックグラウンドで開始
             self.slide_in_ai_chat_window()
         else:
             self.slide_out_ai_chat_window()
@@ -2938,21 +3829,75 @@ class FlowchartTool(tk.Tk):
         animate()
 
     def on_send_to_ai(self, event=None):
+        if self.ai_job is not None:
+            return  # 生成中（送信ボタンは中止ボタンになっている）
         ai_chat_prompt = self.ai_chat_prompt.get().strip()
         ai_spec_prompt = self.ai_spec_prompt.get("1.0", tk.END).strip()
         if self.ai_interface is not None and self.ai_interface.ai_type is not None and self.ai_interface.ai_model is not None and ai_chat_prompt is not None:
             # print(f"Send to AI: {ai_chat_prompt}")
+            # AIの応答は待たずに、結果は after() で定期的に確認する（生成中もキャンバスを操作できる）
+            job = self.ai_interface.submit_message_to_ai(ai_chat_prompt, ai_spec_prompt, stream=ct.AI_STREAMING,
+                                                         use_cache=self.ai_cache_on.get())
+            if job is None:
+                return
+            self.ai_job = job
+            self.ai_job_prompts = (ai_chat_prompt, ai_spec_prompt)
             self.set_sending(True)
-            return_text, mmd_filepath = self.ai_interface.send_message_to_ai(ai_chat_prompt, ai_spec_prompt)
-            # print(f"AI response: {return_text}, mmd_filepath: {mmd_filepath}")
+            self._poll_ai_job()
+
+    def _poll_ai_job(self):
+        job = self.ai_job
+        if job is None or job.cancelled:
+            return
+        finished = job.poll()
+        if job.streaming:
+            # 受信済みのテキストから、行が揃ったノード・リンクを順次キャンバスに追加
+            text = job.take_text()
+            if text:
+                if self.mermaid_stream is None:
+                    self.begin_mermaid_stream()
+                self.feed_mermaid_stream(text)
+        if not finished:
+            self.set_chat_progress(ct.AI_GENERATING_MESSAGE.replace("$elapsed", str(int(job.elapsed))))
+            self.after(ct.AI_STREAM_POLL_INTERVAL if job.streaming else ct.AI_JOB_POLL_INTERVAL, self._poll_ai_job)
+            return
+
+        self.ai_job = None
+        self.set_chat_progress(None)
+        self.set_sending(False)
+        ai_chat_prompt, ai_spec_prompt = self.ai_job_prompts
+        return_text, mmd_filepath = job.result
+        # print(f"AI response: {return_text}, mmd_filepath: {mmd_filepath}")
+        streamed = self.mermaid_stream is not None
+        if streamed:
             if mmd_filepath is not None:
-                self.ai_chat_prompt.delete(0, tk.END)
-                self.append_chat("User", ai_chat_prompt)
-                self.append_chat("User", ai_spec_prompt)
-                self.append_chat("AI", return_text)
-                self.load_mermaid_flowdata(mmd_filepath)
+                self.end_mermaid_stream()
             else:
-                messagebox.showerror("Error", return_text)
+                self.abort_mermaid_stream()     # 途中でエラーになった場合は、受信した部分を破棄して生成前の状態に戻す
+        if mmd_filepath is not None:
+            self.ai_chat_prompt.delete(0, tk.END)
+            self.append_chat("User", ai_chat_prompt)
+            self.append_chat("User", ai_spec_prompt)
+            self.append_chat("AI", return_text)
+            if job.cached:
+                self.append_chat("AI", ct.AI_CACHED_RESPONSE_MESSAGE)
+            if streamed:
+                # キャンバスは受信しながら構築済み（保存したファイルの再読み込みは不要）
+                messagebox.showinfo("Loaded", f"Loaded Mermaid flowchart from:\n{mmd_filepath}")
+            else:
+                self.load_mermaid_flowdata(mmd_filepath)
+        else:
+            messagebox.showerror("Error", return_text)
+
+    def on_cancel_ai(self):
+        # 生成を中止（応答が返ってきても結果は破棄される）
+        if self.ai_job is None:
+            return
+        self.ai_job.cancel()
+        self.ai_job = None
+        self.end_mermaid_stream(flush=False)    # 受信済みの部分はキャンバスに残す（元に戻すで取り消せる）
+        self.set_chat_progress(None)
+        self.append_chat("AI", ct.AI_CANCELLED_MESSAGE)
         self.set_sending(False)
 
     # -----------------------------
@@ -2960,14 +3905,31 @@ class FlowchartTool(tk.Tk):
     # -----------------------------
     def append_chat(self, speaker: str, text: str|None):
         self.ai_chat_text.configure(state="normal")
-        self.ai_chat_text.insert("end", f"{speaker}: {text}\n")
+        # 進捗の表示中は、進捗の前に追加する（進捗は常に末尾）
+        progress_ranges = self.ai_chat_text.tag_ranges("progress")
+        self.ai_chat_text.insert(progress_ranges[0] if progress_ranges else "end", f"{speaker}: {text}\n")
         self.ai_chat_text.see("end")
         self.ai_chat_text.configure(state="disabled")
 
+    def set_chat_progress(self, text: str|None):
+        """チャット欄の末尾に進捗を表示（None の場合は消去）"""
+        self.ai_chat_text.configure(state="normal")
+        progress_ranges = self.ai_chat_text.tag_ranges("progress")
+        if progress_ranges:
+            self.ai_chat_text.delete(progress_ranges[0], progress_ranges[-1])
+        if text is not None:
+            self.ai_chat_text.insert("end", f"AI: {text}\n", ("progress",))
+            self.ai_chat_text.see("end")
+        self.ai_chat_text.configure(state="disabled")
+
     def set_sending(self, sending: bool):
+        # 生成中は送信ボタンを中止ボタンにする
         state = "disabled" if sending else "normal"
-        self.send_btn.configure(state=state)
         self.ai_chat_prompt.configure(state=state)
+        if sending:
+            self.send_btn.configure(text="Cancel", command=self.on_cancel_ai)
+        else:
+            self.send_btn.configure(text="Generate", command=self.on_send_to_ai)
 
     def display_operation_info(self):
         if self.app_start:
@@ -2982,10 +3944,11 @@ class FlowchartTool(tk.Tk):
                 self._show_operation_info()
 
     def _show_app_start_panel(self):
-        img = Image.open('HAYATE.png', 'r')
-        img = img.resize((400, 350), Image.Resampling.LANCZOS)
+        # 縮小済みの画像をキャッシュフォルダから読み込む（初回のみ元の画像を縮小して保存）
+        img = icon_atlas.load_scaled_image('HAYATE.png', (400, 350))
         self.app_start_img = ImageTk.PhotoImage(img)
         self.app_start_panel = self.canvas.create_image(self.canvas_width//2, self.canvas_height//2, anchor="center", image=self.app_start_img)
+        layer_manager.place(self.canvas, self.app_start_panel, "overlay")
         # 2500ms後に非表示
         self.after(2500, self._hide_app_start_panel)
 
@@ -3042,16 +4005,10 @@ class FlowchartTool(tk.Tk):
                 if 0 <= color_no < 10:
                     node_obj.fill_color = ct.NODE_FILL_COLORS[color_no]
                 else:
-                    node_obj.fill_color = {
-                        ct.NODE_PROCESS_PARAMS["type"] : ct.NODE_PROCESS_PARAMS["fill_color"],
-                        ct.NODE_DECISION_PARAMS["type"] : ct.NODE_DECISION_PARAMS["fill_color"],
-                        ct.NODE_TERMINATOR_PARAMS["type"] : ct.NODE_TERMINATOR_PARAMS["fill_color"],
-                        ct.NODE_IO_PARAMS["type"] : ct.NODE_IO_PARAMS["fill_color"],
-                        ct.NODE_STORAGE_PARAMS["type"] : ct.NODE_STORAGE_PARAMS["fill_color"],
-                        ct.NODE_DOCUMENT_PARAMS["type"] : ct.NODE_DOCUMENT_PARAMS["fill_color"],
-                    }.get(node_obj.type, ct.NODE_DEFAULT_PARAMS["fill_color"])
+                    node_obj.fill_color = node_style.default_fill_color(node_obj.type)
                 fill_color = node_obj.get_fill_color()
-                self.canvas.itemconfig(node_obj.shape_id, fill=fill_color)
+                if node_obj.shape_id is not None:
+                    self.canvas.itemconfig(node_obj.shape_id, fill=fill_color)
 
         for selected_swimlane in self.selected_swimlanes:
             selected_swimlane.fill_color = ct.SWIMLANE_FILL_COLORS[color_no]
@@ -3067,7 +4024,8 @@ class FlowchartTool(tk.Tk):
             if selected_node_id in self.nodes:
                 node_obj = self.nodes[selected_node_id]
                 node_obj.fill_color = node_obj.reset_fill_color()
-                self.canvas.itemconfig(node_obj.shape_id, fill=node_obj.fill_color)
+                if node_obj.shape_id is not None:
+                    self.canvas.itemconfig(node_obj.shape_id, fill=node_obj.fill_color)
 
         for selected_swimlane in self.selected_swimlanes:
             selected_swimlane.fill_color = selected_swimlane.reset_fill_color()
@@ -3086,43 +4044,28 @@ class FlowchartTool(tk.Tk):
 
         return isSelected_node or isSelected_swimlane
 
+    # ツールバー・メニューで使用するアイコン
+    ICON_NAMES = (
+        "Select", "Select_all", "Swimlane_vertical", "Swimlane_horizontal", "Terminator", "Terminator_small",
+        "Process_rectangle", "Process_corner_rounded_rectangle", "Process_ellipse", "Decision", "I/O", "Storage",
+        "Document", "Note", "Link_elbow_vertical", "Link_elbow_horizontal", "Link_elbow_tree", "Link_straight",
+        "Delete", "Grid", "Resize_Canvas", "Undo", "Redo", "Load_JSON",
+        "Save_JSON", "Save_Image", "Load_Mermaid", "Save_Mermaid", "AI-generation", "Manual",
+        "Status_normal", "Status_active", "Status_inactive",
+    )
+
     def store_icons(self):
-        self.icons = {}  # アイコン画像キャッシュ
-        self.icons["Select"] = self.make_icon("Select")
-        self.icons["Select_all"] = self.make_icon("Select_all")
-        self.icons["Swimlane_vertical"] = self.make_icon("Swimlane_vertical")
-        self.icons["Swimlane_horizontal"] = self.make_icon("Swimlane_horizontal")
-        self.icons["Terminator"] = self.make_icon("Terminator")
-        self.icons["Terminator_small"] = self.make_icon("Terminator_small")
-        self.icons["Process_rectangle"] = self.make_icon("Process_rectangle")
-        self.icons["Process_corner_rounded_rectangle"] = self.make_icon("Process_corner_rounded_rectangle")
-        self.icons["Process_ellipse"] = self.make_icon("Process_ellipse")
-        self.icons["Decision"] = self.make_icon("Decision")
-        self.icons["I/O"] = self.make_icon("I/O")
-        self.icons["Storage"] = self.make_icon("Storage")
-        self.icons["Document"] = self.make_icon("Document")
-        self.icons["Note"] = self.make_icon("Note")
-        self.icons["Link_elbow_vertical"] = self.make_icon("Link_elbow_vertical")
-        self.icons["Link_elbow_horizontal"] = self.make_icon("Link_elbow_horizontal")
-        self.icons["Link_elbow_tree"] = self.make_icon("Link_elbow_tree")
-        self.icons["Link_straight"] = self.make_icon("Link_straight")
-        self.icons["Delete"] = self.make_icon("Delete")
-        self.icons["Grid"] = self.make_icon("Grid")
-        self.icons["Resize_Canvas"] = self.make_icon("Resize_Canvas")
-        self.icons["Undo"] = self.make_icon("Undo")
-        self.icons["Redo"] = self.make_icon("Redo")
-        self.icons["Load_JSON"] = self.make_icon("Load_JSON")
-        self.icons["Save_JSON"] = self.make_icon("Save_JSON")
-        self.icons["Save_Image"] = self.make_icon("Save_Image")
-        self.icons["Load_Mermaid"] = self.make_icon("Load_Mermaid")
-        self.icons["Save_Mermaid"] = self.make_icon("Save_Mermaid")
-        self.icons["AI-generation"] = self.make_icon("AI-generation")
-        self.icons["Manual"] = self.make_icon("Manual")
-        self.icons["Status_normal"] = self.make_icon("Status_normal")
-        self.icons["Status_active"] = self.make_icon("Status_active")
-        self.icons["Status_inactive"] = self.make_icon("Status_inactive")
+        # アイコン画像キャッシュ（前回の起動で描画したアイコンはキャッシュフォルダのアトラス画像から読み込む）
+        # draw_icon が参照する設定値（変更された場合はアトラス画像を作り直す）
+        icon_colors = tuple(ct.NODE_DEFAULT_PARAMS[key] for key in (
+            "outline_color", "fill_color", "active_outline_color", "active_fill_color", "inactive_outline_color", "inactive_fill_color"))
+        images = icon_atlas.load_icons(self.ICON_NAMES, self.draw_icon, 128, "#111827", extra=icon_colors)
+        self.icons = {name: ImageTk.PhotoImage(image) for name, image in images.items()}
 
     def make_icon(self, name: str, size: int = 128, fg: str = "#111827") -> ImageTk.PhotoImage:
+        return ImageTk.PhotoImage(self.draw_icon(name, size, fg))
+
+    def draw_icon(self, name: str, size: int = 128, fg: str = "#111827") -> Image.Image:
         img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
         d = ImageDraw.Draw(img)
         x0, y0, x1, y1 = 0, 0, size - 1, size - 1
@@ -3338,9 +4281,10 @@ class FlowchartTool(tk.Tk):
         else:
             d.rectangle((x0, y0, x1, y1), outline=fg, width=2)
 
-        img = img.resize((24,24), resample=Image.Resampling.LANCZOS)
+        icon_size = ct.ICON_ATLAS_PARAMS["icon_size"]
+        img = img.resize((icon_size, icon_size), resample=Image.Resampling.LANCZOS)
 
-        return ImageTk.PhotoImage(img)
+        return img
 
 class ToolTip(tk.Toplevel):
     def __init__(self, widget, text: str):
@@ -0,0 +1,61 @@
+from typing import Callable, Dict, List, Tuple
+import tkinter.font as tkfont
+
+FontKey = Tuple[str, int, str]   # (family, size, weight)
+
+# 共有フォント: (family, size, weight) -> 名前付きフォント
+# キャンバスのテキストアイテムは名前付きフォントを参照するため、フォントを再設定すると参照している全アイテムに反映される
+_fonts: Dict[FontKey, tkfont.Font] = {}
+_scale = 1.0
+_listeners: List[Callable[[], None]] = []
+_generation = 0   # フォントの再設定・倍率変更のたびに増える世代番号
+
+def get(family, size: int, weight: str = tkfont.NORMAL) -> tkfont.Font:
+    """(family, size, weight) に対応する共有フォントを返す（初回のみ作成）"""
+    key = (family, size, weight)
+    font = _fonts.get(key)
+    if font is None:
+        font = tkfont.Font(family=family, size=_scaled_size(size), weight=weight)
+        _fonts[key] = font
+    return font
+
+def _scaled_size(size: int) -> int:
+    if _scale == 1.0:
+        return size
+    scaled = round(abs(size) * _scale)
+    return max(1, scaled) if size >= 0 else -max(1, scaled)
+
+def add_change_listener(callback: Callable[[], None]):
+    """フォントの再設定時に呼び出す関数を登録（計測キャッシュの破棄など）"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def generation() -> int:
+    """フォント設定の世代番号（フォントの再設定・倍率変更のたびに変わる。計測結果の再利用可否の判定に使用）"""
+    return _generation
+
+def _notify_changed():
+    global _generation
+    _generation += 1
+    for callback in _listeners:
+        callback()
+
+def reconfigure(family, size: int, weight: str = tkfont.NORMAL, **options):
+    """共有フォントの設定を変更（テーマ変更時など。参照している全テキストアイテムに反映）"""
+    get(family, size, weight).configure(**options)
+    _notify_changed()
+
+def set_scale(scale: float):
+    """全共有フォントのサイズを倍率で変更（DPI変更時など）"""
+    global _scale
+    if scale == _scale:
+        return
+    _scale = scale
+    for (family, size, weight), font in _fonts.items():
+        font.configure(size=_scaled_size(size))
+    _notify_changed()
+
+def clear():
+    """共有フォントを破棄（Tkのルートウィンドウを作り直す場合などに使用）"""
+    _fonts.clear()
+    _notify_changed()
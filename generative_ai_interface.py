@@ -1,6 +1,10 @@
 import os
+import queue
 import threading
+import time
+import ai_response_cache
 import constants as ct
+import mermaid_flowdata_loader as mfloader
 import re
 from threading import Thread
 from pathlib import Path
@@ -8,29 +12,58 @@ from pathlib import Path
 class Generative_AI_interface:
 
     def __init__(self):
+        # 起動を速くするため、ここではAIの種類とモデルの判定だけを行う
+        # SDKの読み込み・クライアントの作成・モデル一覧の取得は prepare() で行う（チャットパネルを最初に開いたときにバックグラウンドで実行）
         self.ai_type, self.ai_model = self.get_specified_AI_type_and_model()
-        if self.ai_type == "OpenAI":
-            from openai import OpenAI
-            self.openai_client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        elif self.ai_type == "Gemini":
-            from google import genai
-            self.gemini_client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
-        elif self.ai_type == "Anthropic":
-            from anthropic import Anthropic
-            self.anthropic_client = Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
-        elif self.ai_type == "LMStudio":
-            from openai import OpenAI
-            self.openai_client = OpenAI(base_url=ct.LMSTUDIO_BASE_URL, api_key="not-needed")
+        self.openai_client = None
+        self.gemini_client = None
+        self.anthropic_client = None
+        self.available_ai_models = None   # 利用可能なモデル名のリスト（prepare() の実行後に設定）
+        self._client_lock = threading.Lock()
+        self._client_created = False
+        self._prepare_thread = None
+
+    def create_client(self):
+        """SDKを読み込み、クライアントを作成（作成済みの場合は何もしない）"""
+        with self._client_lock:
+            if self._client_created:
+                return
+            if self.ai_type == "OpenAI":
+                from openai import OpenAI
+                self.openai_client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+            elif self.ai_type == "Gemini":
+                from google import genai
+                self.gemini_client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+            elif self.ai_type == "Anthropic":
+                from anthropic import Anthropic
+                self.anthropic_client = Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+            elif self.ai_type == "LMStudio":
+                from openai import OpenAI
+                self.openai_client = OpenAI(base_url=ct.LMSTUDIO_BASE_URL, api_key="not-needed")
+            self._client_created = True
 
+    def prepare(self):
+        """クライアントを作成し、利用可能なモデル一覧を取得（ネットワーク通信あり。起動時ではなく prepare_in_background() から呼び出す）"""
+        self.create_client()
         if self.ai_type == "OpenAI" and self.defined_openai_api_key():
             openai_ai_models = self.get_openai_ai_models()
             print(f"Available OpenAI models: {openai_ai_models}")
+            self.available_ai_models = openai_ai_models
         elif self.ai_type == "Gemini" and self.defined_gemini_api_key():
             gemini_ai_models = self.get_gemini_ai_models()
             print(f"Available Gemini models: {gemini_ai_models}")
+            self.available_ai_models = gemini_ai_models
         elif self.ai_type == "Anthropic" and self.defined_anthropic_api_key():
             anthropic_ai_models = self.get_anthropic_ai_models()
             print(f"Available Anthropic models: {anthropic_ai_models}")
+            self.available_ai_models = anthropic_ai_models
+
+    def prepare_in_background(self):
+        """prepare() をバックグラウンドのスレッドで実行（2回目以降の呼び出しでは何もしない）"""
+        if self.ai_type is None or self._prepare_thread is not None:
+            return
+        self._prepare_thread = Thread(target=self.prepare, daemon=True)
+        self._prepare_thread.start()
 
     def get_specified_AI_type_and_model(self):
         ai_model = ct.AI_MODEL
@@ -119,10 +152,16 @@ class Generative_AI_interface:
             print(f"Error fetching Anthropic models: {e}")
             return []
 
-    def send_message_to_ai(self, user_msg: str, spec_msg: str|None = None):
-        # print(f"send_message_to_ai called with user_msg: {user_msg}")
+    def submit_message_to_ai(self, user_msg: str, spec_msg: str|None = None, stream: bool = False, use_cache: bool = True) -> "AIJob|None":
+        """AIの呼び出しをバックグラウンドで開始し、結果を受け取るためのジョブを返す（呼び出し元はブロックしない）
+
+        stream=True の場合は応答をストリーミングで受け取り、受信したテキストを順次 job.take_text() で受け取れるようにする
+        同じ入力の応答がキャッシュにある場合は、AIを呼び出さずに完了済みのジョブ（job.cached = True）を返す
+        use_cache=False の場合はキャッシュを使わずにAIを呼び出す（応答はキャッシュに保存し直す）
+        """
+        # print(f"submit_message_to_ai called with user_msg: {user_msg}")
         if not user_msg:
-            return None, None
+            return None
 
         user_input_msg = ct.AI_INPUT_TEMPLATE.replace("$order", user_msg)
         if spec_msg:
@@ -130,28 +169,55 @@ class Generative_AI_interface:
         original_filename = f"{user_msg}_{self.ai_model}"
         sanitized_filename = self.sanitize_filename(original_filename)
         args = (user_input_msg, sanitized_filename)
-        return_values = [None, None]
         if self.ai_type == "OpenAI":
             # print("Calling OpenAI API...")
-            thread = Thread(target=self.call_openai_ai, args=(args, return_values), daemon=True)
+            target = self.stream_openai_ai if stream else self.call_openai_ai
         elif self.ai_type == "Gemini":
             # print("Calling Gemini API...")
-            thread = Thread(target=self.call_gemini_ai, args=(args, return_values), daemon=True)
+            target = self.stream_gemini_ai if stream else self.call_gemini_ai
         elif self.ai_type == "Anthropic":
             # print("Calling Anthropic API...")
-            thread = Thread(target=self.call_anthropic_ai, args=(args, return_values), daemon=True)
+            target = self.stream_anthropic_ai if stream else self.call_anthropic_ai
         elif self.ai_type == "LMStudio":
             # print("Calling LMStudio API...")
-            thread = Thread(target=self.call_openai_ai, args=(args, return_values), daemon=True)
+            target = self.stream_openai_ai if stream else self.call_openai_ai
         else:
             print(ct.UNSUPPORTED_AI_MODEL_MESSAGE)
-            return_text = ct.UNSUPPORTED_AI_MODEL_MESSAGE
-            mmd_filepath = None
-            return return_text, mmd_filepath
-        thread.start()
-        thread.join()
-        return_text = return_values[0]
-        mmd_filepath = return_values[1]
+            return AIJob.finished(ct.UNSUPPORTED_AI_MODEL_MESSAGE, None)
+
+        cache_key = None
+        if ct.AI_CACHE_PARAMS["enabled"]:
+            cache_key = ai_response_cache.cache_key(self.ai_type, self.ai_model, ct.AI_SYSTEM_INSTRUCTIONS, user_input_msg)
+            cached_text = ai_response_cache.lookup(cache_key) if use_cache else None
+            if cached_text is not None:
+                # 通常の応答と同じく work/ に保存し、同じ読み込み処理でキャンバスに展開する
+                success_flag, mmd_filepath = self.save_mmd_to_file(sanitized_filename, cached_text)
+                job = AIJob.finished(cached_text, mmd_filepath)
+                job.cached = True
+                return job
+
+        def run(job_args, return_values):
+            # クライアントの作成（SDKの読み込み）もバックグラウンドで行う
+            self.create_client()
+            if stream:
+                target(job_args, return_values, job)
+            else:
+                target(job_args, return_values)
+            # 正常に受信した応答だけをキャッシュに保存（エラー・中止の場合、フローチャートのノードを読み取れない応答は保存しない）
+            if cache_key is not None and return_values[1] is not None and not job.cancelled \
+                    and mfloader.parse_mermaid_flowdata(return_values[0])[0]:
+                ai_response_cache.store(cache_key, return_values[0])
+
+        job = AIJob(run, args, streaming=stream)
+        job.start()
+        return job
+
+    def send_message_to_ai(self, user_msg: str, spec_msg: str|None = None, use_cache: bool = True):
+        """AIを呼び出し、応答を待って (応答テキスト, 保存したmdファイルのパス) を返す（GUIからは submit_message_to_ai を使用）"""
+        job = self.submit_message_to_ai(user_msg, spec_msg, use_cache=use_cache)
+        if job is None:
+            return None, None
+        return_text, mmd_filepath = job.wait()
         # print(f"AI response received: {return_text}, mmd_filepath: {mmd_filepath}")
 
         return return_text, mmd_filepath
@@ -219,6 +285,89 @@ class Generative_AI_interface:
             return_values[0] = "Anthropic API Error"
             return_values[1] = None
 
+    # -----------------------------
+    # ストリーミング（受信したテキストを job.emit_text() で順次渡す。中止された場合は受信を打ち切る）
+    # -----------------------------
+    def stream_openai_ai(self, args, return_values, job):
+        user_input_msg, filename = args
+        try:
+            stream = self.openai_client.responses.create(
+                model=ct.AI_MODEL,
+                instructions=ct.AI_SYSTEM_INSTRUCTIONS,
+                input=user_input_msg,
+                stream=True,
+            )
+            parts = []
+            try:
+                for event in stream:
+                    if job.cancelled:
+                        break
+                    if event.type == "response.output_text.delta":
+                        parts.append(event.delta)
+                        job.emit_text(event.delta)
+            finally:
+                stream.close()
+            self._finish_stream(filename, parts, return_values, job)
+        except Exception as e:
+            print(e)
+            return_values[0] = "OpenAI API Error"
+            return_values[1] = None
+
+    def stream_gemini_ai(self, args, return_values, job):
+        user_input_msg, filename = args
+        from google import genai
+        try:
+            parts = []
+            for chunk in self.gemini_client.models.generate_content_stream(
+                model=ct.AI_MODEL,
+                config=genai.types.GenerateContentConfig(system_instruction=ct.AI_SYSTEM_INSTRUCTIONS),
+                contents=user_input_msg
+            ):
+                if job.cancelled:
+                    break
+                text = chunk.text or ""
+                if text:
+                    parts.append(text)
+                    job.emit_text(text)
+            self._finish_stream(filename, parts, return_values, job)
+        except Exception as e:
+            print(e)
+            return_values[0] = "Gemini API Error"
+            return_values[1] = None
+
+    def stream_anthropic_ai(self, args, return_values, job):
+        user_input_msg, filename = args
+        try:
+            parts = []
+            with self.anthropic_client.messages.stream(
+                model=ct.AI_MODEL,
+                max_tokens=20000,
+                temperature=1,
+                system=ct.AI_SYSTEM_INSTRUCTIONS,
+                messages=[{"role": "user", "content": [{"type": "text", "text": user_input_msg}]}],
+            ) as stream:
+                for text in stream.text_stream:
+                    if job.cancelled:
+                        break
+                    parts.append(text)
+                    job.emit_text(text)
+            self._finish_stream(filename, parts, return_values, job)
+        except Exception as e:
+            print(e)
+            return_values[0] = "Anthropic API Error"
+            return_values[1] = None
+
+    def _finish_stream(self, filename, parts, return_values, job):
+        # 受信を完了した応答をファイルに保存（中止された場合は保存しない）
+        if job.cancelled:
+            return_values[0] = ct.AI_CANCELLED_MESSAGE
+            return_values[1] = None
+            return
+        assistant_text = "".join(parts)
+        success_flag, mmd_filepath = self.save_mmd_to_file(filename, assistant_text)
+        return_values[0] = assistant_text
+        return_values[1] = mmd_filepath
+
     # -----------------------------
     # ファイル保存（work/[roder].md に追記）
     # -----------------------------
@@ -253,3 +402,85 @@ class Generative_AI_interface:
         if return_text.endswith("```"):
             return_text = return_text[:-3]
         return return_text
+
+
+class AIJob:
+    """バックグラウンドのスレッドで実行するAIの呼び出し
+
+    結果はスレッドセーフなキューで受け渡すため、GUIは after() で定期的に poll() して受け取る
+    中止した場合は、応答が返ってきても結果を破棄する（ストリーミングでない場合、通信中の要求は中断できないため、スレッドは応答まで残る）
+    """
+
+    def __init__(self, target, args, streaming: bool = False):
+        self._target = target
+        self._args = args
+        self.streaming = streaming
+        self._results: queue.Queue = queue.Queue()
+        self._texts: queue.Queue = queue.Queue()  # ストリーミングで受信したテキスト
+        self._cancel_event = threading.Event()
+        self._thread: Thread|None = None
+        self.started_at = time.monotonic()
+        self.result: tuple|None = None  # (応答テキスト, 保存したmdファイルのパス)
+        self.cached = False     # キャッシュした応答を返したジョブ
+
+    @classmethod
+    def finished(cls, return_text, mmd_filepath) -> "AIJob":
+        """呼び出さずに結果が決まっている場合（未対応のモデルなど）のジョブ"""
+        job = cls(None, None)
+        job.result = (return_text, mmd_filepath)
+        return job
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        return_values = [None, None]
+        try:
+            self._target(self._args, return_values)
+        except Exception as e:
+            print(e)
+            return_values = [str(e), None]
+        self._results.put((return_values[0], return_values[1]))
+
+    def emit_text(self, text: str):
+        """受信したテキストを渡す（ワーカースレッドから呼び出す）"""
+        self._texts.put(text)
+
+    def take_text(self) -> str:
+        """前回の呼び出し以降に受信したテキスト（ブロックしない）"""
+        parts = []
+        while True:
+            try:
+                parts.append(self._texts.get_nowait())
+            except queue.Empty:
+                return "".join(parts)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def poll(self) -> bool:
+        """結果を受け取っていれば True（ブロックしない）。中止したジョブは常に False"""
+        if self.cancelled:
+            return False
+        if self.result is None:
+            try:
+                self.result = self._results.get_nowait()
+            except queue.Empty:
+                return False
+        return True
+
+    def wait(self, timeout: float|None = None) -> tuple:
+        """結果を受け取るまで待つ（GUIのスレッドからは呼び出さない）"""
+        if self.result is None:
+            self.result = self._results.get(timeout=timeout)
+        return self.result
@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import os
+import platform
+import sys
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import PIL
+from PIL import Image
+
+import constants as ct
+import user_cache
+
+ATLAS_FILE_PREFIX = "icon_atlas_"
+SCALED_FILE_PREFIX = "scaled_"
+
+def cache_key(names: Sequence[str], draw_func: Callable, size: int, fg: str, extra: Sequence = ()) -> str:
+    """アイコンの描画内容を決める情報（描画処理のコード・サイズ・色・プラットフォーム）のハッシュ"""
+    hasher = hashlib.sha256()
+    # 描画処理のコードが変わった場合はキャッシュを作り直す（バイトコードと定数のハッシュ）
+    code = getattr(draw_func, "__func__", draw_func).__code__
+    hasher.update(code.co_code)
+    hasher.update(repr(code.co_consts).encode("utf-8"))
+    hasher.update(repr((list(names), size, ct.ICON_ATLAS_PARAMS["icon_size"], fg, tuple(extra))).encode("utf-8"))
+    # フォント・描画結果は環境によって異なる
+    hasher.update(repr((platform.system(), sys.version_info[:2], PIL.__version__)).encode("utf-8"))
+    return hasher.hexdigest()[:32]
+
+def _slice(atlas: Image.Image, names: Sequence[str], icon_size: int) -> Dict[str, Image.Image]:
+    return {name: atlas.crop((index * icon_size, 0, (index + 1) * icon_size, icon_size)) for index, name in enumerate(names)}
+
+def _load_atlas(path: str, names: Sequence[str], icon_size: int) -> Optional[Dict[str, Image.Image]]:
+    try:
+        with Image.open(path) as atlas:
+            if atlas.size != (icon_size * len(names), icon_size):
+                return None
+            atlas = atlas.convert("RGBA")   # 1回のデコードで全アイコンを読み込む
+    except (OSError, ValueError):
+        return None
+    return _slice(atlas, names, icon_size)
+
+def _save_atlas(path: str, icons: Dict[str, Image.Image], names: Sequence[str], icon_size: int):
+    atlas = Image.new("RGBA", (icon_size * len(names), icon_size), (0, 0, 0, 0))
+    for index, name in enumerate(names):
+        atlas.paste(icons[name], (index * icon_size, 0))
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # 古いキャッシュを削除
+    _remove_files(os.path.join(directory, ATLAS_FILE_PREFIX + "*.png"), keep=path)
+    # 書き込み途中のファイルを読み込まないように、一時ファイルに保存してから置き換える
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    atlas.save(temp_path, "PNG")
+    os.replace(temp_path, path)
+
+def load_icons(names: Sequence[str], draw_func: Callable[[str, int, str], Image.Image], size: int, fg: str,
+               extra: Sequence = ()) -> Dict[str, Image.Image]:
+    """アイコン名 -> アイコン画像（icon_size 四方のRGBA）
+
+    キャッシュフォルダのアトラス画像（全アイコンを横に並べた1枚の画像）があれば切り出して返し、
+    なければ draw_func(name, size, fg) で全アイコンを描画してアトラス画像を保存する
+    """
+    names = list(names)
+    icon_size = ct.ICON_ATLAS_PARAMS["icon_size"]
+    path: Optional[str] = None
+    if ct.ICON_ATLAS_PARAMS["enabled"]:
+        path = os.path.join(user_cache.cache_dir(), f"{ATLAS_FILE_PREFIX}{cache_key(names, draw_func, size, fg, extra)}.png")
+        icons = _load_atlas(path, names, icon_size) if os.path.exists(path) else None
+        if icons is not None:
+            return icons
+
+    icons = {name: draw_func(name, size, fg) for name in names}
+    if path is not None:
+        try:
+            _save_atlas(path, icons, names, icon_size)
+        except OSError:
+            pass    # キャッシュを保存できない場合も、描画したアイコンはそのまま使用する
+    return icons
+
+def _remove_files(pattern: str, keep: Optional[str] = None):
+    for path in glob.glob(pattern):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def load_scaled_image(source_path: str, size: Tuple[int, int]) -> Image.Image:
+    """画像ファイルを size に縮小した画像（スプラッシュ画像など）
+
+    縮小した画像をキャッシュフォルダに保存し、元の画像が変わらない限り次回以降は保存した画像を読み込む
+    """
+    stat = os.stat(source_path)
+    key = hashlib.sha256(repr((os.path.abspath(source_path), stat.st_mtime_ns, stat.st_size, tuple(size), PIL.__version__)).encode("utf-8")).hexdigest()[:32]
+    prefix = f"{SCALED_FILE_PREFIX}{os.path.splitext(os.path.basename(source_path))[0]}_"
+    path = os.path.join(user_cache.cache_dir(), f"{prefix}{key}.png")
+    if ct.ICON_ATLAS_PARAMS["enabled"] and os.path.exists(path):
+        try:
+            with Image.open(path) as cached:
+                cached.load()
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    with Image.open(source_path) as source:
+        image = source.resize(size, Image.Resampling.LANCZOS)
+    if ct.ICON_ATLAS_PARAMS["enabled"]:
+        try:
+            os.makedirs(user_cache.cache_dir(), exist_ok=True)
+            _remove_files(os.path.join(user_cache.cache_dir(), glob.escape(prefix) + "*.png"), keep=path)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            image.save(temp_path, "PNG")
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+    return image
+
+def clear():
+    """保存したアトラス画像・縮小画像を削除"""
+    _remove_files(os.path.join(user_cache.cache_dir(), ATLAS_FILE_PREFIX + "*.png"))
+    _remove_files(os.path.join(user_cache.cache_dir(), SCALED_FILE_PREFIX + "*.png"))
@@ -0,0 +1,451 @@
+from dataclasses import dataclass
+import math
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+import constants as ct
+import export_scene
+from export_scene import Bounds, ExportScene
+from edge import Edge
+import text_measure
+
+# 読み込み済みのフォント: (family, ピクセルサイズ, weight) -> Pillowのフォント
+_fonts: Dict[Tuple, ImageFont.ImageFont] = {}
+# Pillowのフォント -> 1文字ごとの幅
+_glyph_widths: Dict[ImageFont.ImageFont, Dict[str, float]] = {}
+
+# Tkの dash 文字列に対応する破線パターン（線幅に対する倍率）
+DASH_PATTERNS = {
+    "-": (6, 4),
+    ".": (2, 4),
+    ",": (4, 4),
+    "_": (8, 4),
+}
+
+# テキストの描画範囲の判定で、配置したテキストの大きさに加える余白（出力画像のピクセル）
+_TEXT_BOUNDS_PAD = 4
+
+def load_font(family, size_px: int, weight: str = "normal") -> ImageFont.ImageFont:
+    """Tkのフォント指定に近いTrueTypeフォントを読み込む（見つからない場合はPillowの既定フォント）"""
+    key = (family, size_px, weight)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+    families = list(family) if isinstance(family, (tuple, list)) else [family]
+    candidates = []
+    for name in families:
+        if weight == "bold":
+            candidates += ct.EXPORT_PARAMS["font_files"].get(f"{name} bold", [])
+        candidates += ct.EXPORT_PARAMS["font_files"].get(name, [])
+        candidates += [f"{name}.ttf", f"{name.lower()}.ttf", f"{name}.ttc", f"{name.lower()}.ttc"]
+    candidates += ct.EXPORT_PARAMS["fallback_font_files"]
+    for candidate in candidates:
+        try:
+            font = ImageFont.truetype(candidate, size_px)
+            break
+        except OSError:
+            continue
+    else:
+        font = ImageFont.load_default(size_px)
+    _fonts[key] = font
+    return font
+
+def _snap(points: Sequence[Tuple[float, float]]) -> List[Tuple[int, int]]:
+    """座標を画素の格子に揃える（Pillowは小数の座標を描画原点によって異なる画素に描画するため、
+    タイル分割で描画原点が変わっても同じ画素に描画されるように、整数にしてから描画する）"""
+    return [(math.floor(x + 0.5), math.floor(y + 0.5)) for x, y in points]
+
+class ImageRenderer:
+    """モデルから直接、画像（PNG/JPEG）を描画するオフスクリーンレンダラー
+
+    Tkのウィンドウ・キャンバスを使わないため、画面に表示されていない範囲や画面より大きい図も出力でき、
+    ディスプレイのない環境（ヘッドレスのLinuxなど）でも動作する
+    """
+
+    def __init__(self, scale: Optional[float] = None, background: Optional[str] = None, supersampling: Optional[int] = None):
+        self.scale = ct.EXPORT_PARAMS["scale"] if scale is None else scale
+        self.background = ct.EXPORT_PARAMS["background"] if background is None else background
+        self.supersampling = ct.EXPORT_PARAMS["supersampling"] if supersampling is None else max(1, int(supersampling))
+        self._text_sizes: Dict[Tuple, Tuple[float, float]] = {}   # (テキスト, フォント, 折り返し幅) -> 折り返したテキストの大きさ（モデル座標）
+
+    def image_size(self, area: Bounds) -> Tuple[int, int]:
+        left, top, right, bottom = area
+        return max(1, math.ceil((right - left) * self.scale)), max(1, math.ceil((bottom - top) * self.scale))
+
+    def render(self, scene: ExportScene, area: Optional[Bounds] = None, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """scene の area（モデル座標、省略時は全体＋余白）を描画した画像を返す
+
+        size を指定した場合は画像サイズをそのサイズにする（タイル分割時に端数でずれないようにするため）
+        """
+        if area is None:
+            area = scene.bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+        width, height = self.image_size(area) if size is None else size
+        factor = self.scale * self.supersampling
+        image = Image.new("RGB", (width * self.supersampling, height * self.supersampling), self.background)
+        painter = _Painter(image, area[0], area[1], factor)
+
+        # 描画範囲外のオブジェクトは描画しない
+        def visible(bounds: Bounds) -> bool:
+            return bounds[0] <= area[2] and bounds[2] >= area[0] and bounds[1] <= area[3] and bounds[3] >= area[1]
+
+        # 重なり順はキャンバスのレイヤーと同じ（スイムレーン → エッジ → エッジラベル → ノード → ノート）
+        for swimlane_obj in scene.swimlanes:
+            if visible(export_scene.swimlane_bounds(swimlane_obj)):
+                painter.draw_swimlane(swimlane_obj)
+        edges = [edge_obj for edge_obj in scene.edges if edge_obj.points and visible(self._edge_bounds_with_label(edge_obj))]
+        for edge_obj in edges:
+            painter.draw_edge(edge_obj)
+        for edge_obj in edges:
+            painter.draw_edge_label(edge_obj)
+        for node_obj in scene.nodes:
+            if visible(self._node_bounds_with_text(node_obj, painter)):
+                painter.draw_node(node_obj)
+        for note_obj in scene.visible_notes():
+            if visible(export_scene.note_bounds(note_obj)):
+                painter.draw_note(note_obj)
+
+        if self.supersampling > 1:
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        return image
+
+    def _node_bounds_with_text(self, node_obj, painter: "_Painter") -> Bounds:
+        """ノードの図形とテキストを合わせた外接矩形（テキストは図形の幅・高さを超えて表示されることがあるため）"""
+        left, top, right, bottom = export_scene.node_bounds(node_obj)
+        if not node_obj.text:
+            return left, top, right, bottom
+        style = node_obj.get_style()
+        key = (node_obj.text, style.font_family, style.font_size, style.font_weight, style.text_width)
+        size = self._text_sizes.get(key)
+        if size is None:
+            # 描画時と同じフォント・折り返し幅で配置した大きさ
+            font = painter._font(style.font_family, style.font_size, style.font_weight)
+            block = layout_text(node_obj.text, font, style.text_width * painter.factor)
+            size = (block.width / painter.factor, block.height / painter.factor)
+            self._text_sizes[key] = size
+        text_x, text_y = export_scene.node_text_position(node_obj)
+        # 文字の形が送り幅・行の高さから少しはみ出す分を余分に広げる
+        half_width = size[0] / 2 + _TEXT_BOUNDS_PAD / self.scale
+        half_height = size[1] / 2 + _TEXT_BOUNDS_PAD / self.scale
+        return (min(left, text_x - half_width), min(top, text_y - half_height),
+                max(right, text_x + half_width), max(bottom, text_y + half_height))
+
+    @staticmethod
+    def _edge_bounds_with_label(edge_obj: Edge) -> Bounds:
+        left, top, right, bottom = export_scene.edge_bounds(edge_obj)
+        if edge_obj.label_text is not None and edge_obj.label_x is not None:
+            # ラベルは線の近くに表示されるため、ラベル幅の分だけ広げて判定
+            margin = ct.EDGE_PARAMS["text_width"]
+            return (left - margin, top - margin, right + margin, bottom + margin)
+        return (left, top, right, bottom)
+
+def save_image(image: Image.Image, file_path: str):
+    """拡張子に合わせて保存（JPEGはRGB必須）"""
+    ext = file_path.lower().split(".")[-1]
+    if ext in ("jpg", "jpeg"):
+        image.convert("RGB").save(file_path, "JPEG", quality=ct.EXPORT_PARAMS["jpeg_quality"])
+    else:
+        image.save(file_path, "PNG")
+
+class _Painter:
+    """モデル座標を画像座標に変換して描画する"""
+
+    def __init__(self, image: Image.Image, origin_x: float, origin_y: float, factor: float):
+        self.image = image
+        self.draw = ImageDraw.Draw(image)
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.factor = factor
+
+    # 座標は丸め誤差を除いてから使う（タイル分割で描画原点が変わっても同じ画素に描画されるように）
+    def _points(self, coords: Sequence[float]) -> List[Tuple[float, float]]:
+        return [self._point(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+
+    def _point(self, x: float, y: float) -> Tuple[float, float]:
+        return round((x - self.origin_x) * self.factor, 6), round((y - self.origin_y) * self.factor, 6)
+
+    def _width(self, width: float) -> int:
+        return max(1, round(width * self.factor))
+
+    def _font(self, family, size_pt: int, weight: str = "normal"):
+        # Tkのフォントサイズ（ポイント）をピクセルに換算
+        size_px = max(1, round(abs(size_pt) / Edge.PointPerPixel * self.factor)) if size_pt > 0 else max(1, round(abs(size_pt) * self.factor))
+        return load_font(family, size_px, weight)
+
+    # ---- 図形 ----
+
+    def polygon(self, coords, fill: Optional[str], outline: Optional[str], width: float):
+        points = self._points(coords)
+        if len(points) < 2:
+            return
+        # 空文字の色（Tkの塗りつぶし・枠線なし）は None にして描画しない
+        self.draw.polygon(_snap(points), fill=fill or None, outline=outline or None, width=self._width(width) if outline else 0)
+
+    def rectangle(self, bounds: Bounds, fill: Optional[str], outline: Optional[str], width: float):
+        left, top, right, bottom = bounds
+        self.polygon([left, top, right, top, right, bottom, left, bottom], fill, outline, width)
+
+    def line(self, coords, color: str, width: float, dash: Optional[str] = None):
+        self._line(self._points(coords), color, width, dash)
+
+    def _line(self, points: List[Tuple[float, float]], color: str, width: float, dash: Optional[str] = None):
+        if len(points) < 2:
+            return
+        line_width = self._width(width)
+        if not dash:
+            self.draw.line(_snap(points), fill=color, width=line_width, joint="curve")
+            return
+        on, off = (length * line_width for length in DASH_PATTERNS.get(dash, (6, 4)))
+        for start, end in _dash_segments(points, on, off):
+            self.draw.line(_snap([start, end]), fill=color, width=line_width)
+
+    # ---- テキスト ----
+
+    def text(self, x: float, y: float, text: str, font, color: str, wrap_width: Optional[float] = None,
+             anchor: str = "center", justify: str = "left", angle: int = 0):
+        """Tkの create_text と同じ指定（anchor, justify, width）でテキストを描画"""
+        if not text:
+            return
+        block = layout_text(text, font, wrap_width * self.factor if wrap_width else None, justify)
+        cx, cy = self._point(x, y)
+
+        if angle:
+            # 回転するテキストは一時画像に描画してから貼り付ける
+            layer = Image.new("RGBA", (max(1, math.ceil(block.width)), max(1, math.ceil(block.height))), (0, 0, 0, 0))
+            layer_draw = ImageDraw.Draw(layer)
+            for line, line_left, line_top in block.lines:
+                layer_draw.text((line_left, line_top), line, font=font, fill=color, anchor="la")
+            layer = layer.rotate(angle, expand=True)
+            left, top = anchor_offset(cx, cy, layer.width, layer.height, anchor)
+            self.image.paste(layer, _snap([(left, top)])[0], layer)
+            return
+
+        left, top = anchor_offset(cx, cy, block.width, block.height, anchor)
+        for line, line_left, line_top in block.lines:
+            self.draw.text(_snap([(left + line_left, top + line_top)])[0], line, font=font, fill=color, anchor="la")
+
+    # ---- モデル ----
+
+    def draw_node(self, node_obj):
+        style = node_obj.get_style()
+        self.polygon(export_scene.node_points(node_obj), style.fill_color, style.outline_color, style.outline_width)
+        if node_obj.text:
+            text_x, text_y = export_scene.node_text_position(node_obj)
+            font = self._font(style.font_family, style.font_size, style.font_weight)
+            self.text(text_x, text_y, node_obj.text, font, style.text_color, wrap_width=style.text_width)
+
+    def draw_edge(self, edge_obj: Edge):
+        width = ct.EDGE_PARAMS["width"]
+        line_points, arrowheads = edge_arrow_geometry(self._points(edge_obj.points), self._width(width), self.factor)
+        for polygon in arrowheads:
+            self.draw.polygon(_snap(polygon), fill=edge_obj.color)
+        self._line(line_points, edge_obj.color, width, edge_obj.get_dash_pattern() or None)
+
+    def draw_edge_label(self, edge_obj: Edge):
+        if edge_obj.label_x is None or edge_obj.label_y is None or edge_obj.label_text is None:
+            return
+        label_x, label_y, label_anchor, label_justify = edge_obj.get_label_position()
+        font = self._font(ct.EDGE_PARAMS["font_family"], ct.EDGE_PARAMS["font_size"], ct.EDGE_PARAMS["font_weight"])
+        self.text(label_x, label_y, edge_obj.label_text, font, edge_obj.color, wrap_width=ct.EDGE_PARAMS["text_width"],
+                  anchor=label_anchor, justify=label_justify)
+
+    def draw_note(self, note_obj):
+        left, top, right, bottom = export_scene.note_rect(note_obj)
+        self.rectangle((left, top, right, bottom), ct.NOTE_PARAMS["fill_color"], ct.NOTE_PARAMS["outline_color"], ct.NOTE_PARAMS["outline_width"])
+        self.line(export_scene.note_line(note_obj), ct.NOTE_PARAMS["line_color"], ct.NOTE_PARAMS["line_width"])
+
+        # テキスト領域は Note.draw と同じ
+        textarea_mergin = 2
+        textarea_width = (right - left) - 2 * textarea_mergin
+        textarea_height = (bottom - top) - 2 * textarea_mergin
+        font = self._font(ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"])
+        display_text = fit_text(note_obj.text, font, textarea_width * self.factor, textarea_height * self.factor)
+        self.text(left + textarea_mergin, top + textarea_mergin, display_text, font, ct.NOTE_PARAMS["text_color"], anchor="nw")
+
+    def draw_swimlane(self, swimlane_obj):
+        left, top, right, bottom = export_scene.swimlane_bounds(swimlane_obj)
+        outline_color = ct.SWIMLANE_PARAMS["outline_color"]
+        outline_width = ct.SWIMLANE_PARAMS["outline_width"]
+        self.rectangle((left, top, right, bottom), None, outline_color, outline_width)
+        font = self._font(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"])
+        angle = 90 if swimlane_obj.kind == ct.SWIMLANE_KIND_HORIZONTAL else 0
+        for header in swimlane_obj.get_header_bounds():
+            self.rectangle(header, swimlane_obj.fill_color, outline_color, outline_width)
+            self.text((header[0] + header[2]) / 2, (header[1] + header[3]) / 2, swimlane_obj.title, font, ct.SWIMLANE_PARAMS["text_color"], angle=angle)
+
+def anchor_offset(x: float, y: float, width: float, height: float, anchor: str) -> Tuple[float, float]:
+    """Tkの anchor 指定から、テキストブロックの左上座標を求める"""
+    if anchor == "center":
+        # "center" は方向の文字（n, e）を含むため、先に判定する
+        return x - width / 2, y - height / 2
+    if "w" in anchor:
+        left = x
+    elif "e" in anchor:
+        left = x - width
+    else:
+        left = x - width / 2
+    if "n" in anchor:
+        top = y
+    elif "s" in anchor:
+        top = y - height
+    else:
+        top = y - height / 2
+    return left, top
+
+@dataclass
+class TextBlock:
+    """折り返し済みのテキストの配置（座標はブロック左上からの相対位置）"""
+    lines: List[Tuple[str, float, float]]    # (行のテキスト, 左端, 上端)
+    width: float
+    height: float
+    ascent: int
+
+def layout_text(text: str, font, max_width: Optional[float], justify: str = "left") -> TextBlock:
+    """テキストを折り返し、各行の位置を justify に合わせて求める"""
+    lines = wrap_lines(text, font, max_width)
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    line_widths = [font.getlength(line) for line in lines]
+    block_width = max(line_widths) if line_widths else 0
+    placed = []
+    for index, (line, line_width) in enumerate(zip(lines, line_widths)):
+        if justify == "center":
+            line_left = (block_width - line_width) / 2
+        elif justify == "right":
+            line_left = block_width - line_width
+        else:
+            line_left = 0
+        placed.append((line, line_left, index * line_height))
+    return TextBlock(lines=placed, width=block_width, height=line_height * len(lines), ascent=ascent)
+
+def arrowhead_polygon(tip: Tuple[float, float], prev: Tuple[float, float], line_width: float, shape: Tuple[float, float, float]):
+    """矢印の先端の多角形と、線の終端（矢印の付け根）の座標を返す（Tkの arrowshape と同じ指定）"""
+    d1, d2, d3 = shape
+    dx, dy = tip[0] - prev[0], tip[1] - prev[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return None, tip
+    ux, uy = dx / length, dy / length
+    px, py = -uy, ux
+    half_width = line_width / 2
+    side = d3 + half_width
+    neck = (tip[0] - ux * d1, tip[1] - uy * d1)
+    polygon = [
+        tip,
+        (tip[0] - ux * d2 + px * side, tip[1] - uy * d2 + py * side),
+        (neck[0] + px * half_width, neck[1] + py * half_width),
+        (neck[0] - px * half_width, neck[1] - py * half_width),
+        (tip[0] - ux * d2 - px * side, tip[1] - uy * d2 - py * side),
+    ]
+    return polygon, neck
+
+def edge_arrow_geometry(points: List[Tuple[float, float]], line_width: float, factor: float = 1.0):
+    """エッジの線（矢印の付け根まで短くした折れ線）と矢印の多角形のリストを返す"""
+    arrow_kind = ct.EDGE_PARAMS.get("arrow_kind", "last")
+    arrow_shape = tuple(value * factor for value in ct.EDGE_PARAMS.get("arrow_shape", (8, 10, 3)))
+    points = list(points)
+    arrowheads = []
+    if len(points) < 2:
+        return points, arrowheads
+    if arrow_kind in ("last", "both"):
+        polygon, points[-1] = arrowhead_polygon(points[-1], points[-2], line_width, arrow_shape)
+        if polygon:
+            arrowheads.append(polygon)
+    if arrow_kind in ("first", "both"):
+        polygon, points[0] = arrowhead_polygon(points[0], points[1], line_width, arrow_shape)
+        if polygon:
+            arrowheads.append(polygon)
+    return points, arrowheads
+
+def _dash_segments(points: List[Tuple[float, float]], on: float, off: float):
+    """折れ線を破線の線分に分割"""
+    draw_remaining, drawing = on, True
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        position = 0.0
+        while position < length:
+            step = min(draw_remaining, length - position)
+            if drawing:
+                t1, t2 = position / length, (position + step) / length
+                # 丸め誤差で端点の画素がずれないようにする
+                yield ((round(x1 + (x2 - x1) * t1, 6), round(y1 + (y2 - y1) * t1, 6)),
+                       (round(x1 + (x2 - x1) * t2, 6), round(y1 + (y2 - y1) * t2, 6)))
+            position += step
+            draw_remaining -= step
+            if draw_remaining <= 0:
+                drawing = not drawing
+                draw_remaining = on if drawing else off
+
+def wrap_lines(text: str, font, max_width: Optional[float]) -> List[str]:
+    """Tkの create_text(width=...) と同様に、単語単位で折り返す（1単語で幅を超える場合は文字単位）"""
+    lines = []
+    for paragraph in text.split("\n"):
+        if max_width is None or font.getlength(paragraph) <= max_width:
+            lines.append(paragraph)
+            continue
+        current = ""
+        for word in re.findall(r"\S+\s*|\s+", paragraph):
+            if font.getlength(current + word) <= max_width:
+                current += word
+                continue
+            if current:
+                lines.append(current.rstrip())
+                current = ""
+            while font.getlength(word) > max_width and len(word) > 1:
+                # 1単語で幅を超える場合は文字単位で分割
+                cut = 1
+                while cut < len(word) and font.getlength(word[:cut + 1]) <= max_width:
+                    cut += 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            current = word
+        lines.append(current.rstrip())
+    return lines
+
+def _char_widths(font):
+    """PILのフォントで計測する文字ごとの幅（text_measure の折り返し・省略処理に渡す。1文字ごとの幅はフォントごとにキャッシュ）"""
+    widths = _glyph_widths.get(font)
+    if widths is None:
+        widths = _glyph_widths.setdefault(font, {})
+
+    def char_widths(chars: str) -> List[float]:
+        result = []
+        for char in chars:
+            width = widths.get(char)
+            if width is None:
+                width = font.getlength(char)
+                widths[char] = width
+            result.append(width)
+        return result
+    return char_widths
+
+def fit_text(text: str, font, max_width: float, max_height: float) -> str:
+    """Note.adjust_text と同様に、文字単位で折り返し、高さに収まらない場合は末尾を省略"""
+    char_widths = _char_widths(font)
+    lines = text_measure.wrap_by_widths(text, char_widths, max_width)
+
+    ascent, descent = font.getmetrics()
+    max_lines = int((max_height + 1) // (ascent + descent))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        if lines:
+            lines[-1] = text_measure.fit_with_ellipsis_by_widths(lines[-1], char_widths, font.getlength(text_measure.ELLIPSIS), max_width)
+    return "\n".join(lines)
+
+def render_model_data(data: dict, scale: Optional[float] = None, area: Optional[Bounds] = None) -> Image.Image:
+    """export_model() の出力（保存したJSON）から画像を描画"""
+    return ImageRenderer(scale=scale).render(export_scene.from_model_data(data), area)
+
+# バッチ出力用メイン（python image_renderer.py 入力.json 出力.png [倍率]）
+if __name__ == "__main__":
+    import json
+
+    if len(sys.argv) < 3:
+        print("usage: python image_renderer.py input.json output.png [scale]")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        model_data = json.load(f)
+    output_scale = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    save_image(render_model_data(model_data, scale=output_scale), sys.argv[2])
@@ -0,0 +1,31 @@
+import tkinter as tk
+import weakref
+
+# 描画レイヤー（下から順に重なる）
+LAYERS = ("grid", "swimlane", "edge", "edge_label", "node", "note", "overlay")
+
+# キャンバスごとの、各レイヤーの上端を示す目印アイテム（非表示）
+# 新しいアイテムは所属レイヤーの目印の直下に配置するため、全体の重なり順を並べ直す必要がない
+_anchors: "weakref.WeakKeyDictionary[tk.Canvas, dict[str, int]]" = weakref.WeakKeyDictionary()
+
+def _layer_anchors(canvas: tk.Canvas) -> dict[str, int]:
+    anchors = _anchors.get(canvas)
+    if anchors is None:
+        anchors = {}
+        for layer in LAYERS:
+            # 後から作成したアイテムほど上に重なるので、下のレイヤーから順に作成
+            anchors[layer] = canvas.create_line(0, 0, 0, 0, state="hidden", tags=("layer-anchor",))
+        _anchors[canvas] = anchors
+    return anchors
+
+def place(canvas: tk.Canvas|None, item: int|str|None, layer: str) -> None:
+    """アイテム（またはタグ）をレイヤーの最上位に配置"""
+    if canvas is None or item is None:
+        return
+    canvas.tag_lower(item, _layer_anchors(canvas)[layer])
+
+def reset(canvas: tk.Canvas|None) -> None:
+    """目印アイテムを破棄したものとして扱う（canvas.delete("all") と対で使用）"""
+    if canvas is None:
+        return
+    _anchors.pop(canvas, None)
@@ -1,5 +1,6 @@
 import tkinter as tk
-import tkinter.font as tkfont
+
+import font_registry
 
 
 class StickyNote:
@@ -12,7 +13,7 @@ class StickyNote:
         self.text = text
 
         self.padding = 10
-        self.font = tkfont.Font(family="Meiryo", size=12)
+        self.font = font_registry.get("Meiryo", 12)
 
         self.rect_id = None
         self.text_id = None
@@ -1,3 +1,4 @@
+import itertools
 import re
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
@@ -277,40 +278,79 @@ def parse_mermaid_flowdata(text: str, canvas_width: int|None = None) -> Tuple[Di
       nodes: dict[node_id] = Node(...)
       links: list of Link(src, link_id, dst)
     """
-    nodes: Dict[str, Node] = {}
-    links: List[Link] = []
+    parser = MermaidStreamParser(canvas_width=canvas_width)
+    parser.feed(text)
+    parser.close()
+    return parser.nodes, parser.links
 
-    lines = text.splitlines()
+# str.splitlines() が行の区切りとして扱う文字
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
 
-    in_flowchart = False
+class MermaidStreamParser:
+    """
+    Mermaidのテキストを任意の位置で分割して受け取り、行が揃うごとに解析する（AIのストリーミング応答用）
+    feed() は、その呼び出しで揃った行から新たに得られたノードとリンクを返す
+    全体を渡した場合の結果（nodes, links）は parse_mermaid_flowdata() と同じ
+    """
 
-    # 未処理の文字列行
-    pending_pre_line = None
+    def __init__(self, canvas_width: int|None = None):
+        self.canvas_width = canvas_width
+        self.nodes: Dict[str, Node] = {}
+        self.links: List[Link] = []
+        self.replaced_node_ids: set = set()   # 一度定義された後に再定義されたノードID（リンク行で仮に作成されたノードの定義など）
+        self.in_flowchart = False
+        self.pending_pre_line = None    # 未処理の文字列行（複数行にわたる details）
+        self._buffer = ""   # 行末まで届いていない文字列
+
+    def feed(self, text: str) -> Tuple[List[Node], List[Link]]:
+        self._buffer += text
+        lines = self._buffer.splitlines(keepends=True)
+        self._buffer = ""
+        if lines and (lines[-1] == lines[-1].rstrip(_LINE_BREAKS) or lines[-1].endswith("\r")):
+            # 最後の行は次に受け取る文字列に続く（\r は次の \n と合わせて1つの改行の場合がある）
+            self._buffer = lines.pop()
+        return self._parse_lines(line.rstrip(_LINE_BREAKS) for line in lines)
+
+    def close(self) -> Tuple[List[Node], List[Link]]:
+        """残りの文字列を最後の行として解析"""
+        lines = [self._buffer.rstrip(_LINE_BREAKS)] if self._buffer else []
+        self._buffer = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines) -> Tuple[List[Node], List[Link]]:
+        new_nodes: List[Node] = []
+        new_links: List[Link] = []
+        for raw_line in lines:
+            self._parse_line(raw_line, new_nodes, new_links)
+        return new_nodes, new_links
+
+    def _parse_line(self, raw_line: str, new_nodes: List[Node], new_links: List[Link]):
+        nodes = self.nodes
+        canvas_width = self.canvas_width
 
-    for raw_line in lines:
         # print(f"DEBUG processing raw line: {raw_line}")
-        if pending_pre_line is not None:
-            raw_line = pending_pre_line + raw_line
-            pending_pre_line = None
+        if self.pending_pre_line is not None:
+            raw_line = self.pending_pre_line + raw_line
+            self.pending_pre_line = None
 
         line = raw_line.strip() 
         if not line or line.startswith("%%"):
-            continue
+            return
 
         if "{" in line and "details" in line and not line.endswith("}"):
-            pending_pre_line = line + "\n"
-            continue
+            self.pending_pre_line = line + "\n"
+            return
 
         # Detect block start (flexible)
         if re.match(r"^flowchart\s+", line) or re.match(r"^graph\s+", line):
-            in_flowchart = True
-            continue
-        if not in_flowchart:
-            continue
+            self.in_flowchart = True
+            return
+        if not self.in_flowchart:
+            return
 
         # Skip Mermaid directives that are not node/link lines
         if line.startswith(("classDef ", "class ", "style ", "linkStyle ", "subgraph ", "end")):
-            continue
+            return
 
         # 1) Node line?
         # print(f"DEBUG1 processing line: {line}")
@@ -335,19 +375,25 @@ def parse_mermaid_flowdata(text: str, canvas_width: int|None = None) -> Tuple[Di
             details = _node_details(nm)
             details = details.replace("\\n", "\n") if details is not None else None  # Mermaid allows \n in labels for line breaks
             # print(f"DEBUG1-1 parsed node: id={node_id}, kind={kind}, title={title}, pos_tb={pos_tb}, pos_lr={pos_lr}, pos_x={pos_x}, pos_y={pos_y}, details={details}")
+            if node_id in nodes:
+                self.replaced_node_ids.add(node_id)
             nodes[node_id] = Node(node_id=node_id, kind=kind, title=title, raw=line, pos_tb=pos_tb, pos_lr=pos_lr, pos_x=pos_x, pos_y=pos_y, details=details)
-            continue
+            new_nodes.append(nodes[node_id])
+            return
 
         # 2) Link line? (contains -->)
         # print(f"DEBUG2 checking for link chain in line: {line}")
         if "-->" in line or ".->" in line:
-            links.extend(parse_link_chain_line(nodes, line))
-            continue
+            node_count = len(nodes)
+            links = parse_link_chain_line(nodes, line)
+            self.links.extend(links)
+            # リンク行で新たに作成されたノード
+            new_nodes.extend(itertools.islice(nodes.values(), node_count, None))
+            new_links.extend(links)
+            return
 
         # otherwise ignore (can extend later)
 
-    return nodes, links
-
 def parse_link_chain_line(nodes: Dict[str, Node], line: str) -> List[Link]:
     # print(f"DEBUG2-1 parse_link_chain_line: {line}")
     """
@@ -3,10 +3,25 @@ from typing import Dict, List, Optional, Tuple
 import tkinter as tk
 import tkinter.font as tkfont
 import constants as ct
+import canvas_item_registry
+import layer_manager
+import font_registry
+import node_style
+import itertools
+from edit_history import HistoryTracked
 import math
 from math import inf
 
-class Node:
+# 図形テンプレートのキャッシュ: (ノード種類, 形状種類, 頂点計算関数名, w, h) -> ノード中心を原点とした頂点座標（フラットなタプル）
+# 三角関数による頂点計算はテンプレート作成時の1回だけにし、移動時は平行移動のみで頂点座標を求める
+_shape_templates: Dict[Tuple, Tuple[float, ...]] = {}
+
+def clear_shape_templates():
+    _shape_templates.clear()
+
+class Node(HistoryTracked):
+    HISTORY_FIELDS = frozenset(("id", "type", "x", "y", "w", "h", "shape_type", "text", "fill_color", "status", "details"))   # to_dict() の対象
+
     id = None
     type = None
     x:int = 0
@@ -70,14 +85,7 @@ class Node:
             self.text = text
 
         if fill_color is None:
-            self.fill_color = {
-                ct.NODE_PROCESS_PARAMS["type"] : ct.NODE_PROCESS_PARAMS["fill_color"],
-                ct.NODE_DECISION_PARAMS["type"] : ct.NODE_DECISION_PARAMS["fill_color"],
-                ct.NODE_TERMINATOR_PARAMS["type"] : ct.NODE_TERMINATOR_PARAMS["fill_color"],
-                ct.NODE_IO_PARAMS["type"] : ct.NODE_IO_PARAMS["fill_color"],
-                ct.NODE_STORAGE_PARAMS["type"] : ct.NODE_STORAGE_PARAMS["fill_color"],
-                ct.NODE_DOCUMENT_PARAMS["type"] : ct.NODE_DOCUMENT_PARAMS["fill_color"],
-            }.get(self.type, ct.NODE_DEFAULT_PARAMS["fill_color"])
+            self.fill_color = node_style.default_fill_color(self.type)
         else:
             self.fill_color = fill_color
         # print(f"Node fill_color set to {self.fill_color}")
@@ -104,377 +112,138 @@ class Node:
         
         self.draw_text(canvas)
 
+        # ノードレイヤーに配置
+        layer_manager.place(canvas, self.shape_id, "node")
+        layer_manager.place(canvas, self.text_id, "node")
+
+        # ヒットテスト用の逆引き登録
+        canvas_item_registry.register(canvas, self.shape_id, self)
+        canvas_item_registry.register(canvas, self.text_id, self)
+
     def draw_process(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_process_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_decision(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_decision_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_terminator(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_terminator_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_io(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_io_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_storage(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_storage_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_document(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_document_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
                 tags=("node", f"node-{self.id}", "node-shape")
             )
 
     def draw_undefined(self, canvas: tk.Canvas):
         if self.x is not None and self.y is not None and self.w is not None and self.h is not None:
             points = self.get_undefined_points()
+            style = self.get_style()
             self.shape_id = canvas.create_polygon(
-                points, fill=self.get_fill_color(),
-                outline=self.get_outline_color(),
-                width=self.get_outline_width(),
+                points, fill=style.fill_color,
+                outline=style.outline_color,
+                width=style.outline_width,
             tags=("node", f"node-{self.id}", "node-shape")
         )
 
+    def delete(self, canvas: tk.Canvas):
+        # キャンバス上の図形・テキストを削除（ノードのデータは保持）
+        canvas_item_registry.unregister(canvas, self.shape_id, self.text_id)
+        if self.shape_id is not None:
+            canvas.delete(self.shape_id)
+            self.shape_id = None
+        if self.text_id is not None:
+            canvas.delete(self.text_id)
+            self.text_id = None
+
     def reset_fill_color(self):
         self.fill_color = None
         return self.get_fill_color()
 
-    def get_fill_color(self):
-        default_fill_color = ct.NODE_DEFAULT_PARAMS["fill_color"]
-        default_active_fill_color = ct.NODE_DEFAULT_PARAMS.get("active_fill_color", default_fill_color)
-        default_inactive_fill_color = ct.NODE_DEFAULT_PARAMS.get("inactive_fill_color", default_fill_color)
+    def get_style(self) -> node_style.NodeStyle:
+        return node_style.get(self.type, self.status, self.fill_color)
 
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            if self.status == "active":
-                fill_color = ct.NODE_PROCESS_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_PROCESS_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_PROCESS_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            if self.status == "active":
-                fill_color = ct.NODE_DECISION_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_DECISION_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_DECISION_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            if self.status == "active":
-                fill_color = ct.NODE_TERMINATOR_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_TERMINATOR_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_TERMINATOR_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                fill_color = ct.NODE_IO_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_IO_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_IO_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:           # ストレージ
-            if self.status == "active":
-                fill_color = ct.NODE_STORAGE_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_STORAGE_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_STORAGE_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:           # ドキュメント
-            if self.status == "active":
-                fill_color = ct.NODE_DOCUMENT_PARAMS.get("active_fill_color", default_active_fill_color)
-            elif self.status == "inactive":
-                fill_color = ct.NODE_DOCUMENT_PARAMS.get("inactive_fill_color", default_inactive_fill_color)
-            else:
-                fill_color = ct.NODE_DOCUMENT_PARAMS.get("fill_color", default_fill_color) if self.fill_color is None else self.fill_color
-        else:
-            if self.status == "active":                        # その他（未定義）
-                fill_color = default_active_fill_color
-            elif self.status == "inactive":
-                fill_color = default_inactive_fill_color
-            else:
-                fill_color = default_fill_color if self.fill_color is None else self.fill_color
-
-        return fill_color
+    def get_fill_color(self):
+        return self.get_style().fill_color
 
     def get_outline_color(self):
-        default_outline_color = ct.NODE_DEFAULT_PARAMS["outline_color"]
-        default_active_outline_color = ct.NODE_DEFAULT_PARAMS.get("active_outline_color", default_outline_color)
-        default_inactive_outline_color = ct.NODE_DEFAULT_PARAMS.get("inactive_outline_color", default_outline_color)
+        return self.get_style().outline_color
 
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            if self.status == "active":
-                outline_color = ct.NODE_PROCESS_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_PROCESS_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_PROCESS_PARAMS.get("outline_color", default_outline_color)
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            if self.status == "active":
-                outline_color = ct.NODE_DECISION_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_DECISION_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_DECISION_PARAMS.get("outline_color", default_outline_color)
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            if self.status == "active":
-                outline_color = ct.NODE_TERMINATOR_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_TERMINATOR_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_TERMINATOR_PARAMS.get("outline_color", default_outline_color)
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                outline_color = ct.NODE_IO_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_IO_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_IO_PARAMS.get("outline_color", default_outline_color)
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:           # ストレージ
-            if self.status == "active":
-                outline_color = ct.NODE_STORAGE_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_STORAGE_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_STORAGE_PARAMS.get("outline_color", default_outline_color)
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:           # ドキュメント
-            if self.status == "active":
-                outline_color = ct.NODE_DOCUMENT_PARAMS.get("active_outline_color", default_active_outline_color)
-            elif self.status == "inactive":
-                outline_color = ct.NODE_DOCUMENT_PARAMS.get("inactive_outline_color", default_inactive_outline_color)
-            else:
-                outline_color = ct.NODE_DOCUMENT_PARAMS.get("outline_color", default_outline_color)
-        else:
-            if self.status == "active":                        # その他（未定義）
-                outline_color = default_active_outline_color
-            elif self.status == "inactive":
-                outline_color = default_inactive_outline_color
-            else:
-                outline_color = default_outline_color
+    def get_selected_outline_color(self):
+        return self.get_style().selected_outline_color
 
-        return outline_color
-    
     def get_outline_width(self):
-        default_outline_width = ct.NODE_DEFAULT_PARAMS["outline_width"]
-        default_active_outline_width = ct.NODE_DEFAULT_PARAMS.get("active_outline_width", default_outline_width)
-        default_inactive_outline_width = ct.NODE_DEFAULT_PARAMS.get("inactive_outline_width", default_outline_width)
-
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            if self.status == "active":
-                outline_width = ct.NODE_PROCESS_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_PROCESS_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_PROCESS_PARAMS.get("outline_width", default_outline_width)
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            if self.status == "active":
-                outline_width = ct.NODE_DECISION_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_DECISION_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_DECISION_PARAMS.get("outline_width", default_outline_width)
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            if self.status == "active":
-                outline_width = ct.NODE_TERMINATOR_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_TERMINATOR_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_TERMINATOR_PARAMS.get("outline_width", default_outline_width)
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                outline_width = ct.NODE_IO_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_IO_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_IO_PARAMS.get("outline_width", default_outline_width)
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:           # ストレージ
-            if self.status == "active":
-                outline_width = ct.NODE_STORAGE_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_STORAGE_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_STORAGE_PARAMS.get("outline_width", default_outline_width)
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:           # ドキュメント
-            if self.status == "active":
-                outline_width = ct.NODE_DOCUMENT_PARAMS.get("active_outline_width", default_active_outline_width)
-            elif self.status == "inactive":
-                outline_width = ct.NODE_DOCUMENT_PARAMS.get("inactive_outline_width", default_inactive_outline_width)
-            else:
-                outline_width = ct.NODE_DOCUMENT_PARAMS.get("outline_width", default_outline_width)
-        else:
-            if self.status == "active":                        # その他（未定義）
-                outline_width = default_active_outline_width
-            elif self.status == "inactive":
-                outline_width = default_inactive_outline_width
-            else:
-                outline_width = default_outline_width
-
-        return outline_width
+        return self.get_style().outline_width
 
     def get_text_color(self):
-        default_text_color = ct.NODE_DEFAULT_PARAMS["text_color"]
-        default_active_text_color = ct.NODE_DEFAULT_PARAMS.get("active_text_color", default_text_color)
-        default_inactive_text_color = ct.NODE_DEFAULT_PARAMS.get("inactive_text_color", default_text_color)
-
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            if self.status == "active":
-                text_color = ct.NODE_PROCESS_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_PROCESS_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_PROCESS_PARAMS.get("text_color", default_text_color)
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            if self.status == "active":
-                text_color = ct.NODE_DECISION_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_DECISION_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_DECISION_PARAMS.get("text_color", default_text_color)
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            if self.status == "active":
-                text_color = ct.NODE_TERMINATOR_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_TERMINATOR_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_TERMINATOR_PARAMS.get("text_color", default_text_color)
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                text_color = ct.NODE_IO_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_IO_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_IO_PARAMS.get("text_color", default_text_color)
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:           # ストレージ
-            if self.status == "active":
-                text_color = ct.NODE_STORAGE_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_STORAGE_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_STORAGE_PARAMS.get("text_color", default_text_color)
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:           # ドキュメント
-            if self.status == "active":
-                text_color = ct.NODE_DOCUMENT_PARAMS.get("active_text_color", default_active_text_color)
-            elif self.status == "inactive":
-                text_color = ct.NODE_DOCUMENT_PARAMS.get("inactive_text_color", default_inactive_text_color)
-            else:
-                text_color = ct.NODE_DOCUMENT_PARAMS.get("text_color", default_text_color)
-        else:
-            if self.status == "active":                        # その他（未定義）
-                text_color = default_active_text_color
-            elif self.status == "inactive":
-                text_color = default_inactive_text_color
-            else:
-                text_color = default_text_color
-
-        return text_color
+        return self.get_style().text_color
 
     def get_text_font_weight(self):
-        default_font_weight = ct.NODE_DEFAULT_PARAMS["font_weight"]
-        default_active_font_weight = ct.NODE_DEFAULT_PARAMS.get("active_font_weight", default_font_weight)
-        default_inactive_font_weight = ct.NODE_DEFAULT_PARAMS.get("inactive_font_weight", default_font_weight)
-
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            if self.status == "active":
-                font_weight = ct.NODE_PROCESS_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_PROCESS_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_PROCESS_PARAMS.get("font_weight", default_font_weight)
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            if self.status == "active":
-                font_weight = ct.NODE_DECISION_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_DECISION_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_DECISION_PARAMS.get("font_weight", default_font_weight)
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            if self.status == "active":
-                font_weight = ct.NODE_TERMINATOR_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_TERMINATOR_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_TERMINATOR_PARAMS.get("font_weight", default_font_weight)
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                font_weight = ct.NODE_IO_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_IO_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_IO_PARAMS.get("font_weight", default_font_weight)
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                font_weight = ct.NODE_STORAGE_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_STORAGE_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_STORAGE_PARAMS.get("font_weight", default_font_weight)
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:           # 入出力
-            if self.status == "active":
-                font_weight = ct.NODE_DOCUMENT_PARAMS.get("active_font_weight", default_active_font_weight)
-            elif self.status == "inactive":
-                font_weight = ct.NODE_DOCUMENT_PARAMS.get("inactive_font_weight", default_inactive_font_weight)
-            else:
-                font_weight = ct.NODE_DOCUMENT_PARAMS.get("font_weight", default_font_weight)
-        else:
-            if self.status == "active":                        # その他（未定義）
-                font_weight = default_active_font_weight
-            elif self.status == "inactive":
-                font_weight = default_inactive_font_weight
-            else:
-                font_weight = default_font_weight
-
-        return font_weight
+        return self.get_style().font_weight
 
     def get_process_points(self):
         # print(f"Calculating process points for Node {self.id} with shape_type={self.shape_type}")
 
-        left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
         shape_type = self.shape_type if self.shape_type is not None else ct.NODE_PROCESS_PARAMS["shape_type"]
         if shape_type == "rounded_rectangle":
-            points = self.get_rounded_rectangle_coords(left, top, right, bottom)
+            points = self.get_template_points(shape_type, self.get_rounded_rectangle_coords)
         elif shape_type == "corner_rounded_rectangle":
-            points = self.get_corner_rounded_rectangle_coords(left, top, right, bottom)
+            points = self.get_template_points(shape_type, self.get_corner_rounded_rectangle_coords)
         elif shape_type == "ellipse":
-            points = self.get_ellipse_coords(left, top, right, bottom)
+            points = self.get_template_points(shape_type, self.get_ellipse_coords)
         else:
+            left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
             points = self.get_rectangle_coords(left, top, right, bottom)
         return points
 
@@ -488,8 +257,7 @@ class Node:
         ]
 
     def get_terminator_points(self):
-        left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
-        return self.get_rounded_rectangle_coords(left, top, right, bottom)
+        return self.get_template_points(None, self.get_rounded_rectangle_coords)
 
     def get_io_points(self):
         left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
@@ -502,14 +270,22 @@ class Node:
         ]
 
     def get_storage_points(self):
-        left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
-        points = self.get_storage_coords(left, top, right, bottom)
-        return points
+        return self.get_template_points(None, self.get_storage_coords)
 
     def get_document_points(self):
-        left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
-        points = self.get_document_coords(left, top, right, bottom)
-        return points
+        return self.get_template_points(None, self.get_document_coords)
+
+    def get_template_points(self, shape_type, coords_func):
+        """キャッシュした図形テンプレートをノードの中心位置に平行移動した頂点座標を返す"""
+        key = (self.type, shape_type, coords_func.__name__, self.w, self.h)    # 同じノード種類・形状種類でも頂点計算関数が異なる場合は別のテンプレート
+        template = _shape_templates.get(key)
+        if template is None:
+            if len(_shape_templates) >= ct.SHAPE_TEMPLATE_PARAMS["cache_size"]:
+                _shape_templates.clear()
+            half_w, half_h = self.w / 2, self.h / 2
+            template = tuple(coords_func(-half_w, -half_h, half_w, half_h))
+            _shape_templates[key] = template
+        return [value + offset for value, offset in zip(template, itertools.cycle((self.x, self.y)))]
 
     def get_undefined_points(self):
         left, top, right, bottom = self.x - self.w/2, self.y - self.h/2, self.x + self.w/2, self.y + self.h/2
@@ -526,43 +302,26 @@ class Node:
             font_family, font_size, font_weight, text_width, text_color = self._get_text_params()
             if self.type == ct.NODE_STORAGE_PARAMS["type"]:      # ストレージ
                 self.text_id = canvas.create_text(
-                    self.x, self.y + self.h / 10, text=self.text, font=(font_family, font_size, font_weight), width=text_width,
+                    self.x, self.y + self.h / 10, text=self.text, font=font_registry.get(font_family, font_size, font_weight), width=text_width,
                     fill=text_color,
                     tags=("node", f"node-{self.id}", "node-text")
                 )
             elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:      # ドキュメント
                 self.text_id = canvas.create_text(
-                    self.x, self.y - self.h / 10, text=self.text, font=(font_family, font_size, font_weight), width=text_width,
+                    self.x, self.y - self.h / 10, text=self.text, font=font_registry.get(font_family, font_size, font_weight), width=text_width,
                     fill=text_color,
                     tags=("node", f"node-{self.id}", "node-text")
                 )
             else:
                 self.text_id = canvas.create_text(
-                    self.x, self.y, text=self.text, font=(font_family, font_size, font_weight), width=text_width,
+                    self.x, self.y, text=self.text, font=font_registry.get(font_family, font_size, font_weight), width=text_width,
                     fill=text_color,
                     tags=("node", f"node-{self.id}", "node-text")
                 )
     
     def _get_text_params(self):
-        if self.type == ct.NODE_PROCESS_PARAMS["type"]:        # 処理
-            font_family, font_size, text_width  = ct.NODE_PROCESS_PARAMS["font_family"], ct.NODE_PROCESS_PARAMS["font_size"], ct.NODE_PROCESS_PARAMS["text_width"]
-        elif self.type == ct.NODE_DECISION_PARAMS["type"]:     # 分岐
-            font_family, font_size, text_width = ct.NODE_DECISION_PARAMS["font_family"], ct.NODE_DECISION_PARAMS["font_size"], ct.NODE_DECISION_PARAMS["text_width"]
-        elif self.type == ct.NODE_TERMINATOR_PARAMS["type"]:   # 端点
-            font_family, font_size, text_width = ct.NODE_TERMINATOR_PARAMS["font_family"], ct.NODE_TERMINATOR_PARAMS["font_size"], ct.NODE_TERMINATOR_PARAMS["text_width"]
-        elif self.type == ct.NODE_IO_PARAMS["type"]:           # 入出力
-            font_family, font_size, text_width = ct.NODE_IO_PARAMS["font_family"], ct.NODE_IO_PARAMS["font_size"], ct.NODE_IO_PARAMS["text_width"]
-        elif self.type == ct.NODE_STORAGE_PARAMS["type"]:      # ストレージ
-            font_family, font_size, text_width = ct.NODE_STORAGE_PARAMS["font_family"], ct.NODE_STORAGE_PARAMS["font_size"], ct.NODE_STORAGE_PARAMS["text_width"]
-        elif self.type == ct.NODE_DOCUMENT_PARAMS["type"]:     # ドキュメント
-            font_family, font_size, text_width = ct.NODE_DOCUMENT_PARAMS["font_family"], ct.NODE_DOCUMENT_PARAMS["font_size"], ct.NODE_DOCUMENT_PARAMS["text_width"]
-        else:                                   # その他（未定義）
-            font_family, font_size, text_width = ct.NODE_DEFAULT_PARAMS["font_family"], ct.NODE_DEFAULT_PARAMS["font_size"], ct.NODE_DEFAULT_PARAMS["text_width"]
-
-        font_weight = self.get_text_font_weight()
-        text_color = self.get_text_color()
-
-        return font_family, font_size, font_weight, text_width, text_color
+        style = self.get_style()
+        return style.font_family, style.font_size, style.font_weight, style.text_width, style.text_color
 
     def get_rectangle_coords(self, left, top, right, bottom):
         return [left, top, right, top, right, bottom, left, bottom]
@@ -702,6 +461,19 @@ class Node:
 
         return node_data
 
+    def update_from_dict(self, node_data):
+        """to_dictで出力したデータでノードの属性を更新（描画は行わない）"""
+        self.type = node_data.get("type", self.type)
+        self.x = node_data.get("x", self.x)
+        self.y = node_data.get("y", self.y)
+        self.w = node_data.get("w", self.w)
+        self.h = node_data.get("h", self.h)
+        self.shape_type = node_data.get("shape_type", self.shape_type)
+        self.text = node_data.get("text", self.text)
+        self.fill_color = node_data.get("fill_color", self.fill_color)
+        self.status = node_data.get("status", ct.NODE_STATUS_NORMAL)
+        self.details = node_data.get("details", None)
+
     @staticmethod
     def round_half_up(value):
         return math.floor(value + 0.5)
@@ -0,0 +1,95 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+import constants as ct
+
+@dataclass(frozen=True)
+class NodeStyle:
+    """ノード種類・ステータスごとに解決済みの表示属性（全ノードで共有する）"""
+    fill_color: str
+    outline_color: str
+    selected_outline_color: str
+    outline_width: int
+    text_color: str
+    font_family: str
+    font_size: int
+    font_weight: str
+    text_width: int
+
+NODE_STATUSES = (ct.NODE_STATUS_NORMAL, ct.NODE_STATUS_ACTIVE, ct.NODE_STATUS_INACTIVE)
+
+# スタイル表: (ノード種類, ステータス) -> NodeStyle
+# 形状種類（shape_type）は表示属性に影響しないためキーに含めない
+_style_table: Dict[Tuple[str, str], NodeStyle] = {}
+# 塗りつぶし色を上書きしたスタイル: (ノード種類, 塗りつぶし色) -> NodeStyle（通常ステータスのみ）
+_fill_override_styles: Dict[Tuple[str, str], NodeStyle] = {}
+
+def _node_params_list():
+    return (
+        ct.NODE_PROCESS_PARAMS,
+        ct.NODE_DECISION_PARAMS,
+        ct.NODE_TERMINATOR_PARAMS,
+        ct.NODE_IO_PARAMS,
+        ct.NODE_STORAGE_PARAMS,
+        ct.NODE_DOCUMENT_PARAMS,
+    )
+
+def _resolve(params: dict, status: str) -> NodeStyle:
+    defaults = ct.NODE_DEFAULT_PARAMS
+    if status == ct.NODE_STATUS_NORMAL:
+        def attr(name):
+            return params.get(name, defaults[name])
+    else:
+        # active/inactive は「ノード種類の定義」→「デフォルト定義」→「通常時の値」の順に解決
+        def attr(name):
+            status_name = f"{status}_{name}"
+            return params.get(status_name, defaults.get(status_name, defaults[name]))
+    return NodeStyle(
+        fill_color=attr("fill_color"),
+        outline_color=attr("outline_color"),
+        selected_outline_color=params.get("selected_outline_color", defaults["selected_outline_color"]),
+        outline_width=attr("outline_width"),
+        text_color=attr("text_color"),
+        font_family=params.get("font_family", defaults["font_family"]),
+        font_size=params.get("font_size", defaults["font_size"]),
+        font_weight=attr("font_weight"),
+        text_width=params.get("text_width", defaults["text_width"]),
+    )
+
+def build():
+    """constants のノード定義からスタイル表を作成"""
+    _style_table.clear()
+    _fill_override_styles.clear()
+    for status in NODE_STATUSES:
+        _style_table[(ct.NODE_DEFAULT_PARAMS["type"], status)] = _resolve(ct.NODE_DEFAULT_PARAMS, status)
+        for params in _node_params_list():
+            _style_table[(params["type"], status)] = _resolve(params, status)
+
+def invalidate():
+    """ノード定義（constants・テーマ）の変更後に呼び出し、スタイル表を作り直す"""
+    build()
+
+def get(node_type: str, status: Optional[str] = None, fill_color: Optional[str] = None) -> NodeStyle:
+    """ノードの表示属性を1回の参照で取得
+
+    fill_color はユーザーが指定した塗りつぶし色で、通常ステータスのときだけ適用する
+    """
+    if status != ct.NODE_STATUS_ACTIVE and status != ct.NODE_STATUS_INACTIVE:
+        status = ct.NODE_STATUS_NORMAL
+    style = _style_table.get((node_type, status))
+    if style is None:
+        style = _style_table[(ct.NODE_DEFAULT_PARAMS["type"], status)]
+    if fill_color is None or status != ct.NODE_STATUS_NORMAL or fill_color == style.fill_color:
+        return style
+    key = (node_type, fill_color)
+    override_style = _fill_override_styles.get(key)
+    if override_style is None:
+        override_style = replace(style, fill_color=fill_color)
+        _fill_override_styles[key] = override_style
+    return override_style
+
+def default_fill_color(node_type: str) -> str:
+    """ノード種類の既定の塗りつぶし色"""
+    return get(node_type).fill_color
+
+build()
@@ -1,17 +1,24 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 import tkinter as tk
 import tkinter.font as tkfont
 import constants as ct
+import canvas_item_registry
+import layer_manager
+import font_registry
+import text_measure
 import math
 from math import inf
 
 import node
 import edge
 import swimlane
+from edit_history import HistoryTracked
 
 @dataclass
-class Note:
+class Note(HistoryTracked):
+    HISTORY_FIELDS = frozenset(("base_node", "text", "dx", "dy", "display_state"))   # to_dict() の対象
+
     canvas: Optional[tk.Canvas] = None
     base_node: Optional[node.Node] = None
     shape_id: Optional[int] = None
@@ -28,6 +35,7 @@ class Note:
 
     editor: Optional[tk.Text] = None
     editor_window_id: Optional[int] = None
+    rendered_key: Optional[Tuple[str, int]] = field(default=None, init=False, repr=False, compare=False)   # 表示テキストの元になった (テキスト, フォント設定の世代番号)
 
     def __post_init__(self):
         if self.base_node is None:
@@ -41,7 +49,7 @@ class Note:
         self.dx = ct.NOTE_PARAMS["dx"] if self.dx is None else self.dx
         self.dy = ct.NOTE_PARAMS["dy"] if self.dy is None else self.dy
         self.display_state = ct.NOTE_PARAMS.get("state", "normal") if self.display_state is None else self.display_state
-        self.font = tkfont.Font(family=ct.NOTE_PARAMS["font_family"], size=ct.NOTE_PARAMS["font_size"], weight=ct.NOTE_PARAMS["font_weight"])
+        self.font = font_registry.get(ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"])
         self.display_state = "normal" if self.display_state is None else self.display_state
 
         if self.canvas is not None: 
@@ -75,17 +83,26 @@ class Note:
         textarea_y = self.y - self.h/2 + textarea_mergin_y
         textarea_width = self.w - 2 * textarea_mergin_x
         textarea_height = self.h - 2 * textarea_mergin_y
-        display_text = self.adjust_text(self.text, textarea_width, textarea_height, ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"])
+        display_text = self.adjust_text(self.text, textarea_width, textarea_height, ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"])
+        self.rendered_key = (self.text, font_registry.generation())
 
         self.text_id = self.canvas.create_text(
             textarea_x, textarea_y, text=display_text,
-            font=(ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"]),
+            font=self.font,
             width=textarea_width,
             anchor="nw", justify="left",
             fill=ct.NOTE_PARAMS["text_color"],
             tags=("note", "note-text")
         )
 
+        # ノートレイヤーに配置
+        for item_id in (self.shape_id, self.line_id, self.text_id):
+            layer_manager.place(self.canvas, item_id, "note")
+
+        # ヒットテスト用の逆引き登録
+        for item_id in (self.shape_id, self.line_id, self.text_id):
+            canvas_item_registry.register(self.canvas, item_id, self)
+
     def start_text_edit(self, event=None):
         if self.canvas is None:
             return
@@ -204,9 +221,6 @@ class Note:
             textarea_mergin_y = 2
             textarea_x = self.x - self.w/2 + textarea_mergin_x
             textarea_y = self.y - self.h/2 + textarea_mergin_y
-            textarea_width = self.w - 2 * textarea_mergin_x
-            textarea_height = self.h - 2 * textarea_mergin_y
-            display_text = self.adjust_text(self.text, textarea_width, textarea_height, ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"])
             # print(f"Redrawing note with text='{self.text}', dx={self.dx}, dy={self.dy}, display_state='{self.display_state}'")
 
             # テキストの位置を更新
@@ -214,12 +228,16 @@ class Note:
                 self.text_id,
                 textarea_x, textarea_y
             )
-            # テキストの内容を更新
-            if commit_text_edit:
+            # テキストの内容を更新（テキストもフォント設定も変わっていない場合は位置の更新のみ）
+            if commit_text_edit and (self.text, font_registry.generation()) != self.rendered_key:
+                textarea_width = self.w - 2 * textarea_mergin_x
+                textarea_height = self.h - 2 * textarea_mergin_y
+                display_text = self.adjust_text(self.text, textarea_width, textarea_height, ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"])
                 self.canvas.itemconfigure(
                     self.text_id,
                     text=display_text
                 )
+                self.rendered_key = (self.text, font_registry.generation())
 
     def line_anchor(self, base_node_obj, note_obj):
         # fromノードとtoノードの中心を結ぶ直線上のアンカー
@@ -274,51 +292,9 @@ class Note:
 
         return lx2 + dx * t, ly2 + dy * t
 
-    def wrap_text(self, text, font, max_width):
-        """文字列を指定幅に収まるように改行する"""
-        lines = []
-        current_line = ""
-
-        for char in text:
-            if char == "\n":
-                if current_line:
-                    lines.append(current_line)
-                current_line = ""
-            else:
-                temp_line = current_line + char
-                if font.measure(temp_line) <= max_width and char != "\n":
-                    current_line = temp_line
-                else:
-                    if current_line:
-                        lines.append(current_line.rstrip())
-                    current_line = char
-
-        if current_line:
-            lines.append(current_line.rstrip())
-
-        return lines
-
-
-    # 表示するテキストを成形
-    def adjust_text(self, text, textarea_width, textarea_height, font_family, font_size):
-
-        font = tkfont.Font(family=font_family, size=font_size)
-
-        # 自動改行
-        lines = self.wrap_text(text, font, textarea_width)
-
-        line_height = font.metrics("linespace")
-        max_lines = (textarea_height + 1) // line_height
-
-        # 高さに収まらない場合は省略
-        if len(lines) > max_lines:
-            lines = lines[:max_lines]
-            if lines:
-                while font.measure(lines[-1] + "...") > textarea_width and lines[-1]:
-                    lines[-1] = lines[-1][:-1]
-                lines[-1] += "..."
-
-        return "\n".join(lines)
+    # 表示するテキストを成形（計測結果・成形結果は text_measure でキャッシュ）
+    def adjust_text(self, text, textarea_width, textarea_height, font_family, font_size, font_weight=tkfont.NORMAL):
+        return text_measure.adjust_text(text, textarea_width, textarea_height, (font_family, font_size, font_weight))
 
     def hidden(self, canvas: tk.Canvas):
         # print(f"Hiding note with base_node.id='{self.base_node.id}', text='{self.text}', dx={self.dx}, dy={self.dy}, display_state='{self.display_state}'")
@@ -341,6 +317,7 @@ class Note:
             canvas.itemconfigure(self.line_id, state="normal")
 
     def delete(self, canvas: tk.Canvas):
+        canvas_item_registry.unregister(canvas, self.shape_id, self.line_id, self.text_id)
         if self.shape_id is not None:
             canvas.delete(self.shape_id)
             self.shape_id = None
@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import math
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import constants as ct
+
+Bounds = Tuple[float, float, float, float]  # (left, top, right, bottom)
+
+class SpatialIndex:
+    """モデル座標によるオブジェクトの空間インデックス（一様グリッドのバケット方式）
+
+    Node/Edge/Note/Swimlane などのオブジェクトを外接矩形で登録し、
+    Tkのキャンバスを使わずに「矩形内のオブジェクト」「指定位置のオブジェクト」を検索する
+    また、登録されている全オブジェクトの外接矩形（ドキュメント全体の範囲）を差分で管理する
+    オブジェクトは id() で識別する（dataclass はハッシュ不可のため）
+    長いエッジ・大きなスイムレーンなど、多数のセルにまたがるオブジェクト（max_cells を超えるもの）はセルに登録せず、
+    別の集合に保持して検索のたびにすべて判定する（登録・更新のコストがセル数に比例しないようにする）
+    """
+
+    def __init__(self, cell_size: Optional[float] = None, max_cells: Optional[int] = None):
+        if cell_size is None:
+            cell_size = ct.CANVAS_PARAMS["grid_spacing"] * ct.SPATIAL_INDEX_PARAMS["cell_grid_multiple"]
+        self.cell_size = cell_size
+        self.max_cells = ct.SPATIAL_INDEX_PARAMS["max_cells"] if max_cells is None else max_cells
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}   # セル -> オブジェクトの id() の集合
+        self._entries: Dict[int, Tuple[object, Bounds, Optional[Tuple[int, int, int, int]]]] = {}   # id() -> (オブジェクト, 外接矩形, セル範囲（大きなオブジェクトは None）)
+        self._large: Set[int] = set()   # セルに登録しない大きなオブジェクトの id() の集合
+        # ドキュメント全体の範囲管理用（left, top, right, bottom の各辺ごと）
+        # 座標値 -> その座標値を持つオブジェクト数、と、座標値のヒープ（right/bottom は符号反転した最大ヒープ）
+        # ヒープから値を削除するのは先頭に来たときだけ（遅延削除）
+        self._side_counts: List[Dict[float, int]] = [{}, {}, {}, {}]
+        self._side_heaps: List[List[float]] = [[], [], [], []]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, obj: object) -> bool:
+        return id(obj) in self._entries
+
+    def _cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = bounds
+        return (
+            math.floor(left / self.cell_size), math.floor(top / self.cell_size),
+            math.floor(right / self.cell_size), math.floor(bottom / self.cell_size),
+        )
+
+    @staticmethod
+    def _cell_count(cell_range: Tuple[int, int, int, int]) -> int:
+        cx0, cy0, cx1, cy1 = cell_range
+        return (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+
+    def _iter_cells(self, cell_range: Tuple[int, int, int, int]) -> Iterator[Tuple[int, int]]:
+        cx0, cy0, cx1, cy1 = cell_range
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield (cx, cy)
+
+    def update(self, obj: object, bounds: Bounds):
+        """オブジェクトを登録（登録済みの場合は外接矩形を更新）"""
+        left, top, right, bottom = bounds
+        bounds = (min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+        key = id(obj)
+        cell_range = self._cell_range(bounds)
+        if self._cell_count(cell_range) > self.max_cells:
+            cell_range = None   # 大きなオブジェクトはセルに登録しない
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] != bounds:
+                self._remove_extent(entry[1])
+                self._add_extent(bounds)
+            if entry[2] == cell_range:
+                # セルが変わらない場合（大きなオブジェクトのままの場合を含む）は外接矩形だけを更新
+                self._entries[key] = (obj, bounds, cell_range)
+                return
+            self._remove_from_cells(key, entry[2])
+        else:
+            self._add_extent(bounds)
+        self._entries[key] = (obj, bounds, cell_range)
+        if cell_range is None:
+            self._large.add(key)
+            return
+        for cell in self._iter_cells(cell_range):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, obj: object):
+        """オブジェクトの登録を解除"""
+        entry = self._entries.pop(id(obj), None)
+        if entry is not None:
+            self._remove_from_cells(id(obj), entry[2])
+            self._remove_extent(entry[1])
+
+    def _remove_from_cells(self, key: int, cell_range: Optional[Tuple[int, int, int, int]]):
+        if cell_range is None:
+            self._large.discard(key)
+            return
+        for cell in self._iter_cells(cell_range):
+            cell_keys = self._cells.get(cell)
+            if cell_keys is not None:
+                cell_keys.discard(key)
+                if not cell_keys:
+                    del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._large.clear()
+        for side in range(4):
+            self._side_counts[side].clear()
+            self._side_heaps[side].clear()
+
+    def _add_extent(self, bounds: Bounds):
+        for side, value in enumerate(bounds):
+            counts = self._side_counts[side]
+            count = counts.get(value, 0)
+            counts[value] = count + 1
+            if count == 0:
+                heapq.heappush(self._side_heaps[side], value if side < 2 else -value)
+
+    def _remove_extent(self, bounds: Bounds):
+        for side, value in enumerate(bounds):
+            counts = self._side_counts[side]
+            count = counts.get(value, 0) - 1
+            if count <= 0:
+                counts.pop(value, None)
+            else:
+                counts[value] = count
+
+    def _side_extent(self, side: int) -> Optional[float]:
+        counts = self._side_counts[side]
+        heap = self._side_heaps[side]
+        if len(heap) > 2 * len(counts) + 64:
+            # 削除済みの値が溜まった場合はヒープを作り直す
+            heap[:] = [value if side < 2 else -value for value in counts]
+            heapq.heapify(heap)
+        while heap:
+            value = heap[0] if side < 2 else -heap[0]
+            if value in counts:
+                return value
+            heapq.heappop(heap)
+        return None
+
+    def extent(self) -> Optional[Bounds]:
+        """登録されている全オブジェクトの外接矩形（オブジェクトがない場合は None）"""
+        if not self._entries:
+            return None
+        return (self._side_extent(0), self._side_extent(1), self._side_extent(2), self._side_extent(3))
+
+    def bounds_of(self, obj: object) -> Optional[Bounds]:
+        entry = self._entries.get(id(obj))
+        return entry[1] if entry is not None else None
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float, enclosed: bool = False, kind: Optional[type] = None) -> List[object]:
+        """矩形と交差する（enclosed=True の場合は矩形に包含される）オブジェクトを返す"""
+        left, right = min(left, right), max(left, right)
+        top, bottom = min(top, bottom), max(top, bottom)
+        result = []
+        cell_range = self._cell_range((left, top, right, bottom))
+        if self._cell_count(cell_range) > len(self._entries):
+            # 検索範囲のセル数が登録済みのオブジェクト数より多い場合は、セルをたどらずにすべてのオブジェクトを判定する
+            candidates = self._entries.keys()
+        else:
+            candidates = itertools.chain(self._large, itertools.chain.from_iterable(self._cells.get(cell, ()) for cell in self._iter_cells(cell_range)))
+        seen = set()
+        for key in candidates:
+            if key in seen:
+                continue
+            seen.add(key)
+            obj, (x0, y0, x1, y1), _ = self._entries[key]
+            if kind is not None and not isinstance(obj, kind):
+                continue
+            if enclosed:
+                hit = left <= x0 and x1 <= right and top <= y0 and y1 <= bottom
+            else:
+                hit = x0 <= right and x1 >= left and y0 <= bottom and y1 >= top
+            if hit:
+                result.append(obj)
+        return result
+
+    def query_point(self, x: float, y: float, tolerance: float = 0, kind: Optional[type] = None) -> List[object]:
+        """指定位置（許容誤差 tolerance）と外接矩形が重なるオブジェクトを返す"""
+        return self.query_rect(x - tolerance, y - tolerance, x + tolerance, y + tolerance, kind=kind)
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# 起動時間の計測（環境変数 FLOWCHART_PROFILE_STARTUP=1 または起動引数 --profile-startup で有効）
+# 他のモジュールの読み込み時間も計測するため、constants などには依存しない
+ENABLED = os.environ.get("FLOWCHART_PROFILE_STARTUP", "") not in ("", "0") or "--profile-startup" in sys.argv
+
+_start = time.perf_counter()
+_marks: List[Tuple[str, float, float]] = []   # (名前, 開始からの経過時間, 区間の所要時間)
+_last = _start
+
+def mark(label: str):
+    """前回の計測点からの所要時間を記録"""
+    global _last
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    _marks.append((label, now - _start, now - _last))
+    _last = now
+
+@contextmanager
+def section(label: str):
+    """with ブロック内の所要時間を記録"""
+    global _last
+    if not ENABLED:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        _marks.append((label, now - _start, now - begin))
+        _last = now
+
+def report(label: str = "first interactive"):
+    """計測結果を標準エラー出力に表示"""
+    if not ENABLED:
+        return
+    mark(label)
+    lines = ["[startup profile]  elapsed(ms)  step(ms)  label"]
+    for name, elapsed, step in _marks:
+        lines.append(f"  {elapsed * 1000:18.1f}  {step * 1000:8.1f}  {name}")
+    print("\n".join(lines), file=sys.stderr)
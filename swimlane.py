@@ -1,12 +1,18 @@
 from dataclasses import dataclass
 import tkinter as tk
 import constants as ct
+import canvas_item_registry
+import layer_manager
+import font_registry
 import math
 import re
 from difflib import SequenceMatcher
+from edit_history import HistoryTracked
 
 @dataclass
-class Swimlane:
+class Swimlane(HistoryTracked):
+    HISTORY_FIELDS = frozenset(("kind", "title", "header_center_x", "header_center_y", "width", "height", "fill_color"))   # to_dict() の対象
+
     canvas: tk.Canvas
     kind: str # "horizontal"(横型レーン) or "vertical"(縦型レーン)
     title: str
@@ -20,6 +26,7 @@ class Swimlane:
     top_text_id: int|None = None
     bottom_text_id: int|None = None
     fill_color: str = ct.SWIMLANE_PARAMS["fill_color"]
+    uid: int|None = None    # 編集履歴用の識別子（FlowchartToolで採番）
 
     def __post_init__(self):
         self.kind = self.kind.replace("Swimlane_", "")  # "Swimlane_horizontal" -> "horizontal", "Swimlane_vertical" -> "vertical"
@@ -71,7 +78,7 @@ class Swimlane:
                 text=self.title,
                 anchor="center",
                 fill= ct.SWIMLANE_PARAMS["text_color"],
-                font=(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
+                font=font_registry.get(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
                 tags=("swimlane", ct.SWIMLANE_KIND_VERTICAL),
             )
             self.bottom_text_id = self.canvas.create_text(
@@ -79,7 +86,7 @@ class Swimlane:
                 text=self.title,
                 anchor="center",
                 fill= ct.SWIMLANE_PARAMS["text_color"],
-                font=(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
+                font=font_registry.get(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
                 tags=("swimlane", ct.SWIMLANE_KIND_VERTICAL),
             )
         elif self.kind == ct.SWIMLANE_KIND_HORIZONTAL:
@@ -113,7 +120,7 @@ class Swimlane:
                 text=self.title, angle=90,
                 anchor="center",
                 fill= ct.SWIMLANE_PARAMS["text_color"],
-                font=(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
+                font=font_registry.get(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
                 tags=("swimlane", ct.SWIMLANE_KIND_HORIZONTAL),
             )
             self.bottom_text_id = self.canvas.create_text(
@@ -121,10 +128,18 @@ class Swimlane:
                 text=self.title, angle=90,
                 anchor="center",
                 fill= ct.SWIMLANE_PARAMS["text_color"],
-                font=(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
+                font=font_registry.get(ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"]),
                 tags=("swimlane", ct.SWIMLANE_KIND_HORIZONTAL),
             )
 
+        # スイムレーンレイヤーに配置
+        for item_id in (self.frame_id, self.top_id, self.bottom_id, self.top_text_id, self.bottom_text_id):
+            layer_manager.place(self.canvas, item_id, "swimlane")
+
+        # ヒットテスト用の逆引き登録
+        for item_id in (self.frame_id, self.top_id, self.bottom_id, self.top_text_id, self.bottom_text_id):
+            canvas_item_registry.register(self.canvas, item_id, self)
+
     def resize(self):
         if self.frame_id is None or self.top_id is None or self.bottom_id is None or self.top_text_id is None or self.bottom_text_id is None:
             return
@@ -149,6 +164,7 @@ class Swimlane:
             raise ValueError(f"Invalid swimlane kind: {self.kind}")
 
     def redraw(self):
+        canvas_item_registry.unregister(self.canvas, self.frame_id, self.top_id, self.bottom_id, self.top_text_id, self.bottom_text_id)
         if self.frame_id is not None:
             self.canvas.delete(self.frame_id)
         if self.top_id is not None:
@@ -208,6 +224,7 @@ class Swimlane:
                 self.canvas.move(self.bottom_text_id, dx, dy)
 
     def delete(self):
+        canvas_item_registry.unregister(self.canvas, self.frame_id, self.top_id, self.bottom_id, self.top_text_id, self.bottom_text_id)
         if self.frame_id is not None:
             self.canvas.delete(self.frame_id)
         if self.top_id is not None:
@@ -245,6 +262,21 @@ class Swimlane:
                 self.height = max(ct.SWIMLANE_PARAMS["vertical_minimum_height"], self.height - ct.CANVAS_PARAMS["grid_spacing"])
         self.resize()
 
+    def get_header_bounds(self):
+        """上下（左右）のヘッダーの矩形 (left, top, right, bottom) のリスト"""
+        if self.kind == ct.SWIMLANE_KIND_VERTICAL:
+            header_height = ct.SWIMLANE_PARAMS["vertical_header_height"]
+            return [
+                (self.top_left_x, self.top_left_y, self.top_left_x + self.width, self.top_left_y + header_height),
+                (self.top_left_x, self.top_left_y + self.height - header_height, self.top_left_x + self.width, self.top_left_y + self.height),
+            ]
+        else:
+            header_width = ct.SWIMLANE_PARAMS["horizontal_header_width"]
+            return [
+                (self.top_left_x, self.top_left_y, self.top_left_x + header_width, self.top_left_y + self.height),
+                (self.top_left_x + self.width - header_width, self.top_left_y, self.top_left_x + self.width, self.top_left_y + self.height),
+            ]
+
     def reset_fill_color(self):
         self.fill_color = self.get_default_fill_color()
         return self.fill_color
@@ -0,0 +1,116 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, List, Sequence, Tuple
+import tkinter.font as tkfont
+
+import constants as ct
+import font_registry
+from font_registry import FontKey
+
+ELLIPSIS = "..."
+
+# フォントごとの計測キャッシュ
+_glyph_widths: Dict[FontKey, Dict[str, int]] = {}      # 1文字ごとの幅
+_line_heights: Dict[FontKey, int] = {}
+# 表示テキストのキャッシュ: (テキスト, 幅, 高さ, フォント) -> 成形済みの表示テキスト
+_display_texts: Dict[Tuple[str, float, float, FontKey], str] = {}
+
+def _font(font_key: FontKey) -> tkfont.Font:
+    return font_registry.get(*font_key)
+
+def glyph_widths(font_key: FontKey, text: str) -> List[int]:
+    """文字ごとの幅（未計測の文字だけをフォントで計測）"""
+    widths = _glyph_widths.get(font_key)
+    if widths is None:
+        widths = _glyph_widths.setdefault(font_key, {})
+    result = []
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            width = _font(font_key).measure(char)
+            widths[char] = width
+        result.append(width)
+    return result
+
+def measure(font_key: FontKey, text: str) -> int:
+    return sum(glyph_widths(font_key, text))
+
+def line_height(font_key: FontKey) -> int:
+    height = _line_heights.get(font_key)
+    if height is None:
+        height = _font(font_key).metrics("linespace")
+        _line_heights[font_key] = height
+    return height
+
+# 文字列 -> 文字ごとの幅（フォントによる計測方法の違いを吸収する）
+CharWidths = Callable[[str], Sequence[float]]
+
+def wrap_text(text: str, font_key: FontKey, max_width: float) -> List[str]:
+    """文字列を指定幅に収まるように改行する（Tkのフォントで計測）"""
+    return wrap_by_widths(text, lambda chars: glyph_widths(font_key, chars), max_width)
+
+def wrap_by_widths(text: str, char_widths: CharWidths, max_width: float) -> List[str]:
+    """文字列を指定幅に収まるように改行する
+
+    行ごとの先頭からの累積幅を二分探索して、1行に収まる最長の位置で折り返す
+    （1文字で幅を超える場合はその1文字を1行とする。空行は詰める）
+    """
+    lines = []
+    paragraphs = text.split("\n")
+    for index, paragraph in enumerate(paragraphs):
+        if not paragraph:
+            continue
+        prefix_widths = [0, *accumulate(char_widths(paragraph))]
+        start = 0
+        while start < len(paragraph):
+            end = bisect_right(prefix_widths, prefix_widths[start] + max_width, lo=start + 1) - 1
+            end = max(end, start + 1)
+            line = paragraph[start:end]
+            # 改行文字の直前の行は末尾の空白を残す
+            if end < len(paragraph) or index == len(paragraphs) - 1:
+                line = line.rstrip()
+            lines.append(line)
+            start = end
+    return lines
+
+def fit_with_ellipsis(line: str, font_key: FontKey, max_width: float) -> str:
+    """省略記号を付けて指定幅に収まるように末尾を切り詰める（Tkのフォントで計測）"""
+    return fit_with_ellipsis_by_widths(line, lambda chars: glyph_widths(font_key, chars), measure(font_key, ELLIPSIS), max_width)
+
+def fit_with_ellipsis_by_widths(line: str, char_widths: CharWidths, ellipsis_width: float, max_width: float) -> str:
+    """省略記号を付けて指定幅に収まるように末尾を切り詰める"""
+    prefix_widths = [0, *accumulate(char_widths(line))]
+    end = bisect_right(prefix_widths, max_width - ellipsis_width) - 1
+    return line[:max(end, 0)] + ELLIPSIS
+
+def adjust_text(text: str, textarea_width: float, textarea_height: float, font_key: FontKey) -> str:
+    """表示領域に収まるように改行・省略した表示テキストを返す（結果はキャッシュ）"""
+    key = (text, textarea_width, textarea_height, font_key)
+    display_text = _display_texts.get(key)
+    if display_text is not None:
+        return display_text
+
+    # 自動改行
+    lines = wrap_text(text, font_key, textarea_width)
+
+    max_lines = (textarea_height + 1) // line_height(font_key)
+
+    # 高さに収まらない場合は省略
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        if lines:
+            lines[-1] = fit_with_ellipsis(lines[-1], font_key, textarea_width)
+
+    display_text = "\n".join(lines)
+    if len(_display_texts) >= ct.TEXT_MEASURE_PARAMS["cache_size"]:
+        _display_texts.clear()
+    _display_texts[key] = display_text
+    return display_text
+
+def clear():
+    """フォント設定の変更時などに計測キャッシュを破棄"""
+    _glyph_widths.clear()
+    _line_heights.clear()
+    _display_texts.clear()
+
+font_registry.add_change_listener(clear)
@@ -0,0 +1,215 @@
+import math
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+import constants as ct
+import export_scene
+from export_scene import Bounds
+from image_renderer import ImageRenderer
+
+# ワーカープロセスごとに1回だけ作成するモデル（タスクごとにモデルを受け渡さないため）
+_worker_scene: Optional[export_scene.ExportScene] = None
+_worker_renderer: Optional[ImageRenderer] = None
+
+def _init_worker(model_data: dict, scale: float):
+    global _worker_scene, _worker_renderer
+    _worker_scene = export_scene.from_model_data(model_data)
+    _worker_renderer = ImageRenderer(scale=scale)
+
+# タイルの周囲に余分に描画する幅（ピクセル）
+# 縮小時のフィルタや図形の塗りつぶしがタイルの境界で途切れて、つなぎ目が見えないようにする
+_TILE_BLEED = 4
+
+def _render(area: Bounds, size: Tuple[int, int]) -> Image.Image:
+    bleed = _TILE_BLEED / _worker_renderer.scale
+    left, top, right, bottom = area
+    width, height = size
+    image = _worker_renderer.render(
+        _worker_scene, (left - bleed, top - bleed, right + bleed, bottom + bleed),
+        (width + _TILE_BLEED * 2, height + _TILE_BLEED * 2))
+    return image.crop((_TILE_BLEED, _TILE_BLEED, _TILE_BLEED + width, _TILE_BLEED + height))
+
+def _render_tile(area: Bounds, size: Tuple[int, int]) -> bytes:
+    """タイル1枚を描画してRGBの画素データを返す（ワーカープロセスで実行）"""
+    return _render(area, size).tobytes()
+
+def _save_tile(area: Bounds, size: Tuple[int, int], file_path: str) -> str:
+    """タイル1枚を描画してファイルに保存する（ワーカープロセスで実行）"""
+    _render(area, size).save(file_path, "PNG", compress_level=ct.EXPORT_PARAMS["png_compress_level"])
+    return file_path
+
+def _downsample_tile(sources: List[str], size: Tuple[int, int], tile_size: int, file_path: str) -> str:
+    """1つ上のレベルの最大4枚のタイル（左上・右上・左下・右下）をつなぎ合わせて1/2に縮小し、ファイルに保存する（ワーカープロセスで実行）"""
+    width, height = size
+    merged = Image.new("RGB", (width * 2, height * 2), ct.EXPORT_PARAMS["background"])
+    for index, source in enumerate(sources):
+        if os.path.exists(source):
+            with Image.open(source) as source_image:
+                merged.paste(source_image, ((index % 2) * tile_size, (index // 2) * tile_size))
+    merged.resize((width, height), Image.Resampling.LANCZOS).save(
+        file_path, "PNG", compress_level=ct.EXPORT_PARAMS["png_compress_level"])
+    return file_path
+
+class TileGrid:
+    """ドキュメントの範囲を、出力画像上で tile_size ピクセルごとのタイルに分割する"""
+
+    def __init__(self, area: Bounds, scale: float, tile_size: int):
+        self.area = area
+        self.scale = scale
+        self.tile_size = tile_size
+        left, top, right, bottom = area
+        self.width = max(1, math.ceil((right - left) * scale))
+        self.height = max(1, math.ceil((bottom - top) * scale))
+        self.columns = math.ceil(self.width / tile_size)
+        self.rows = math.ceil(self.height / tile_size)
+
+    def tile(self, column: int, row: int) -> Tuple[Bounds, Tuple[int, int]]:
+        """タイルのモデル座標の範囲と画像サイズ"""
+        x0, y0 = column * self.tile_size, row * self.tile_size
+        x1, y1 = min(x0 + self.tile_size, self.width), min(y0 + self.tile_size, self.height)
+        left, top = self.area[0], self.area[1]
+        bounds = (left + x0 / self.scale, top + y0 / self.scale, left + x1 / self.scale, top + y1 / self.scale)
+        return bounds, (x1 - x0, y1 - y0)
+
+class _PngStreamWriter:
+    """行単位で画素データを受け取り、全体を保持せずにPNGファイルに書き出す（RGB 8bit）"""
+
+    _IDAT_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, stream: BinaryIO, width: int, height: int):
+        self.stream = stream
+        self.stream.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        self._compressor = zlib.compressobj(ct.EXPORT_PARAMS["png_compress_level"])
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+
+    def _chunk(self, chunk_type: bytes, data: bytes):
+        self.stream.write(struct.pack(">I", len(data)))
+        self.stream.write(chunk_type)
+        self.stream.write(data)
+        self.stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def _emit(self, data: bytes, flush: bool = False):
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size >= self._IDAT_CHUNK_SIZE or (flush and self._pending_size > 0):
+            self._chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def write_row(self, row: bytes):
+        # フィルタなし（各行の先頭にフィルタ種別 0 を付与）
+        self._emit(self._compressor.compress(b"\x00" + row))
+
+    def close(self):
+        self._emit(self._compressor.flush(), flush=True)
+        self._chunk(b"IEND", b"")
+
+def _band_rows(grid: TileGrid, tiles: List[bytes], row: int) -> Iterator[bytes]:
+    """1行分のタイルの画素データから、画像の1行ずつの画素データを作る"""
+    _, (_, band_height) = grid.tile(0, row)
+    widths = [grid.tile(column, row)[1][0] * 3 for column in range(grid.columns)]
+    for y in range(band_height):
+        yield b"".join(tile[y * width:(y + 1) * width] for tile, width in zip(tiles, widths))
+
+def _executor(model_data: dict, scale: float, workers: Optional[int]) -> ProcessPoolExecutor:
+    workers = ct.EXPORT_PARAMS["tile_workers"] if workers is None else workers
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_data, scale))
+
+def export_png(model_data: dict, file_path: str, scale: Optional[float] = None, area: Optional[Bounds] = None,
+               tile_size: Optional[int] = None, workers: Optional[int] = None):
+    """タイルを複数プロセスで描画し、1枚のPNGにつなぎ合わせて出力
+
+    画像全体はメモリに保持せず、タイル1行分ずつPNGに書き出す
+    書き出し中の1行と先読みした1行を保持するため、使用メモリは 画像の幅 × tile_size × 3バイト × 2行分（画像の幅に比例する）
+    """
+    scale = ct.EXPORT_PARAMS["scale"] if scale is None else scale
+    tile_size = ct.EXPORT_PARAMS["tile_size"] if tile_size is None else tile_size
+    if area is None:
+        area = export_scene.from_model_data(model_data).bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+    grid = TileGrid(area, scale, tile_size)
+
+    with _executor(model_data, scale, workers) as executor, open(file_path, "wb") as f:
+        writer = _PngStreamWriter(f, grid.width, grid.height)
+
+        def submit_band(row: int):
+            return [executor.submit(_render_tile, *grid.tile(column, row)) for column in range(grid.columns)]
+
+        # 書き出し中に次の行のタイルを描画しておく（先読みは1行分まで）
+        pending = submit_band(0)
+        for row in range(grid.rows):
+            tiles = [future.result() for future in pending]
+            pending = submit_band(row + 1) if row + 1 < grid.rows else []
+            for image_row in _band_rows(grid, tiles, row):
+                writer.write_row(image_row)
+            del tiles
+        writer.close()
+
+def export_tile_pyramid(model_data: dict, dzi_path: str, scale: Optional[float] = None, area: Optional[Bounds] = None,
+                        tile_size: Optional[int] = None, workers: Optional[int] = None):
+    """ズーム表示用のタイルピラミッド（Deep Zoom形式: xxx.dzi と xxx_files/レベル/列_行.png）を出力
+
+    最大解像度のタイルを複数プロセスで描画し、下位のレベルは上位のレベルの4枚のタイルを複数プロセスで縮小して作成する
+    """
+    scale = ct.EXPORT_PARAMS["scale"] if scale is None else scale
+    tile_size = ct.EXPORT_PARAMS["tile_size"] if tile_size is None else tile_size
+    if area is None:
+        area = export_scene.from_model_data(model_data).bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+    grid = TileGrid(area, scale, tile_size)
+    files_dir = os.path.splitext(dzi_path)[0] + "_files"
+    max_level = math.ceil(math.log2(max(grid.width, grid.height))) if max(grid.width, grid.height) > 1 else 0
+
+    def tile_path(level: int, column: int, row: int) -> str:
+        return os.path.join(files_dir, str(level), f"{column}_{row}.png")
+
+    os.makedirs(os.path.join(files_dir, str(max_level)), exist_ok=True)
+    with _executor(model_data, scale, workers) as executor:
+        futures = [
+            executor.submit(_save_tile, *grid.tile(column, row), tile_path(max_level, column, row))
+            for row in range(grid.rows) for column in range(grid.columns)
+        ]
+        for future in futures:
+            future.result()
+
+        # 下位レベル（1/2ずつ縮小）も、レベルごとに全タイルをワーカープロセスで縮小する
+        width, height = grid.width, grid.height
+        for level in range(max_level - 1, -1, -1):
+            width, height = math.ceil(width / 2), math.ceil(height / 2)
+            os.makedirs(os.path.join(files_dir, str(level)), exist_ok=True)
+            futures = []
+            for row in range(math.ceil(height / tile_size)):
+                for column in range(math.ceil(width / tile_size)):
+                    size = (min(tile_size, width - column * tile_size), min(tile_size, height - row * tile_size))
+                    sources = [tile_path(level + 1, column * 2 + dx, row * 2 + dy) for dy in range(2) for dx in range(2)]
+                    futures.append(executor.submit(_downsample_tile, sources, size, tile_size, tile_path(level, column, row)))
+            for future in futures:
+                future.result()
+
+    with open(dzi_path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" Overlap="0" TileSize="{tile_size}">\n')
+        f.write(f'  <Size Width="{grid.width}" Height="{grid.height}"/>\n')
+        f.write('</Image>\n')
+
+# バッチ出力用メイン（python tiled_export.py 入力.json 出力.png|出力.dzi [倍率]）
+if __name__ == "__main__":
+    import json
+
+    if len(sys.argv) < 3:
+        print("usage: python tiled_export.py input.json output.png|output.dzi [scale]")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        input_data = json.load(f)
+    output_scale = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    if sys.argv[2].lower().endswith(".dzi"):
+        export_tile_pyramid(input_data, sys.argv[2], output_scale)
+    else:
+        export_png(input_data, sys.argv[2], output_scale)
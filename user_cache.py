@@ -0,0 +1,14 @@
+import os
+import sys
+
+import constants as ct
+
+def cache_dir() -> str:
+    """ユーザーのキャッシュフォルダ（OSごとの標準の場所）内のアプリケーション用フォルダ（アイコン画像・AIの応答のキャッシュの保存先）"""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, ct.USER_CACHE_PARAMS["app_dir_name"], "Cache")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", ct.USER_CACHE_PARAMS["app_dir_name"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, ct.USER_CACHE_PARAMS["app_dir_name"])
@@ -0,0 +1,361 @@
+import sys
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List, Optional, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import ImageColor
+
+import constants as ct
+import export_scene
+import image_renderer
+from export_scene import Bounds, ExportScene
+from edge import Edge
+
+Point = Tuple[float, float]
+
+def _num(value: float) -> str:
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+class _VectorWriter(ABC):
+    """モデルを1オブジェクトずつベクター形式の要素に変換して書き出す（全体を保持しないストリーム出力）
+
+    派生クラスで図形・テキストの出力形式を実装する
+    """
+
+    def __init__(self, scale: Optional[float] = None):
+        self.scale = ct.EXPORT_PARAMS["scale"] if scale is None else scale
+
+    def write_scene(self, scene: ExportScene, area: Optional[Bounds] = None):
+        if area is None:
+            area = scene.bounds(ct.EXPORT_PARAMS["margin"]) or (0, 0, 1, 1)
+        self.begin(area)
+        # 重なり順はキャンバスのレイヤーと同じ（スイムレーン → エッジ → エッジラベル → ノード → ノート）
+        for swimlane_obj in scene.swimlanes:
+            self._write_swimlane(swimlane_obj)
+        for edge_obj in scene.edges:
+            self._write_edge(edge_obj)
+        for edge_obj in scene.edges:
+            self._write_edge_label(edge_obj)
+        for node_obj in scene.nodes:
+            self._write_node(node_obj)
+        for note_obj in scene.visible_notes():
+            self._write_note(note_obj)
+        self.end()
+
+    # ---- 派生クラスで実装 ----
+
+    @abstractmethod
+    def begin(self, area: Bounds):
+        ...
+
+    @abstractmethod
+    def end(self):
+        ...
+
+    @abstractmethod
+    def polygon(self, points: Sequence[Point], fill: Optional[str], outline: Optional[str], width: float):
+        ...
+
+    @abstractmethod
+    def polyline(self, points: Sequence[Point], color: str, width: float, dash: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def text_lines(self, left: float, top: float, block: image_renderer.TextBlock, font_spec: Tuple, color: str,
+                   angle: int = 0, center: Optional[Point] = None):
+        ...
+
+    # ---- 共通処理 ----
+
+    @staticmethod
+    def _pairs(coords: Sequence[float]) -> List[Point]:
+        return [(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+
+    @staticmethod
+    def _font_px(size_pt: int) -> float:
+        # Tkのフォントサイズ（ポイント）をモデル座標（ピクセル）に換算
+        return abs(size_pt) / Edge.PointPerPixel if size_pt > 0 else abs(size_pt)
+
+    def text(self, x: float, y: float, text: str, family, size_pt: int, weight: str, color: str,
+             wrap_width: Optional[float] = None, anchor: str = "center", justify: str = "left", angle: int = 0):
+        """Tkの create_text と同じ指定（anchor, justify, width）でテキストを出力"""
+        if not text:
+            return
+        size_px = self._font_px(size_pt)
+        font = image_renderer.load_font(family, max(1, round(size_px)), weight)
+        block = image_renderer.layout_text(text, font, wrap_width, justify)
+        left, top = image_renderer.anchor_offset(x, y, block.width, block.height, anchor)
+        self.text_lines(left, top, block, (family, size_px, weight), color, angle=angle, center=(x, y))
+
+    def _write_node(self, node_obj):
+        style = node_obj.get_style()
+        self.polygon(self._pairs(export_scene.node_points(node_obj)), style.fill_color, style.outline_color, style.outline_width)
+        if node_obj.text:
+            text_x, text_y = export_scene.node_text_position(node_obj)
+            self.text(text_x, text_y, node_obj.text, style.font_family, style.font_size, style.font_weight, style.text_color, wrap_width=style.text_width)
+
+    def _write_edge(self, edge_obj: Edge):
+        width = ct.EDGE_PARAMS["width"]
+        line_points, arrowheads = image_renderer.edge_arrow_geometry(self._pairs(edge_obj.points), width)
+        self.polyline(line_points, edge_obj.color, width, edge_obj.get_dash_pattern() or None)
+        for polygon in arrowheads:
+            self.polygon(polygon, edge_obj.color, None, 0)
+
+    def _write_edge_label(self, edge_obj: Edge):
+        if edge_obj.label_x is None or edge_obj.label_y is None or edge_obj.label_text is None:
+            return
+        label_x, label_y, label_anchor, label_justify = edge_obj.get_label_position()
+        self.text(label_x, label_y, edge_obj.label_text, ct.EDGE_PARAMS["font_family"], ct.EDGE_PARAMS["font_size"], ct.EDGE_PARAMS["font_weight"],
+                  edge_obj.color, wrap_width=ct.EDGE_PARAMS["text_width"], anchor=label_anchor, justify=label_justify)
+
+    def _write_note(self, note_obj):
+        left, top, right, bottom = export_scene.note_rect(note_obj)
+        self.polygon([(left, top), (right, top), (right, bottom), (left, bottom)], ct.NOTE_PARAMS["fill_color"], ct.NOTE_PARAMS["outline_color"], ct.NOTE_PARAMS["outline_width"])
+        self.polyline(self._pairs(export_scene.note_line(note_obj)), ct.NOTE_PARAMS["line_color"], ct.NOTE_PARAMS["line_width"])
+
+        # テキスト領域は Note.draw と同じ
+        textarea_mergin = 2
+        size_px = self._font_px(ct.NOTE_PARAMS["font_size"])
+        font = image_renderer.load_font(ct.NOTE_PARAMS["font_family"], max(1, round(size_px)), ct.NOTE_PARAMS["font_weight"])
+        display_text = image_renderer.fit_text(note_obj.text, font, (right - left) - 2 * textarea_mergin, (bottom - top) - 2 * textarea_mergin)
+        self.text(left + textarea_mergin, top + textarea_mergin, display_text, ct.NOTE_PARAMS["font_family"], ct.NOTE_PARAMS["font_size"], ct.NOTE_PARAMS["font_weight"],
+                  ct.NOTE_PARAMS["text_color"], anchor="nw")
+
+    def _write_swimlane(self, swimlane_obj):
+        left, top, right, bottom = export_scene.swimlane_bounds(swimlane_obj)
+        outline_color = ct.SWIMLANE_PARAMS["outline_color"]
+        outline_width = ct.SWIMLANE_PARAMS["outline_width"]
+        self.polygon([(left, top), (right, top), (right, bottom), (left, bottom)], None, outline_color, outline_width)
+        angle = 90 if swimlane_obj.kind == ct.SWIMLANE_KIND_HORIZONTAL else 0
+        for header_left, header_top, header_right, header_bottom in swimlane_obj.get_header_bounds():
+            self.polygon([(header_left, header_top), (header_right, header_top), (header_right, header_bottom), (header_left, header_bottom)],
+                         swimlane_obj.fill_color, outline_color, outline_width)
+            self.text((header_left + header_right) / 2, (header_top + header_bottom) / 2, swimlane_obj.title,
+                      ct.SWIMLANE_PARAMS["font_family"], ct.SWIMLANE_PARAMS["font_size"], ct.SWIMLANE_PARAMS["font_weight"],
+                      ct.SWIMLANE_PARAMS["text_color"], angle=angle)
+
+class SvgWriter(_VectorWriter):
+    """SVG形式で出力（座標はモデル座標のまま、viewBox で倍率を指定）"""
+
+    def __init__(self, stream: TextIO, scale: Optional[float] = None):
+        super().__init__(scale)
+        self.stream = stream
+
+    def begin(self, area: Bounds):
+        left, top, right, bottom = area
+        width, height = right - left, bottom - top
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.stream.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(width * self.scale)}" height="{_num(height * self.scale)}" '
+            f'viewBox="{_num(left)} {_num(top)} {_num(width)} {_num(height)}">\n'
+        )
+        self.stream.write(f'<rect x="{_num(left)}" y="{_num(top)}" width="{_num(width)}" height="{_num(height)}" fill="{ct.EXPORT_PARAMS["background"]}"/>\n')
+
+    def end(self):
+        self.stream.write("</svg>\n")
+
+    @staticmethod
+    def _points_attr(points: Sequence[Point]) -> str:
+        return " ".join(f"{_num(x)},{_num(y)}" for x, y in points)
+
+    def polygon(self, points, fill, outline, width):
+        stroke = f' stroke="{outline}" stroke-width="{_num(width)}"' if outline else ""
+        self.stream.write(f'<polygon points="{self._points_attr(points)}" fill="{fill or "none"}"{stroke}/>\n')
+
+    def polyline(self, points, color, width, dash=None):
+        if len(points) < 2:
+            return
+        dash_attr = ""
+        if dash:
+            on, off = image_renderer.DASH_PATTERNS.get(dash, (6, 4))
+            dash_attr = f' stroke-dasharray="{_num(on * width)} {_num(off * width)}"'
+        self.stream.write(f'<polyline points="{self._points_attr(points)}" fill="none" stroke="{color}" stroke-width="{_num(width)}"{dash_attr}/>\n')
+
+    def text_lines(self, left, top, block, font_spec, color, angle=0, center=None):
+        family, size_px, weight = font_spec
+        families = ", ".join(family) if isinstance(family, (tuple, list)) else family
+        transform = f' transform="rotate({-angle} {_num(center[0])} {_num(center[1])})"' if angle else ""
+        self.stream.write(
+            f'<g font-family={quoteattr(families)} font-size="{_num(size_px)}" font-weight="{weight}" fill="{color}"{transform}>'
+        )
+        for line, line_left, line_top in block.lines:
+            if line:
+                self.stream.write(f'<text x="{_num(left + line_left)}" y="{_num(top + line_top + block.ascent)}" xml:space="preserve">{escape(line)}</text>')
+        self.stream.write("</g>\n")
+
+class PdfWriter(_VectorWriter):
+    """PDF形式で出力（ページの内容を描画命令として逐次書き出し、オブジェクトの位置だけを保持する）
+
+    欧文は Helvetica、それ以外の文字は埋め込みなしの日本語CIDフォントで出力する
+    """
+
+    # オブジェクト番号
+    _CATALOG, _PAGES, _PAGE, _CONTENTS, _LENGTH, _FONT_LATIN, _FONT_CJK, _FONT_CJK_CID, _FONT_CJK_DESCRIPTOR = range(1, 10)
+
+    def __init__(self, stream: BinaryIO, scale: Optional[float] = None):
+        super().__init__(scale)
+        self.stream = stream
+        self._position = 0
+        self._offsets = {}
+        self._content_start = 0
+        self._page_size = (0.0, 0.0)
+
+    def _write(self, text: str | bytes):
+        data = text.encode("latin-1") if isinstance(text, str) else text
+        self.stream.write(data)
+        self._position += len(data)
+
+    def _begin_object(self, number: int):
+        self._offsets[number] = self._position
+        self._write(f"{number} 0 obj\n")
+
+    def begin(self, area: Bounds):
+        left, top, right, bottom = area
+        # モデル座標（ピクセル）をポイントに換算し、上下を反転する
+        unit = 0.75 * self.scale
+        self._page_size = ((right - left) * unit, (bottom - top) * unit)
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._begin_object(self._CONTENTS)
+        self._write(f"<< /Length {self._LENGTH} 0 R >>\nstream\n")
+        self._content_start = self._position
+        self._write(f"{_num(unit)} 0 0 {_num(-unit)} {_num(-left * unit)} {_num(self._page_size[1] + top * unit)} cm\n")
+        self._write(f"{self._color(ct.EXPORT_PARAMS['background'])} rg {_num(left)} {_num(top)} {_num(right - left)} {_num(bottom - top)} re f\n")
+
+    def end(self):
+        content_length = self._position - self._content_start
+        self._write("\nendstream\nendobj\n")
+        self._begin_object(self._LENGTH)
+        self._write(f"{content_length}\nendobj\n")
+
+        page_width, page_height = self._page_size
+        cjk_font = ct.EXPORT_PARAMS["pdf_cjk_font"]
+        objects = {
+            self._CATALOG: f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>",
+            self._PAGES: f"<< /Type /Pages /Kids [{self._PAGE} 0 R] /Count 1 >>",
+            self._PAGE: (
+                f"<< /Type /Page /Parent {self._PAGES} 0 R /MediaBox [0 0 {_num(page_width)} {_num(page_height)}] "
+                f"/Resources << /Font << /F1 {self._FONT_LATIN} 0 R /F2 {self._FONT_CJK} 0 R >> >> /Contents {self._CONTENTS} 0 R >>"
+            ),
+            self._FONT_LATIN: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            self._FONT_CJK: (
+                f"<< /Type /Font /Subtype /Type0 /BaseFont /{cjk_font}-UniJIS-UCS2-H /Encoding /UniJIS-UCS2-H "
+                f"/DescendantFonts [{self._FONT_CJK_CID} 0 R] >>"
+            ),
+            self._FONT_CJK_CID: (
+                f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{cjk_font} "
+                f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >> /FontDescriptor {self._FONT_CJK_DESCRIPTOR} 0 R /DW 1000 >>"
+            ),
+            self._FONT_CJK_DESCRIPTOR: (
+                f"<< /Type /FontDescriptor /FontName /{cjk_font} /Flags 4 /FontBBox [-92 -250 1010 922] "
+                "/ItalicAngle 0 /Ascent 752 /Descent -221 /CapHeight 737 /StemV 114 >>"
+            ),
+        }
+        for number, body in objects.items():
+            self._begin_object(number)
+            self._write(f"{body}\nendobj\n")
+
+        xref_position = self._position
+        size = max(self._offsets) + 1
+        self._write(f"xref\n0 {size}\n0000000000 65535 f \n")
+        for number in range(1, size):
+            self._write(f"{self._offsets[number]:010d} 00000 n \n")
+        self._write(f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n")
+
+    @staticmethod
+    def _color(color: str) -> str:
+        red, green, blue = ImageColor.getrgb(color)[:3]
+        return f"{_num(red / 255)} {_num(green / 255)} {_num(blue / 255)}"
+
+    def _path(self, points: Sequence[Point], close: bool) -> str:
+        commands = [f"{_num(points[0][0])} {_num(points[0][1])} m"]
+        commands += [f"{_num(x)} {_num(y)} l" for x, y in points[1:]]
+        if close:
+            commands.append("h")
+        return " ".join(commands)
+
+    def polygon(self, points, fill, outline, width):
+        if len(points) < 2 or (not fill and not outline):
+            return
+        state = []
+        if fill:
+            state.append(f"{self._color(fill)} rg")
+        if outline:
+            state.append(f"{self._color(outline)} RG {_num(width)} w")
+        operator = "B" if fill and outline else ("f" if fill else "S")
+        self._write(f"{' '.join(state)} {self._path(points, True)} {operator}\n")
+
+    def polyline(self, points, color, width, dash=None):
+        if len(points) < 2:
+            return
+        if dash:
+            on, off = image_renderer.DASH_PATTERNS.get(dash, (6, 4))
+            dash_state = f"[{_num(on * width)} {_num(off * width)}] 0 d"
+        else:
+            dash_state = "[] 0 d"
+        self._write(f"{self._color(color)} RG {_num(width)} w {dash_state} {self._path(points, False)} S\n")
+
+    @staticmethod
+    def _text_runs(line: str) -> List[Tuple[str, str]]:
+        """行を、Helvetica（WinAnsi）で表せる文字列と日本語フォントの文字列に分割"""
+        runs = []
+        for char in line:
+            try:
+                char.encode("cp1252")
+                font_name, data = "F1", char
+            except UnicodeEncodeError:
+                if ord(char) > 0xFFFF:
+                    continue
+                font_name, data = "F2", char
+            if runs and runs[-1][0] == font_name:
+                runs[-1] = (font_name, runs[-1][1] + data)
+            else:
+                runs.append((font_name, data))
+        return runs
+
+    @staticmethod
+    def _encode_run(font_name: str, text: str) -> str:
+        if font_name == "F1":
+            encoded = text.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+            return "(" + encoded.decode("latin-1") + ")"
+        return "<" + text.encode("utf-16-be").hex().upper() + ">"
+
+    def text_lines(self, left, top, block, font_spec, color, angle=0, center=None):
+        family, size_px, weight = font_spec
+        self._write(f"{self._color(color)} rg\n")
+        if angle:
+            # 中心を基準に回転（上下反転した座標系のため、回転方向も反転）
+            self._write(f"q 0 -1 1 0 {_num(center[0] - center[1])} {_num(center[0] + center[1])} cm\n")
+        for line, line_left, line_top in block.lines:
+            if not line:
+                continue
+            self._write(f"BT 1 0 0 -1 {_num(left + line_left)} {_num(top + line_top + block.ascent)} Tm")
+            for font_name, run in self._text_runs(line):
+                self._write(f" /{font_name} {_num(size_px)} Tf {self._encode_run(font_name, run)} Tj")
+            self._write(" ET\n")
+        if angle:
+            self._write("Q\n")
+
+def export_svg(scene: ExportScene, file_path: str, scale: Optional[float] = None, area: Optional[Bounds] = None):
+    with open(file_path, "w", encoding="utf-8", newline="\n") as f:
+        SvgWriter(f, scale).write_scene(scene, area)
+
+def export_pdf(scene: ExportScene, file_path: str, scale: Optional[float] = None, area: Optional[Bounds] = None):
+    with open(file_path, "wb") as f:
+        PdfWriter(f, scale).write_scene(scene, area)
+
+# バッチ出力用メイン（python vector_exporter.py 入力.json 出力.svg|出力.pdf [倍率]）
+if __name__ == "__main__":
+    import json
+
+    if len(sys.argv) < 3:
+        print("usage: python vector_exporter.py input.json output.svg|output.pdf [scale]")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        model_data = json.load(f)
+    output_scale = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    output_scene = export_scene.from_model_data(model_data)
+    if sys.argv[2].lower().endswith(".pdf"):
+        export_pdf(output_scene, sys.argv[2], output_scale)
+    else:
+        export_svg(output_scene, sys.argv[2], output_scale)